@@ -14,24 +14,18 @@ os.environ['HF_HUB_DISABLE_IMPLICIT_TOKEN'] = '1'
 
 from flask import Flask
 from config import Config
+from modules.logging_setup import setup_logging, init_request_logging
+from modules.assets import asset_url
+
+# --- 日志配置（队列异步写入，需在导入转换模块前完成）---
+setup_logging(Config)
+# --- 日志配置结束 ---
 
 # 导入路由模块
 from routes.main_routes import main_bp
 from routes.convert_routes import convert_bp
-
-# --- 日志配置 ---
-log_file = 'app.log'
-
-# 使用追加模式，避免因文件被占用而导致的启动错误
-logging.basicConfig(
-    level=getattr(logging, Config.LOG_LEVEL.upper()),
-    format='%(asctime)s - %(levelname)s - %(name)s - %(message)s',
-    handlers=[
-        logging.FileHandler(log_file, mode='a', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
-# --- 日志配置结束 ---
+from routes.admin_routes import admin_bp
+from routes.search_routes import search_bp
 
 def create_app():
     """创建 Flask 应用实例"""
@@ -43,10 +37,19 @@ def create_app():
         os.makedirs(app.config['UPLOAD_FOLDER'])
     if not os.path.exists(app.config['OUTPUT_FOLDER']):
         os.makedirs(app.config['OUTPUT_FOLDER'])
+    os.makedirs(app.config['JOB_FOLDER'], exist_ok=True)
+
+    # 为每个请求绑定请求ID
+    init_request_logging(app)
+
+    # 模板中按构建清单解析静态资源地址
+    app.jinja_env.globals['asset_url'] = asset_url
 
     # 注册蓝图
     app.register_blueprint(main_bp)
     app.register_blueprint(convert_bp)
+    app.register_blueprint(admin_bp)
+    app.register_blueprint(search_bp)
 
     logging.info("🐑 小羊的工具箱启动成功！")
     
@@ -56,8 +59,18 @@ def create_app():
 app = create_app()
 
 if __name__ == '__main__':
+    # 开发服务器；生产环境请使用 gunicorn -c gunicorn.conf.py wsgi:app
+    # 启动时恢复中断的任务（开启重载时只在实际服务的子进程中启动）
+    if not app.config['DEBUG'] or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        from modules.job_runner import get_job_runner
+        get_job_runner()
+        from modules.docling_service import warm_up_ocr
+        warm_up_ocr(app.config['OCR_WARMUP'])
+        from modules.pdf_renderer import warm_up_pdf_renderer
+        warm_up_pdf_renderer(app.config['PDF_RENDERER_WARMUP'])
     app.run(
         host='0.0.0.0',
         port=app.config['PORT'],
-        debug=app.config['DEBUG']
+        debug=app.config['DEBUG'],
+        use_reloader=app.config['DEBUG']
     )
\ No newline at end of file
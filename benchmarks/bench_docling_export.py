@@ -0,0 +1,86 @@
+"""
+Docling 导出基准测试
+对比原生 DOCX/XLSX 导出与 Markdown 中转方案的延迟和峰值内存
+
+用法:
+    python -m benchmarks.bench_docling_export sample.pdf [more.pdf ...] --repeat 3
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+# 允许从仓库根目录直接运行
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.docling_service import get_docling_processor
+from modules.docling_exporters import export_docling_to_docx, export_docling_to_xlsx
+from modules.document_converter import get_document_converter
+from benchmarks.metrics import children_maxrss_mb
+
+
+def measure(func, repeat: int) -> dict:
+    """多次运行函数，返回最小耗时与Python堆峰值"""
+    timings = []
+    peak_bytes = 0
+    for _ in range(repeat):
+        tracemalloc.start()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak_bytes = max(peak_bytes, peak)
+    return {
+        'best_ms': min(timings) * 1000,
+        'mean_ms': sum(timings) / len(timings) * 1000,
+        'peak_py_mb': peak_bytes / 1024 / 1024,
+    }
+
+
+def bench_file(input_path: str, repeat: int) -> None:
+    """对单个文件运行全部导出方案"""
+    processor = get_docling_processor()
+    converter = get_document_converter()
+    # 文档解析只做一次，基准只比较导出阶段
+    doc = processor.convert_to_document(input_path)
+
+    work_dir = tempfile.mkdtemp()
+    cases = {
+        'DOCX 原生': lambda: export_docling_to_docx(doc, os.path.join(work_dir, 'native.docx')),
+        'DOCX Markdown中转': lambda: converter._convert_markdown_content(
+            doc.export_to_markdown(), os.path.join(work_dir, 'detour'),
+            os.path.join(work_dir, 'detour.docx'), 'DOCX'),
+        'XLSX 原生': lambda: export_docling_to_xlsx(doc, os.path.join(work_dir, 'native.xlsx')),
+        'XLSX Markdown中转': lambda: converter._convert_markdown_content(
+            doc.export_to_markdown(), os.path.join(work_dir, 'detour'),
+            os.path.join(work_dir, 'detour.xlsx'), 'XLSX'),
+    }
+
+    print(f"\n📄 {os.path.basename(input_path)}")
+    print(f"{'方案':<20}{'最佳(ms)':>12}{'平均(ms)':>12}{'Python峰值(MB)':>18}")
+    for name, func in cases.items():
+        try:
+            result = measure(func, repeat)
+        except Exception as e:
+            print(f"{name:<20}  跳过: {e}")
+            continue
+        print(f"{name:<20}{result['best_ms']:>12.1f}{result['mean_ms']:>12.1f}{result['peak_py_mb']:>18.2f}")
+    print(f"pandoc 子进程最大RSS: {children_maxrss_mb():.1f} MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Docling 原生导出 vs Markdown 中转基准")
+    parser.add_argument('inputs', nargs='+', help="输入文件（PDF/DOCX/HTML 等）")
+    parser.add_argument('--repeat', type=int, default=3, help="每个方案的重复次数")
+    args = parser.parse_args()
+
+    for input_path in args.inputs:
+        bench_file(input_path, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+轻量路线基准测试
+对比 HTML / DOCX 转 Markdown、文本 的轻量实现（html.parser、pandoc）与 Docling 的延迟，以及文本直通/转码的延迟
+
+用法:
+    python -m benchmarks.bench_light_routes
+    python -m benchmarks.bench_light_routes page.html report.docx --repeat 5
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+# 允许从仓库根目录直接运行
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import make_docx, make_gbk_text, make_html
+from modules.light_converters import convert_html, transcode_text
+from modules.document_converter import get_document_converter
+from modules.docling_service import is_docling_available
+
+
+def best_ms(func, repeat: int) -> float:
+    """多次运行，返回最小耗时（毫秒）"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def light_cases(converter, input_path: str, work_dir: str):
+    """输入文件对应的 (路线, 轻量实现, Docling 实现或 None)"""
+    ext = input_path.rsplit('.', 1)[-1].lower()
+    out = lambda name: os.path.join(work_dir, name)
+    if ext in ('txt', 'md'):
+        yield f"{ext}->MARKDOWN", lambda: transcode_text(input_path, out('text.md')), None
+    elif ext == 'html':
+        for fmt in ('MARKDOWN', 'TEXT'):
+            yield (f"html->{fmt}",
+                   lambda fmt=fmt: convert_html(input_path, out(f'light_{fmt}'), plain=fmt == 'TEXT'),
+                   lambda fmt=fmt: converter._convert_with_docling(input_path, out(f'docling_{fmt}'), fmt))
+    elif ext == 'docx':
+        for fmt in ('MARKDOWN', 'TEXT'):
+            yield (f"docx->{fmt}",
+                   lambda fmt=fmt: converter._run_pandoc_docx_to_markdown(input_path, out(f'pandoc_{fmt}'), fmt),
+                   lambda fmt=fmt: converter._convert_with_docling(input_path, out(f'docling_{fmt}'), fmt))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="轻量转换路线与 Docling 的延迟对比")
+    parser.add_argument('inputs', nargs='*', help="输入文件（默认生成合成 HTML、DOCX、GBK 文本）")
+    parser.add_argument('--repeat', type=int, default=3, help="每个实现的重复次数（取最佳）")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='bench_light_')
+    inputs = list(args.inputs)
+    if not inputs:
+        for name, generator in (('page.html', make_html), ('notes_gbk.txt', make_gbk_text), ('report.docx', make_docx)):
+            path = os.path.join(work_dir, name)
+            try:
+                generator(path)
+                inputs.append(path)
+            except ImportError as e:
+                print(f"⏭️  跳过 {name}: 缺少依赖 {e}")
+
+    converter = get_document_converter()
+    docling = is_docling_available()
+    print(f"{'路线':<16}{'轻量(ms)':>12}{'Docling(ms)':>14}{'加速比':>10}")
+    for input_path in inputs:
+        for route, light, heavy in light_cases(converter, input_path, work_dir):
+            try:
+                light_ms = best_ms(light, args.repeat)
+            except Exception as e:
+                print(f"{route:<16}  轻量实现失败: {e}")
+                continue
+            heavy_ms = None
+            if heavy is not None and docling:
+                try:
+                    # Docling 首次调用包含模型加载，预热一次后再计时
+                    heavy()
+                    heavy_ms = best_ms(heavy, args.repeat)
+                except Exception as e:
+                    print(f"{route:<16}  Docling 失败: {e}")
+            speedup = f"{heavy_ms / light_ms:.1f}x" if heavy_ms and light_ms > 0 else '-'
+            heavy_text = f"{heavy_ms:.1f}" if heavy_ms is not None else '-'
+            print(f"{route:<16}{light_ms:>12.1f}{heavy_text:>14}{speedup:>10}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""
+OCR 批量识别基准测试
+在多页合成扫描件上比较文本行识别的吞吐（行/秒）随批大小的变化，以及开启批量识别前后的整本转换速度
+
+1. 先正常转换一次，收集 Docling 实际交给识别模型的全部文本行裁剪图；
+2. 按不同批大小重新识别这些裁剪图：原始方式（每批按最宽行补齐，形状各不相同）与
+   按宽高比档位补齐的定长批次；
+3. 关闭 / 开启 OCR_BATCH_ENABLED 各转换一次整本扫描件。
+
+用法:
+    python -m benchmarks.bench_ocr_batching
+    python -m benchmarks.bench_ocr_batching --pages 10 --batch-sizes 1 6 16 32 64 --repeat 3
+    python -m benchmarks.bench_ocr_batching inputs/scan.pdf --profile fast
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+# 允许从仓库根目录直接运行
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from benchmarks.corpus import make_scanned_pdf, count_pages
+
+# 基准需要每次真实识别，关闭页面缓存；批量识别层由基准自己控制
+Config.OCR_PAGE_CACHE_ENABLED = False
+Config.OCR_BATCH_ENABLED = False
+
+from modules.docling_service import get_docling_processor, ocr_request
+from modules.ocr_batching import RecognitionBatcher, find_ocr_models
+
+
+class CropRecorder:
+    """包装原识别器，记录交给它的每张文本行裁剪图"""
+
+    def __init__(self, recognizer):
+        self.recognizer = recognizer
+        self.crops = []
+        self.calls = 0
+
+    def __call__(self, img_list, *args, **kwargs):
+        if isinstance(img_list, list):
+            self.crops.extend(img_list)
+            self.calls += 1
+        return self.recognizer(img_list, *args, **kwargs)
+
+
+def collect_crops(processor, pdf_path: str, profile: str):
+    """转换一次扫描件，返回 (原识别器, 裁剪图列表, 原始调用次数, 耗时)"""
+    from docling.datamodel.base_models import InputFormat
+    with ocr_request(profile, True):
+        converter, _ = processor._select_converter(pdf_path)
+        # 先初始化管道，才能在第一次转换前替换识别器
+        converter.initialize_pipeline(InputFormat.PDF)
+        models = list(find_ocr_models(converter.initialized_pipelines.values()))
+        if not models:
+            raise RuntimeError("管道中没有找到 RapidOCR 模型")
+        reader = models[0][2].reader
+        recognizer = reader.text_rec
+        recorder = CropRecorder(recognizer)
+        reader.text_rec = recorder
+        try:
+            start = time.perf_counter()
+            processor.convert_document(pdf_path, 'TEXT')
+            elapsed = time.perf_counter() - start
+        finally:
+            reader.text_rec = recognizer
+    return recognizer, recorder.crops, recorder.calls, elapsed
+
+
+def time_batches(recognize, crops, batch_size: int, repeat: int) -> float:
+    """按批大小切分裁剪图逐批识别，返回最佳耗时"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for offset in range(0, len(crops), batch_size):
+            recognize(crops[offset:offset + batch_size])
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def bench_batch_sizes(recognizer, crops, batch_sizes, bucket: float, repeat: int) -> list:
+    results = []
+    print(f"\n{'批大小':<10}{'原始(行/秒)':>14}{'定长(行/秒)':>14}{'加速':>8}")
+    for batch_size in batch_sizes:
+        recognizer.rec_batch_num = batch_size
+        batcher = RecognitionBatcher(recognizer, batch_size, 0, bucket)
+        plain = time_batches(recognizer, crops, batch_size, repeat)
+        bucketed = time_batches(batcher.recognize, crops, batch_size, repeat)
+        result = {
+            'batch_size': batch_size,
+            'lines': len(crops),
+            'plain_lines_per_sec': round(len(crops) / plain, 1) if plain > 0 else None,
+            'bucketed_lines_per_sec': round(len(crops) / bucketed, 1) if bucketed > 0 else None,
+        }
+        results.append(result)
+        print(f"{batch_size:<10}{result['plain_lines_per_sec'] or 0:>14.1f}"
+              f"{result['bucketed_lines_per_sec'] or 0:>14.1f}{plain / bucketed if bucketed > 0 else 0:>8.2f}x")
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="OCR 批量识别吞吐基准")
+    parser.add_argument('input', nargs='?', help="自备扫描件PDF（默认生成合成扫描件）")
+    parser.add_argument('--pages', type=int, default=8, help="合成扫描件的页数")
+    parser.add_argument('--dpi', type=int, default=150, help="合成扫描件的分辨率")
+    parser.add_argument('--profile', default='accurate', help="OCR 档位")
+    parser.add_argument('--batch-sizes', nargs='*', type=int, default=[1, 6, 16, 32, 64], help="要比较的批大小")
+    parser.add_argument('--bucket', type=float, default=Config.OCR_BATCH_WIDTH_BUCKET, help="宽高比档位步长")
+    parser.add_argument('--repeat', type=int, default=2, help="每个批大小的重复次数（取最佳）")
+    parser.add_argument('--output', help="结果JSON路径")
+    args = parser.parse_args()
+
+    processor = get_docling_processor()
+    if processor is None or not processor.is_available():
+        print("❌ Docling 不可用，无法运行 OCR 基准")
+        return 1
+
+    pdf_path = args.input
+    if pdf_path is None:
+        pdf_path = os.path.join(tempfile.mkdtemp(prefix='bench_ocr_batch_'), f"scan_{args.pages}p.pdf")
+        make_scanned_pdf(pdf_path, pages=args.pages, dpi=args.dpi)
+    pages = count_pages(pdf_path) or 0
+
+    recognizer, crops, calls, baseline_s = collect_crops(processor, pdf_path, args.profile)
+    if not crops:
+        print("❌ 没有识别到文本行")
+        return 1
+    print(f"🧾 {os.path.basename(pdf_path)}: {pages} 页, {len(crops)} 行, 原始识别调用 {calls} 次 "
+          f"(平均每次 {len(crops) / calls:.1f} 行)")
+    batch_results = bench_batch_sizes(recognizer, crops, args.batch_sizes, args.bucket, args.repeat)
+
+    # 整本转换：开启批量识别层（含同批多页并发）后再转换一次
+    Config.OCR_BATCH_ENABLED = True
+    with ocr_request(args.profile, True):
+        start = time.perf_counter()
+        processor.convert_document(pdf_path, 'TEXT')
+        batched_s = time.perf_counter() - start
+        converter, _ = processor._select_converter(pdf_path)
+    stats = {}
+    for _, _, model in find_ocr_models(converter.initialized_pipelines.values()):
+        if isinstance(model.reader.text_rec, RecognitionBatcher):
+            stats = model.reader.text_rec.stats()
+    print(f"\n{'整本转换':<10}{'耗时(s)':>10}{'页/秒':>10}")
+    print(f"{'逐页':<10}{baseline_s:>10.2f}{pages / baseline_s:>10.2f}")
+    print(f"{'批量':<10}{batched_s:>10.2f}{pages / batched_s:>10.2f}")
+    if stats:
+        print(f"📦 批量识别: {stats['batches']} 批, 平均每批 {stats['lines_per_batch']} 行, "
+              f"合并批次 {stats['merged_batches']}, 识别 {stats['lines_per_sec']} 行/秒")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'input': os.path.basename(pdf_path),
+                'pages': pages,
+                'lines': len(crops),
+                'batch_sizes': batch_results,
+                'document': {'baseline_s': round(baseline_s, 3), 'batched_s': round(batched_s, 3), 'batcher': stats},
+            }, f, ensure_ascii=False, indent=2)
+        print(f"📝 结果已写入: {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""
+OCR 档位基准测试
+在不同扫描分辨率的合成扫描件上比较 fast / balanced / accurate / auto 档位的速度和识别准确率
+
+准确率为近似指标：去除空白后与原文的 difflib 相似度（0~1）
+
+用法:
+    python -m benchmarks.bench_ocr_tiers
+    python -m benchmarks.bench_ocr_tiers --dpi 100 200 300 --pages 5 --repeat 2
+    python -m benchmarks.bench_ocr_tiers inputs/scan.pdf --truth inputs/scan.txt
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import difflib
+import argparse
+import tempfile
+
+# 允许从仓库根目录直接运行
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from benchmarks.corpus import make_scanned_pdf, scanned_page_text, count_pages
+
+# 基准需要每次真实识别，关闭页面缓存
+Config.OCR_PAGE_CACHE_ENABLED = False
+
+from modules.docling_service import get_docling_processor, ocr_request
+from modules.ocr_profiles import OCR_PROFILES, PROFILE_AUTO
+
+
+def char_accuracy(reference: str, recognized: str) -> float:
+    """去除空白和 Markdown 标记后的字符相似度"""
+    def normalize(text: str) -> str:
+        return re.sub(r'[\s#*|`_-]+', '', text)
+    return difflib.SequenceMatcher(None, normalize(reference), normalize(recognized), autojunk=False).ratio()
+
+
+def bench_case(processor, pdf_path: str, truth: str, profile: str, upright: bool, repeat: int) -> dict:
+    """对单个扫描件运行一个档位，返回最佳耗时、页/秒和准确率"""
+    pages = count_pages(pdf_path) or 0
+    timings = []
+    content = ''
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with ocr_request(profile, upright):
+            content, _ = processor.convert_document(pdf_path, 'TEXT')
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    return {
+        'profile': profile,
+        'upright': upright,
+        'pages': pages,
+        'best_s': round(best, 3),
+        'pages_per_sec': round(pages / best, 3) if best > 0 else None,
+        'accuracy': round(char_accuracy(truth, content), 4),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="OCR 档位速度/准确率基准")
+    parser.add_argument('inputs', nargs='*', help="自备扫描件PDF（需配合 --truth 提供原文）")
+    parser.add_argument('--truth', nargs='*', default=[], help="与 inputs 一一对应的原文文本文件")
+    parser.add_argument('--dpi', nargs='*', type=int, default=[100, 150, 300], help="合成扫描件的分辨率")
+    parser.add_argument('--pages', type=int, default=3, help="合成扫描件的页数")
+    parser.add_argument('--repeat', type=int, default=1, help="每个档位的重复次数（取最佳）")
+    parser.add_argument('--profiles', nargs='*', default=list(OCR_PROFILES) + [PROFILE_AUTO], help="要比较的档位")
+    parser.add_argument('--output', help="结果JSON路径")
+    args = parser.parse_args()
+
+    processor = get_docling_processor()
+    if processor is None or not processor.is_available():
+        print("❌ Docling 不可用，无法运行 OCR 基准")
+        return 1
+    print(f"🧰 可用档位: {', '.join(processor.ocr_profiles) or '无（使用默认OCR）'}")
+
+    # (名称, PDF路径, 原文)
+    cases = []
+    work_dir = tempfile.mkdtemp(prefix='bench_ocr_')
+    for dpi in args.dpi:
+        path = os.path.join(work_dir, f"scan_{dpi}dpi.pdf")
+        make_scanned_pdf(path, pages=args.pages, dpi=dpi)
+        truth = '\n'.join(scanned_page_text(page_no) for page_no in range(args.pages))
+        cases.append((f"合成 {dpi}dpi", path, truth))
+    for input_path, truth_path in zip(args.inputs, args.truth):
+        with open(truth_path, encoding='utf-8') as f:
+            cases.append((os.path.basename(input_path), input_path, f.read()))
+
+    results = []
+    print(f"\n{'输入':<16}{'档位':<10}{'方向分类':<10}{'耗时(s)':>10}{'页/秒':>10}{'准确率':>10}")
+    for name, path, truth in cases:
+        for profile in args.profiles:
+            # 合成扫描件均为正向，额外比较跳过方向分类的效果
+            for upright in (False, True):
+                try:
+                    result = bench_case(processor, path, truth, profile, upright, args.repeat)
+                except Exception as e:
+                    print(f"{name:<16}{profile:<10}{'关' if upright else '开':<10}  失败: {e}")
+                    continue
+                result['input'] = name
+                results.append(result)
+                print(f"{name:<16}{profile:<10}{'关' if upright else '开':<10}{result['best_s']:>10.2f}"
+                      f"{result['pages_per_sec'] or 0:>10.2f}{result['accuracy']:>10.3f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"📝 结果已写入: {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""
+Markdown 转 PDF 引擎基准测试
+在小/中/大三种 CJK Markdown 上对比 WeasyPrint（共享字体缓存，区分首次与预热后）和 pandoc + xelatex 的延迟
+
+用法:
+    python -m benchmarks.bench_pdf_engines
+    python -m benchmarks.bench_pdf_engines report.md --repeat 5
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+# 允许从仓库根目录直接运行
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import make_cjk_markdown
+from benchmarks.bench_light_routes import best_ms
+from modules.pdf_renderer import WEASYPRINT_AVAILABLE, get_weasyprint_renderer, needs_latex
+from modules.document_converter import _detect_latex_engine, get_document_converter
+
+# 文档规模 -> 章节数（每章约半页正文 + 一个10行表格）
+SIZES = (('small', 2), ('medium', 20), ('large', 200))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Markdown 转 PDF 引擎延迟对比")
+    parser.add_argument('inputs', nargs='*', help="Markdown 文件（默认生成小/中/大三种合成文档）")
+    parser.add_argument('--repeat', type=int, default=3, help="每个引擎的重复次数（取最佳）")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='bench_pdf_')
+    inputs = list(args.inputs)
+    if not inputs:
+        for name, sections in SIZES:
+            path = os.path.join(work_dir, f'{name}.md')
+            make_cjk_markdown(path, sections=sections)
+            inputs.append(path)
+
+    converter = get_document_converter()
+    latex = _detect_latex_engine() is not None
+    if not WEASYPRINT_AVAILABLE:
+        print("⏭️  WeasyPrint 未安装，只测 xelatex")
+    if not latex:
+        print("⏭️  未检测到 LaTeX 引擎，只测 WeasyPrint")
+
+    if WEASYPRINT_AVAILABLE:
+        # 进程内首次渲染包含字体查找和加载，之后的转换共享字体配置
+        start = time.perf_counter()
+        get_weasyprint_renderer().warm_up()
+        print(f"WeasyPrint 首次渲染（含 CJK 字体加载）: {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    print(f"{'文档':<14}{'大小(KB)':>10}{'Weasy(ms)':>12}{'xelatex(ms)':>13}{'加速比':>9}")
+    for input_path in inputs:
+        name = os.path.basename(input_path)
+        size_kb = os.path.getsize(input_path) / 1024
+        out = os.path.join(work_dir, name + '.pdf')
+        weasy_ms = xelatex_ms = None
+        if WEASYPRINT_AVAILABLE:
+            renderer = get_weasyprint_renderer()
+            weasy_ms = best_ms(lambda: renderer.render_markdown(input_path, out), args.repeat)
+        if latex:
+            try:
+                xelatex_ms = best_ms(lambda: converter._run_xelatex_markdown_to_pdf(input_path, out), args.repeat)
+            except Exception as e:
+                print(f"{name:<14}  xelatex 失败: {e}")
+        speedup = f"{xelatex_ms / weasy_ms:.1f}x" if weasy_ms and xelatex_ms else '-'
+        fmt = lambda value: f"{value:.0f}" if value is not None else '-'
+        print(f"{name:<14}{size_kb:>10.1f}{fmt(weasy_ms):>12}{fmt(xelatex_ms):>13}{speedup:>9}")
+        if needs_latex(input_path):
+            print(f"{'':<14}  含公式，auto 模式下使用 xelatex")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,203 @@
+"""
+合成基准语料生成
+离线生成各类输入文件；缺少生成所需库时跳过对应类型
+"""
+
+import os
+import logging
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 中英混排的段落，覆盖 CJK 字体和常见标点
+SAMPLE_PARAGRAPH = (
+    "小羊的工具箱基准测试文档。This benchmark paragraph mixes Chinese and English text, "
+    "数字 12345 以及标点符号，用于模拟真实的论文与报告内容。"
+)
+TEXT_PDF_PAGES = 5
+SCANNED_PDF_PAGES = 3
+TABLE_ROWS = 2000
+XLSX_ROWS = 5000
+
+
+def _require_fitz():
+    import fitz
+    return fitz
+
+
+def make_text_pdf(path: str, pages: int = TEXT_PDF_PAGES) -> None:
+    """带文本层的PDF"""
+    fitz = _require_fitz()
+    doc = fitz.open()
+    for page_no in range(pages):
+        page = doc.new_page()
+        text = f"第{page_no + 1}章 基准测试\n\n" + "\n".join([SAMPLE_PARAGRAPH] * 12)
+        page.insert_textbox(fitz.Rect(50, 50, 545, 790), text, fontname='china-s', fontsize=11)
+    doc.save(path)
+    doc.close()
+
+
+def scanned_page_text(page_no: int) -> str:
+    """扫描件第 page_no 页（从0开始）的原文，可作为 OCR 准确率的参照"""
+    return f"扫描页 {page_no + 1}\n\n" + "\n".join([SAMPLE_PARAGRAPH] * 10)
+
+
+def make_scanned_pdf(path: str, pages: int = SCANNED_PDF_PAGES, dpi: int = 150) -> None:
+    """只有图像、没有文本层的扫描件PDF"""
+    fitz = _require_fitz()
+    source = fitz.open()
+    scanned = fitz.open()
+    for page_no in range(pages):
+        page = source.new_page()
+        text = scanned_page_text(page_no)
+        page.insert_textbox(fitz.Rect(50, 50, 545, 790), text, fontname='china-s', fontsize=12)
+        pixmap = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+        target = scanned.new_page(width=page.rect.width, height=page.rect.height)
+        target.insert_image(target.rect, pixmap=pixmap)
+    scanned.save(path, deflate=True)
+    scanned.close()
+    source.close()
+
+
+def make_docx(path: str) -> None:
+    """带标题、段落和表格的Word文档"""
+    from docx import Document
+    document = Document()
+    document.add_heading("基准测试报告", level=0)
+    for section in range(1, 6):
+        document.add_heading(f"第{section}节", level=1)
+        for _ in range(5):
+            document.add_paragraph(SAMPLE_PARAGRAPH)
+    table = document.add_table(rows=21, cols=4)
+    for row in range(21):
+        for col in range(4):
+            table.cell(row, col).text = f"表头{col + 1}" if row == 0 else f"{row}-{col}"
+    document.save(path)
+
+
+def make_table_markdown(path: str, rows: int = TABLE_ROWS) -> None:
+    """大表格Markdown"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("# 大表格基准\n\n")
+        f.write("| 编号 | 名称 | 数量 | 备注 |\n|---|---|---|---|\n")
+        for i in range(rows):
+            f.write(f"| {i} | 项目{i} | {i * 3 % 97} | 备注内容{i % 13} |\n")
+
+
+def make_xlsx(path: str, rows: int = XLSX_ROWS) -> None:
+    """多工作表的Excel台账"""
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    for sheet_no in range(2):
+        sheet = workbook.create_sheet(f"台账{sheet_no + 1}")
+        sheet.append(["日期", "科目", "金额", "摘要"])
+        for i in range(rows // 2):
+            sheet.append([f"2024-01-{i % 28 + 1:02d}", f"科目{i % 17}", i * 1.5, f"摘要{i}"])
+    workbook.save(path)
+
+
+def make_gbk_text(path: str, paragraphs: int = 200) -> None:
+    """GBK 编码的纯文本（中文 Windows 记事本的常见保存格式）"""
+    with open(path, 'w', encoding='gbk') as f:
+        for i in range(paragraphs):
+            f.write(f"第{i + 1}段 {SAMPLE_PARAGRAPH}\n\n")
+
+
+def make_html(path: str, sections: int = 20) -> None:
+    """带标题、段落、列表和表格的网页"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<!DOCTYPE html><html><head><meta charset="utf-8"><title>基准测试</title>'
+                '<style>body { font-family: sans-serif; }</style></head><body>\n')
+        for section in range(1, sections + 1):
+            f.write(f"<h2>第{section}节</h2>\n")
+            for _ in range(5):
+                f.write(f"<p>{SAMPLE_PARAGRAPH} <a href=\"https://example.com/{section}\">链接</a></p>\n")
+            f.write("<ul>" + "".join(f"<li>要点{i}</li>" for i in range(5)) + "</ul>\n")
+        f.write("<table><tr><th>编号</th><th>名称</th><th>数量</th></tr>\n")
+        for i in range(200):
+            f.write(f"<tr><td>{i}</td><td>项目{i}</td><td>{i * 3 % 97}</td></tr>\n")
+        f.write("</table></body></html>\n")
+
+
+def make_csv(path: str, rows: int = XLSX_ROWS * 10) -> None:
+    """导出的大流水账CSV（测试流式读取的内存占用）"""
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write("日期,科目,金额,摘要\n")
+        for i in range(rows):
+            f.write(f"2024-01-{i % 28 + 1:02d},科目{i % 17},{i * 1.5},摘要{i}\n")
+
+
+def make_cjk_markdown(path: str, sections: int = 10, math: bool = False) -> None:
+    """中英混排的报告型 Markdown（标题、段落、列表、表格），math=True 时每节加入公式块"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("# 基准测试报告\n\n")
+        for section in range(1, sections + 1):
+            f.write(f"## 第{section}章\n\n")
+            for _ in range(4):
+                f.write(f"{SAMPLE_PARAGRAPH}\n\n")
+            f.write("".join(f"- 要点{i}：{SAMPLE_PARAGRAPH[:20]}\n" for i in range(4)) + "\n")
+            f.write("| 编号 | 名称 | 数量 |\n|---|---|---|\n")
+            f.write("".join(f"| {i} | 项目{i} | {i * 7 % 97} |\n" for i in range(10)) + "\n")
+            if math:
+                f.write(f"$$\\sum_{{i=1}}^{{{section}}} x_i^2 = \\int_0^1 f(t)\\,dt$$\n\n")
+
+
+def make_fake_caj(path: str, pdf_path: str) -> None:
+    """扩展名为 .caj 的 PDF（知网常见情况）"""
+    with open(pdf_path, 'rb') as src, open(path, 'wb') as dst:
+        dst.write(src.read())
+
+
+# 输入类型 -> (文件名, 生成函数)
+GENERATORS: Dict[str, tuple] = {
+    'text_pdf': ('text.pdf', make_text_pdf),
+    'scanned_pdf': ('scanned.pdf', make_scanned_pdf),
+    'docx': ('report.docx', make_docx),
+    'table_md': ('table.md', make_table_markdown),
+    'xlsx': ('ledger.xlsx', make_xlsx),
+    'csv': ('ledger.csv', make_csv),
+    'gbk_txt': ('notes_gbk.txt', make_gbk_text),
+    'html': ('page.html', make_html),
+}
+
+
+def build_corpus(target_dir: str) -> Dict[str, str]:
+    """
+    生成语料
+
+    Args:
+        target_dir: 输出目录
+
+    Returns:
+        dict: 输入类型 -> 文件路径（生成失败的类型不在其中）
+    """
+    os.makedirs(target_dir, exist_ok=True)
+    corpus: Dict[str, str] = {}
+    for input_type, (filename, generator) in GENERATORS.items():
+        path = os.path.join(target_dir, filename)
+        try:
+            generator(path)
+            corpus[input_type] = path
+        except ImportError as e:
+            logger.warning(f"跳过 {input_type}: 缺少依赖 {e}")
+        except Exception as e:
+            logger.warning(f"生成 {input_type} 失败: {e}")
+
+    if 'text_pdf' in corpus:
+        caj_path = os.path.join(target_dir, 'wrapped.caj')
+        make_fake_caj(caj_path, corpus['text_pdf'])
+        corpus['fake_caj'] = caj_path
+    return corpus
+
+
+def count_pages(path: str) -> Optional[int]:
+    """PDF类输入的页数，其它类型返回 None"""
+    try:
+        fitz = _require_fitz()
+        with open(path, 'rb') as f:
+            if not f.read(4) == b'%PDF':
+                return None
+        with fitz.open(path, filetype='pdf') as doc:
+            return doc.page_count
+    except Exception:
+        return None
@@ -0,0 +1,88 @@
+"""
+/convert 接口压测脚本
+并发上传同一个小文件，统计吞吐量与延迟分位数，用于对比开发服务器与 gunicorn 生产配置
+
+用法:
+    # 终端1: python app.py                               （开发服务器）
+    #    或: gunicorn -c gunicorn.conf.py wsgi:app        （生产配置）
+    # 终端2:
+    python -m benchmarks.load_test --url http://localhost:5000 --concurrency 8 --requests 200
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+SAMPLE_MARKDOWN = "# 压测文档\n\n" + "小羊的工具箱压测段落。Load test paragraph.\n\n" * 20 + \
+    "| 列1 | 列2 |\n|---|---|\n" + "".join(f"| {i} | 值{i} |\n" for i in range(50))
+
+
+def convert_once(url: str, file_path: str, export_format: str) -> tuple:
+    """发送一次转换请求，返回 (是否成功, 耗时秒)"""
+    start = time.perf_counter()
+    try:
+        with open(file_path, 'rb') as f:
+            response = requests.post(
+                f"{url}/convert",
+                files={'file': (os.path.basename(file_path), f)},
+                data={'export_format': export_format},
+                timeout=600
+            )
+        ok = response.status_code == 200
+    except requests.RequestException:
+        ok = False
+    return ok, time.perf_counter() - start
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="/convert 并发压测")
+    parser.add_argument('--url', default='http://localhost:5000', help="服务地址")
+    parser.add_argument('--file', help="上传的文件（默认生成一个小Markdown）")
+    parser.add_argument('--export-format', default='XLSX', help="目标格式")
+    parser.add_argument('--concurrency', type=int, default=8, help="并发数")
+    parser.add_argument('--requests', type=int, default=100, help="请求总数")
+    args = parser.parse_args()
+
+    file_path = args.file
+    if not file_path:
+        fd, file_path = tempfile.mkstemp(suffix='.md')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(SAMPLE_MARKDOWN)
+
+    # 预热一次，排除首个请求的模型加载
+    convert_once(args.url, file_path, args.export_format)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(
+            lambda _: convert_once(args.url, file_path, args.export_format),
+            range(args.requests)
+        ))
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for ok, latency in results if ok]
+    failures = sum(1 for ok, _ in results if not ok)
+    print(f"目标: {args.url}  并发: {args.concurrency}  请求: {args.requests}  格式: {args.export_format}")
+    print(f"总耗时: {elapsed:.2f}s  吞吐量: {len(latencies) / elapsed:.2f} req/s  失败: {failures}")
+    if latencies:
+        print(f"延迟 p50={percentile(latencies, 50) * 1000:.0f}ms  "
+              f"p95={percentile(latencies, 95) * 1000:.0f}ms  "
+              f"p99={percentile(latencies, 99) * 1000:.0f}ms  "
+              f"mean={statistics.mean(latencies) * 1000:.0f}ms")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""
+基准测试度量工具
+墙钟时间、CPU时间（含子进程）和运行期间的峰值RSS
+"""
+
+import os
+import sys
+import time
+import threading
+import resource
+from typing import Callable, Optional
+
+# 尝试导入psutil（可选，用于跨平台读取RSS）
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+
+def current_rss_bytes() -> Optional[int]:
+    """读取当前进程RSS，无法获取时返回 None"""
+    if PSUTIL_AVAILABLE:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def children_maxrss_mb() -> float:
+    """子进程（pandoc、LaTeX 等）历史最大RSS"""
+    maxrss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return maxrss / 1024 / 1024 if sys.platform == 'darwin' else maxrss / 1024
+
+
+class RssSampler(threading.Thread):
+    """后台线程周期采样RSS，记录运行期间的峰值"""
+
+    def __init__(self, interval: float = 0.01):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = current_rss_bytes() or 0
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.is_set():
+            rss = current_rss_bytes()
+            if rss is not None and rss > self.peak:
+                self.peak = rss
+            self._stop_event.wait(self.interval)
+
+    def stop(self) -> int:
+        """停止采样并返回峰值（字节）"""
+        self._stop_event.set()
+        self.join()
+        if current_rss_bytes() is None:
+            # 无法采样时退回进程生命周期最大值
+            maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            self.peak = maxrss if sys.platform == 'darwin' else maxrss * 1024
+        return self.peak
+
+
+def measure(func: Callable[[], None]) -> dict:
+    """
+    运行一次函数并采集指标
+
+    Returns:
+        dict: wall_s、cpu_s（本进程 + 子进程）、peak_rss_mb
+    """
+    sampler = RssSampler()
+    sampler.start()
+    self_before = resource.getrusage(resource.RUSAGE_SELF)
+    children_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    start = time.perf_counter()
+    try:
+        func()
+    finally:
+        wall = time.perf_counter() - start
+        self_after = resource.getrusage(resource.RUSAGE_SELF)
+        children_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+        peak = sampler.stop()
+
+    cpu = ((self_after.ru_utime - self_before.ru_utime) + (self_after.ru_stime - self_before.ru_stime)
+           + (children_after.ru_utime - children_before.ru_utime)
+           + (children_after.ru_stime - children_before.ru_stime))
+    return {
+        'wall_s': wall,
+        'cpu_s': cpu,
+        'peak_rss_mb': peak / 1024 / 1024,
+    }
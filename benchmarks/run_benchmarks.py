@@ -0,0 +1,195 @@
+"""
+转换矩阵基准测试
+对合成语料运行 (输入类型 × 导出格式) 的全部路线，记录指标并与基线比较
+
+用法:
+    python -m benchmarks.run_benchmarks                      # 运行并与基线比较
+    python -m benchmarks.run_benchmarks --update-baseline    # 以本次结果作为新基线
+    python -m benchmarks.run_benchmarks --routes pdf --repeat 3
+
+退出码: 0 正常，1 存在性能回归
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import fnmatch
+import argparse
+import platform
+import tempfile
+import logging
+from typing import Dict, List, Optional
+
+# 允许从仓库根目录直接运行
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import build_corpus, count_pages
+from benchmarks.metrics import measure
+from modules.capabilities import required_capabilities
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ['MARKDOWN', 'TEXT', 'PDF', 'DOCX', 'XLSX', 'CSV']
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+OUTPUT_EXTENSIONS = {'MARKDOWN': 'md', 'TEXT': 'txt', 'PDF': 'pdf', 'DOCX': 'docx', 'XLSX': 'xlsx', 'CSV': 'csv'}
+
+
+def detect_backends() -> Dict[str, bool]:
+    """检测本机已安装的转换后端（与 worker 登记的能力一致）"""
+    from modules.capabilities import ALL_CAPABILITIES, detect_capabilities
+
+    available = set(detect_capabilities())
+    return {name: name in available for name in ALL_CAPABILITIES}
+
+
+def run_route(converter, input_path: str, export_format: str, work_dir: str, repeat: int) -> dict:
+    """运行单条路线若干次，返回最佳耗时与最大内存"""
+    input_ext = input_path.rsplit('.', 1)[1].lower()
+    output_path = os.path.join(work_dir, f"out.{OUTPUT_EXTENSIONS[export_format]}")
+    runs = []
+    for _ in range(repeat):
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        runs.append(measure(lambda: converter.convert_document(input_path, output_path, export_format)))
+
+    best = min(runs, key=lambda run: run['wall_s'])
+    pages = count_pages(input_path) if input_ext in ('pdf', 'caj') else None
+    return {
+        'status': 'ok',
+        'wall_s': round(best['wall_s'], 4),
+        'cpu_s': round(best['cpu_s'], 4),
+        'peak_rss_mb': round(max(run['peak_rss_mb'] for run in runs), 1),
+        'pages': pages,
+        'pages_per_sec': round(pages / best['wall_s'], 3) if pages and best['wall_s'] > 0 else None,
+        'output_bytes': os.path.getsize(output_path) if os.path.exists(output_path) else 0,
+    }
+
+
+def run_matrix(corpus: Dict[str, str], patterns: Optional[List[str]], repeat: int) -> Dict[str, dict]:
+    """运行转换矩阵"""
+    from modules.document_converter import get_document_converter
+
+    converter = get_document_converter()
+    backends = detect_backends()
+    logger.info(f"可用后端: {backends}")
+
+    results: Dict[str, dict] = {}
+    for input_type, input_path in corpus.items():
+        input_ext = input_path.rsplit('.', 1)[1].lower()
+        for export_format in EXPORT_FORMATS:
+            route = f"{input_type}->{export_format}"
+            if patterns and not any(fnmatch.fnmatch(route, f"*{p}*") for p in patterns):
+                continue
+
+            required = required_capabilities(input_ext, export_format, input_path)
+            missing = [name for name in required if not backends.get(name)]
+            if missing:
+                results[route] = {'status': 'skipped', 'reason': f"缺少后端: {', '.join(missing)}"}
+                print(f"⏭️  {route:<28} 跳过（缺少 {', '.join(missing)}）")
+                continue
+
+            work_dir = tempfile.mkdtemp(prefix='bench_')
+            try:
+                # 每条路线使用独立副本，避免输出或临时文件互相影响
+                local_input = os.path.join(work_dir, os.path.basename(input_path))
+                shutil.copy2(input_path, local_input)
+                result = run_route(converter, local_input, export_format, work_dir, repeat)
+                pps = f"{result['pages_per_sec']:.2f} 页/秒" if result['pages_per_sec'] else ''
+                print(f"✅ {route:<28} {result['wall_s']:>8.3f}s  CPU {result['cpu_s']:>8.3f}s  "
+                      f"RSS {result['peak_rss_mb']:>8.1f}MB  {pps}")
+            except Exception as e:
+                status = 'unsupported' if '不支持的转换' in str(e) else 'failed'
+                result = {'status': status, 'reason': str(e)[:500]}
+                print(f"{'➖' if status == 'unsupported' else '❌'} {route:<28} {status}: {str(e)[:120]}")
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+            results[route] = result
+    return results
+
+
+def compare_with_baseline(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float,
+                          rss_threshold: float, min_delta: float) -> List[str]:
+    """
+    与基线比较，返回回归描述列表
+
+    只比较两边都成功的路线；耗时需同时超过相对阈值和绝对噪声下限才算回归。
+    """
+    regressions = []
+    for route, current in sorted(results.items()):
+        previous = baseline.get(route)
+        if not previous or previous.get('status') != 'ok' or current.get('status') != 'ok':
+            continue
+        if (current['wall_s'] > previous['wall_s'] * (1 + threshold)
+                and current['wall_s'] - previous['wall_s'] > min_delta):
+            regressions.append(f"{route}: 耗时 {previous['wall_s']:.3f}s -> {current['wall_s']:.3f}s")
+        if current['peak_rss_mb'] > previous['peak_rss_mb'] * (1 + rss_threshold):
+            regressions.append(f"{route}: 峰值RSS {previous['peak_rss_mb']:.1f}MB -> {current['peak_rss_mb']:.1f}MB")
+    # 基线成功而本次失败也视为回归
+    for route, previous in baseline.items():
+        current = results.get(route)
+        if previous.get('status') == 'ok' and current and current.get('status') == 'failed':
+            regressions.append(f"{route}: 基线成功但本次失败（{current.get('reason', '')[:80]}）")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="文档转换矩阵基准测试")
+    parser.add_argument('--output', default='bench_results.json', help="结果JSON路径")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="基线JSON路径")
+    parser.add_argument('--update-baseline', action='store_true', help="用本次结果覆盖基线")
+    parser.add_argument('--threshold', type=float, default=0.25, help="耗时回归阈值（相对值）")
+    parser.add_argument('--rss-threshold', type=float, default=0.5, help="峰值RSS回归阈值（相对值）")
+    parser.add_argument('--min-delta', type=float, default=0.05, help="耗时回归的绝对噪声下限（秒）")
+    parser.add_argument('--repeat', type=int, default=1, help="每条路线的重复次数（取最佳）")
+    parser.add_argument('--routes', nargs='*', help="只运行名称包含这些片段的路线")
+    parser.add_argument('--corpus-dir', help="语料目录（默认临时目录）")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s - %(name)s - %(message)s')
+
+    corpus_dir = args.corpus_dir or tempfile.mkdtemp(prefix='bench_corpus_')
+    corpus = build_corpus(corpus_dir)
+    print(f"📦 语料: {', '.join(corpus)} ({corpus_dir})")
+
+    started = time.time()
+    results = run_matrix(corpus, args.routes, args.repeat)
+    report = {
+        'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'duration_s': round(time.time() - started, 1),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'backends': detect_backends(),
+        },
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"📝 结果已写入: {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📌 基线已更新: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("ℹ️  没有基线文件，使用 --update-baseline 生成")
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f).get('results', {})
+    regressions = compare_with_baseline(results, baseline, args.threshold, args.rss_threshold, args.min_delta)
+    if regressions:
+        print("\n🚨 检测到性能回归:")
+        for line in regressions:
+            print(f"  - {line}")
+        return 1
+    print("\n✅ 未检测到性能回归")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
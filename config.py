@@ -3,8 +3,18 @@ import os
 class Config:
     # Server Configuration
     PORT = int(os.getenv('PORT', 5000))
-    DEBUG = True
-    LOG_LEVEL = os.getenv('LOG_LEVEL', 'DEBUG')
+    DEBUG = os.getenv('FLASK_DEBUG', 'false').lower() == 'true'  # 仅开发环境开启
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_FILE = os.getenv('LOG_FILE', 'app.log')
+    LOG_JSON = os.getenv('LOG_JSON', 'true').lower() == 'true'  # 文件日志使用结构化JSON
+    LOG_MAX_BYTES = 10 * 1024 * 1024  # 单个日志文件上限，超过后滚动
+    LOG_BACKUP_COUNT = 5
+    # size：进程内按 LOG_MAX_BYTES 滚动（仅单进程写日志时安全）；external：WatchedFileHandler，由 logrotate 等外部工具滚动
+    LOG_ROTATE = os.getenv('LOG_ROTATE', 'size')
+    LOG_QUEUE_SIZE = 10000  # 异步日志队列容量，满时丢弃而不阻塞
+    LOG_DEBUG_SAMPLE_RATE = float(os.getenv('LOG_DEBUG_SAMPLE_RATE', 1.0))  # DEBUG日志采样比例
+    LOG_DEBUG_RATE_LIMIT = 20  # 每个调用位置每秒最多输出的DEBUG条数
+    LOG_MAX_RECORDS_PER_REQUEST = 200  # 单个请求最多输出的INFO及以下日志条数
     
     # File Upload Configuration
     UPLOAD_FOLDER = 'uploads'
@@ -19,11 +29,97 @@ class Config:
         'html': 'text/html',
         'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
         'xls': 'application/vnd.ms-excel',
+        'csv': 'text/csv',
         'caj': 'application/caj',  # 中国知网CAJ格式
     }
     
     # Conversion Settings
     CONVERSION_TIMEOUT = 300  # seconds
+    PREVIEW_DEFAULT_PAGES = int(os.getenv('PREVIEW_DEFAULT_PAGES', 3))  # preview=true 时预览的页数
+    PREVIEW_MAX_PAGES = int(os.getenv('PREVIEW_MAX_PAGES', 10))  # 单次预览最多页数
+    PREVIEW_LATENCY_BUDGET = float(os.getenv('PREVIEW_LATENCY_BUDGET', 15))  # 预览等待上限（秒），按耗时模型缩减预览页数
+    LIGHT_CONVERTERS_ENABLED = os.getenv('LIGHT_CONVERTERS_ENABLED', 'true').lower() == 'true'  # HTML/DOCX转Markdown优先使用轻量解析
+    PDF_ENGINE = os.getenv('PDF_ENGINE', 'auto')  # Markdown转PDF：auto（公式密集时xelatex，否则weasyprint）/ weasyprint / xelatex
+    PDF_FONT_FAMILY = os.getenv('PDF_FONT_FAMILY', '"Noto Sans CJK SC", "Source Han Sans SC", "PingFang SC", '
+                                '"Microsoft YaHei", SimSun, sans-serif')  # WeasyPrint 排版使用的字体列表
+    PDF_RENDERER_WARMUP = os.getenv('PDF_RENDERER_WARMUP', 'false').lower() == 'true'  # 进程启动后预加载CJK字体
+    OUTPUT_OPTIMIZE_ENABLED = os.getenv('OUTPUT_OPTIMIZE_ENABLED', 'true').lower() == 'true'  # 无损压缩 PDF/DOCX 结果体积（字体子集化、对象去重、重新打包）
+    OUTPUT_LOSSY_IMAGES = os.getenv('OUTPUT_LOSSY_IMAGES', 'false').lower() == 'true'  # 内嵌图片降采样重压缩（有损）
+    OUTPUT_IMAGE_DPI = int(os.getenv('OUTPUT_IMAGE_DPI', 150))  # 内嵌图片降采样的目标分辨率
+    OUTPUT_JPEG_QUALITY = int(os.getenv('OUTPUT_JPEG_QUALITY', 80))  # 重压缩图片的 JPEG 质量
+    GZIP_TEXT_RESULTS = os.getenv('GZIP_TEXT_RESULTS', 'true').lower() == 'true'  # 客户端支持时以 gzip 传输文本结果
+
+    # Job Store Settings
+    JOB_FOLDER = os.getenv('JOB_FOLDER', 'jobs')  # 每个任务一个子目录，存放输入和结果
+    JOB_DB_PATH = os.getenv('JOB_DB_PATH', os.path.join(JOB_FOLDER, 'jobs.db'))
+    JOB_QUEUE = os.getenv('JOB_QUEUE', 'sqlite')  # 共享任务队列实现：sqlite 或 '模块:类名'
+    ARTIFACT_STORE = os.getenv('ARTIFACT_STORE', 'filesystem')  # 任务文件存储实现：filesystem 或 '模块:类名'
+    ARTIFACT_ROOT = os.getenv('ARTIFACT_ROOT', JOB_FOLDER)  # 多机部署时指向共享目录
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))  # Web 进程内的并发转换线程数，0 表示全部交给独立 worker
+    JOB_RESULT_TTL = int(os.getenv('JOB_RESULT_TTL', 24 * 3600))  # 结果保留时间（秒）
+    RESULT_REUSE_ENABLED = os.getenv('RESULT_REUSE_ENABLED', 'true').lower() == 'true'  # 相同输入、格式和选项复用保留期内的结果
+    JOB_MAX_ATTEMPTS = 3  # 中断后最多重试次数
+    JOB_STALE_AFTER = 120  # 运行中任务心跳超时（秒），超时视为所属进程已退出
+    JOB_JANITOR_INTERVAL = 15  # 心跳、恢复和清理的间隔（秒）
+    WORKER_CAPABILITIES = os.getenv('WORKER_CAPABILITIES', 'auto')  # 独立 worker 的能力，auto 表示自动检测
+    WORKER_POLL_INTERVAL = float(os.getenv('WORKER_POLL_INTERVAL', 1.0))  # 队列为空时的轮询间隔（秒）
+    SCHEDULER_POLICY = os.getenv('SCHEDULER_POLICY', 'cost')  # cost：预计耗时短者优先 + 公平分配；fifo：先进先出
+    SCHEDULER_AGING_RATE = float(os.getenv('SCHEDULER_AGING_RATE', 0.1))  # 每等待1秒抵扣的预计耗时秒数，防止大任务饿死
+    SCHEDULER_FAIR_SHARE_WEIGHT = float(os.getenv('SCHEDULER_FAIR_SHARE_WEIGHT', 1.0))  # 客户端运行中和排队中预计耗时的惩罚权重
+    ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', 'true').lower() == 'true'  # 按预计峰值内存决定任务何时开始
+    WORKER_MEMORY_BUDGET_MB = int(os.getenv('WORKER_MEMORY_BUDGET_MB', 0))  # 主机的转换内存预算（同一主机上的执行进程共享），0 表示物理内存的60%
+    ADMISSION_MAX_WAIT = 300  # 大任务等待内存超过该秒数后，暂停放行其它任务
+    MEMORY_SAMPLE_INTERVAL = 0.2  # 任务执行期间采样 RSS 的间隔（秒）
+
+    # Search Index Settings
+    SEARCH_INDEX_ENABLED = os.getenv('SEARCH_INDEX_ENABLED', 'false').lower() == 'true'  # 成功的转换写入本地全文索引（/search 需要 ADMIN_TOKEN）
+    SEARCH_INDEX_PATH = os.getenv('SEARCH_INDEX_PATH', os.path.join(JOB_FOLDER, 'search.db'))  # 不随任务过期清理
+    SEARCH_MAX_RESULTS = 50  # /search 单次最多返回的文档数
+
+    # Production Serving Settings (gunicorn.conf.py)
+    CONVERSION_PROFILE = os.getenv('CONVERSION_PROFILE', 'mixed')  # ocr / light / mixed
+    WORKER_MAX_REQUESTS = int(os.getenv('WORKER_MAX_REQUESTS', 200))  # 处理多少请求后回收worker
+    WORKER_MAX_RSS_MB = int(os.getenv('WORKER_MAX_RSS_MB', 4096))  # worker内存超过该值后回收，0表示不限
+    
+    # MCP Server Settings (mcp_server.py)
+    MCP_INLINE_BYTES = int(os.getenv('MCP_INLINE_BYTES', 64 * 1024))  # 不超过该大小的文本结果直接内联返回
+    MCP_CHUNK_BYTES = int(os.getenv('MCP_CHUNK_BYTES', 256 * 1024))  # 较大结果按该大小分块作为资源返回
+    MCP_ALLOWED_ROOTS = os.getenv('MCP_ALLOWED_ROOTS', '')  # 允许转换的目录（os.pathsep 分隔），为空时只允许 stdio 传输且不限制
+    
+    # Fallback Engine Settings
+    FALLBACK_RACE_ENABLED = os.getenv('FALLBACK_RACE_ENABLED', 'false').lower() == 'true'  # 交互式请求并行竞速
+    FALLBACK_MEMORY_SIZE = int(os.getenv('FALLBACK_MEMORY_SIZE', 1024))  # 指纹记忆条目数
+    FALLBACK_TRIAL_MAX_PAGES = 20  # pdf2docx 预检最多扫描的页数
+    
+    # Profiling Settings
+    PROFILE_FOLDER = 'profiles'  # 分析文件与任务结果一样保留 JOB_RESULT_TTL
+    PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))  # 随机分析的请求比例（0~1）
+    PROFILE_INTERVAL = 0.005  # 采样间隔（秒）
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')  # 为空时关闭管理接口；X-Profile 请求头也只对带令牌的请求生效
+    
+    # Docling Export Settings
+    DOCLING_NATIVE_EXPORT = os.getenv('DOCLING_NATIVE_EXPORT', 'true').lower() == 'true'  # DOCX/XLSX 直接从文档树导出
+    CHUNK_SIZE = int(os.getenv('CHUNK_SIZE', 1000))  # JSONL 分块每块正文的最大字符数
+    CHUNK_OVERLAP = int(os.getenv('CHUNK_OVERLAP', 100))  # 相邻文本块重叠的字符数（不超过块大小的一半）
+    CHUNK_STREAM_PAGES = int(os.getenv('CHUNK_STREAM_PAGES', 10))  # JSONL 导出时 PDF 每段转换的页数，0 表示整本转换后再分块
+    
+    # OCR Settings
+    OCR_PROFILE = os.getenv('OCR_PROFILE', 'auto')  # fast / balanced / accurate / auto（按页面质量选择）
+    OCR_WARMUP = os.getenv('OCR_WARMUP', 'off')  # off / load（加载模型）/ infer（额外做一次识别）
+    ONNX_CACHE_ENABLED = os.getenv('ONNX_CACHE_ENABLED', 'true').lower() == 'true'  # 缓存图优化后的OCR模型
+    ONNX_CACHE_DIR = os.getenv('ONNX_CACHE_DIR', os.path.join('cache', 'onnx'))
+    
+    # OCR Batching Settings
+    OCR_BATCH_ENABLED = os.getenv('OCR_BATCH_ENABLED', 'false').lower() == 'true'  # 合并多页、多任务的文本行批量识别
+    OCR_BATCH_SIZE = int(os.getenv('OCR_BATCH_SIZE', 32))  # 每批识别的文本行数
+    OCR_BATCH_MAX_WAIT_MS = float(os.getenv('OCR_BATCH_MAX_WAIT_MS', 20))  # 凑批的最长等待时间（毫秒）
+    OCR_BATCH_WIDTH_BUCKET = float(os.getenv('OCR_BATCH_WIDTH_BUCKET', 2.0))  # 文本行宽高比补齐的档位步长，0 表示不补齐
+    OCR_BATCH_PAGE_THREADS = int(os.getenv('OCR_BATCH_PAGE_THREADS', 4))  # 同一页批次中并发识别的页数（不超过 Docling 的页批大小）
+    
+    # OCR Page Cache Settings
+    OCR_PAGE_CACHE_ENABLED = os.getenv('OCR_PAGE_CACHE_ENABLED', 'true').lower() == 'true'  # 按 OCR 输入图像复用识别结果（只作用于需要 OCR 的页面，所有导出格式都受益）
+    OCR_PAGE_CACHE_PATH = os.getenv('OCR_PAGE_CACHE_PATH', os.path.join('cache', 'ocr_pages.db'))
+    OCR_PAGE_CACHE_MAX_MB = int(os.getenv('OCR_PAGE_CACHE_MAX_MB', 512))  # 缓存内容总大小上限
     
     @staticmethod
     def allowed_file(filename):
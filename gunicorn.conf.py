@@ -0,0 +1,112 @@
+"""
+gunicorn 生产配置
+预加载应用（Docling/OCR 模型在 fork 前只加载一次），按转换负载类型选择 worker，
+并按请求数或内存阈值回收 worker
+
+用法:
+    gunicorn -c gunicorn.conf.py wsgi:app
+    CONVERSION_PROFILE=ocr gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+import os
+import sys
+import logging
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+
+# 多个 worker 共用同一个日志文件，各自按大小滚动会丢失记录；默认改为由 logrotate 滚动（LOG_ROTATE 可覆盖）
+Config.LOG_ROTATE = os.getenv('LOG_ROTATE', 'external')
+
+# --- 基础 ---
+bind = f"0.0.0.0:{Config.PORT}"
+# fork 前导入 wsgi:app，所有 worker 共享已加载的模型和只读状态（写时复制）
+preload_app = True
+reload = False
+timeout = Config.CONVERSION_TIMEOUT + 30
+graceful_timeout = 60
+keepalive = 5
+
+# --- 按转换负载选择 worker 类型 ---
+# ocr:   Docling + RapidOCR，CPU 密集且单任务已多线程，少量同步进程
+# light: Markdown/pandoc 为主，I/O 与子进程等待多，线程型 worker
+# mixed: 默认，两者兼顾
+cpu_count = multiprocessing.cpu_count()
+PROFILES = {
+    'ocr': {'worker_class': 'sync', 'workers': max(1, cpu_count // 4), 'threads': 1},
+    'light': {'worker_class': 'gthread', 'workers': max(2, cpu_count), 'threads': 4},
+    'mixed': {'worker_class': 'gthread', 'workers': max(1, cpu_count // 2), 'threads': 2},
+}
+profile = PROFILES.get(Config.CONVERSION_PROFILE, PROFILES['mixed'])
+worker_class = profile['worker_class']
+workers = int(os.getenv('WEB_CONCURRENCY', profile['workers']))
+threads = int(os.getenv('GUNICORN_THREADS', profile['threads']))
+
+# --- worker 回收（Docling/pdf2docx 长期运行内存会增长）---
+max_requests = Config.WORKER_MAX_REQUESTS
+max_requests_jitter = max(1, Config.WORKER_MAX_REQUESTS // 10)
+
+# --- 日志 ---
+accesslog = '-'
+errorlog = '-'
+loglevel = Config.LOG_LEVEL.lower()
+
+
+def _rss_mb():
+    """读取当前进程RSS（MB），无法读取时返回 None"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1024 / 1024
+    except ImportError:
+        return None
+
+
+def when_ready(server):
+    server.log.info(
+        f"🐑 生产模式启动: profile={Config.CONVERSION_PROFILE}, worker={worker_class}, "
+        f"workers={workers}, threads={threads}, max_requests={max_requests}, "
+        f"max_rss={Config.WORKER_MAX_RSS_MB}MB"
+    )
+
+
+def post_fork(server, worker):
+    # 子进程中重新启动异步日志线程（线程不会随 fork 继承）
+    from modules import logging_setup
+    logging_setup.restart_after_fork()
+
+
+def post_worker_init(worker):
+    # 每个 worker 各自启动任务执行器（线程和数据库连接不能在 master 中创建后 fork）
+    # 启动时会接管心跳超时的中断任务
+    from modules.job_runner import get_job_runner
+    get_job_runner()
+    # OCR 推理会话的线程池不能跨 fork，预热放在 worker 内进行
+    from modules.docling_service import warm_up_ocr
+    warm_up_ocr(Config.OCR_WARMUP)
+    # 字体配置同样在 worker 内创建
+    from modules.pdf_renderer import warm_up_pdf_renderer
+    warm_up_pdf_renderer(Config.PDF_RENDERER_WARMUP)
+
+
+def worker_exit(server, worker):
+    # 回收（内存阈值、max_requests）或重启时，本 worker 运行中的任务立即放回队列，由其它 worker 接手，
+    # 不必等到心跳超时（JOB_STALE_AFTER）
+    from modules.job_runner import release_job_runner
+    release_job_runner(f"worker {worker.pid} 退出")
+
+
+def post_request(worker, req, environ, resp):
+    """请求结束后检查内存，超过阈值时让 worker 处理完当前请求后优雅退出"""
+    if not Config.WORKER_MAX_RSS_MB:
+        return
+    rss = _rss_mb()
+    if rss is not None and rss > Config.WORKER_MAX_RSS_MB:
+        worker.log.warning(f"worker {worker.pid} RSS {rss:.0f}MB 超过阈值 {Config.WORKER_MAX_RSS_MB}MB，准备回收")
+        worker.alive = False
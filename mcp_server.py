@@ -0,0 +1,369 @@
+"""
+小羊的工具箱 - MCP 工具服务
+把文档转换作为 MCP 工具提供给智能体：convert_document、convert_batch、detect_format
+
+任务写入与 Web 应用相同的任务表和文件存储，由已预热 Docling/OCR 的 Web 进程或独立 worker 执行，
+相同输入的结果直接复用；较大的结果以分块资源 conversion://{job_id}/chunks/{index} 返回，
+避免一次消息传输整份文档。
+
+用法:
+    python mcp_server.py                          # stdio（本机智能体）
+    MCP_ALLOWED_ROOTS=/data/papers python mcp_server.py --transport sse --port 8765
+    python mcp_server.py --workers 2              # 本进程也执行任务（没有在线 worker 时）
+"""
+
+import os
+import time
+import asyncio
+import logging
+import zipfile
+import argparse
+from typing import Any, Dict, List, Optional, Tuple
+
+# 与 app.py 一致：导入转换模块前设置离线模式
+os.environ['HF_HUB_OFFLINE'] = '1'
+os.environ['TRANSFORMERS_OFFLINE'] = '1'
+os.environ['HF_DATASETS_OFFLINE'] = '1'
+os.environ['HF_HUB_DISABLE_IMPLICIT_TOKEN'] = '1'
+
+from mcp.server.fastmcp import Context, FastMCP
+
+from config import Config
+from modules.logging_setup import setup_logging
+from modules.input_handle import read_header
+from modules.job_store import get_job_store, STATE_RUNNING, STATE_SUCCEEDED, STATE_FAILED
+from modules.artifact_store import get_artifact_store
+from modules.job_runner import UnroutableJobError, clean_filename, enqueue_conversion, output_extension
+from modules.capabilities import required_capabilities
+from modules.scheduler import estimate_job
+from modules.ocr_profiles import OCR_PROFILES, PROFILE_AUTO
+from modules.pdf_renderer import PDF_ENGINES
+
+logger = logging.getLogger('mcp_server')
+
+EXPORT_FORMATS = ('MARKDOWN', 'TEXT', 'PDF', 'DOCX', 'XLSX', 'CSV', 'JSONL')
+# 网络传输：任何能连上端口的客户端都能让服务读取文件，必须配置 MCP_ALLOWED_ROOTS
+NETWORK_TRANSPORTS = ('sse', 'streamable-http')
+# 结果按 UTF-8 文本返回的格式
+TEXT_FORMATS = ('MARKDOWN', 'TEXT', 'CSV', 'JSONL')
+CLIENT_ID = 'mcp'
+POLL_INTERVAL = 0.5
+
+mcp = FastMCP('xiaoyang-converter')
+
+
+def _allowed_roots() -> List[str]:
+    """MCP_ALLOWED_ROOTS 中的目录（解析符号链接后的真实路径）"""
+    return [os.path.realpath(os.path.expanduser(root)) for root in Config.MCP_ALLOWED_ROOTS.split(os.pathsep) if root]
+
+
+def _check_path(path: str) -> str:
+    """校验输入路径：存在、扩展名受支持、真实路径位于 MCP_ALLOWED_ROOTS 内"""
+    # 解析符号链接和 ..，避免通过允许目录内的链接读取目录外的文件
+    path = os.path.realpath(os.path.expanduser(path))
+    if not os.path.isfile(path):
+        raise ValueError(f"文件不存在: {path}")
+    if not Config.allowed_file(path):
+        raise ValueError(f"不支持的文件类型: {path}")
+    roots = _allowed_roots()
+    if roots and not any(os.path.commonpath([path, root]) == root for root in roots):
+        raise ValueError(f"路径不在允许的目录内: {path}")
+    return path
+
+
+def _options(ocr_profile: Optional[str], pdf_engine: Optional[str], upright: bool,
+             chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None) -> Dict[str, Any]:
+    options: Dict[str, Any] = {}
+    if ocr_profile:
+        ocr_profile = ocr_profile.lower()
+        if ocr_profile not in OCR_PROFILES and ocr_profile != PROFILE_AUTO:
+            raise ValueError(f"未知的 OCR 档位: {ocr_profile}")
+        options['ocr_profile'] = ocr_profile
+    if pdf_engine:
+        pdf_engine = pdf_engine.lower()
+        if pdf_engine not in PDF_ENGINES:
+            raise ValueError(f"未知的 PDF 引擎: {pdf_engine}")
+        options['pdf_engine'] = pdf_engine
+    if upright:
+        options['upright'] = True
+    if chunk_size:
+        options['chunk_size'] = chunk_size
+    if chunk_overlap is not None:
+        options['chunk_overlap'] = chunk_overlap
+    return options
+
+
+def _submit(path: str, export_format: str, options: Dict[str, Any]) -> Tuple[str, bool]:
+    """登记任务（与 Web 接口相同的路由、复用和估算逻辑）"""
+    export_format = export_format.upper()
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"不支持的导出格式: {export_format}")
+    name, ext = os.path.basename(path).rsplit('.', 1)
+    return enqueue_conversion(path, f"{clean_filename(name)}.{ext.lower()}", export_format,
+                              options=options, client_id=CLIENT_ID)
+
+
+def chunk_count(size: int) -> int:
+    return max((size + Config.MCP_CHUNK_BYTES - 1) // Config.MCP_CHUNK_BYTES, 1)
+
+
+def _align_utf8(f, position: int, size: int) -> int:
+    """把字节位置后移到 UTF-8 字符边界（跳过续字节），保证文本分块不会截断字符"""
+    if position >= size:
+        return size
+    f.seek(position)
+    for offset, byte in enumerate(f.read(4)):
+        if byte & 0xC0 != 0x80:
+            return position + offset
+    return min(position + 4, size)
+
+
+def read_chunk(path: str, index: int, text: bool) -> bytes:
+    """读取结果文件的第 index 块（不读入整个文件）"""
+    size = os.path.getsize(path)
+    start = index * Config.MCP_CHUNK_BYTES
+    end = start + Config.MCP_CHUNK_BYTES
+    with open(path, 'rb') as f:
+        if text:
+            start, end = _align_utf8(f, start, size), _align_utf8(f, end, size)
+        f.seek(start)
+        return f.read(max(min(end, size) - start, 0))
+
+
+def _job_summary(job: Dict[str, Any], reused: bool) -> Dict[str, Any]:
+    """任务结果：小文本直接内联，其余给出分块资源地址"""
+    summary = {
+        'job_id': job['id'],
+        'state': job['state'],
+        'input_name': job['input_name'],
+        'export_format': job['export_format'],
+        'reused': reused,
+    }
+    if job['state'] == STATE_FAILED:
+        summary['error'] = job['error']
+        return summary
+    if job['state'] != STATE_SUCCEEDED:
+        summary['message'] = "任务仍在执行，稍后用 job_status 查询"
+        return summary
+
+    artifacts = get_artifact_store()
+    if not job['result_path'] or not artifacts.exists(job['result_path']):
+        summary.update(state='expired', error="结果已过期")
+        return summary
+    result_path = artifacts.local_path(job['result_path'])
+    text = job['export_format'] in TEXT_FORMATS
+    summary.update(result_name=job['result_name'], result_size=job['result_size'],
+                   mime_type=Config.ALLOWED_EXTENSIONS.get(output_extension(job['export_format']),
+                                                           'application/octet-stream'))
+    if text and job['result_size'] <= Config.MCP_INLINE_BYTES:
+        with open(result_path, 'r', encoding='utf-8', errors='replace') as f:
+            summary['content'] = f.read()
+    else:
+        summary['chunks'] = [f"conversion://{job['id']}/chunks/{index}"
+                             for index in range(chunk_count(job['result_size']))]
+    return summary
+
+
+async def _wait(job_id: str, timeout: float, ctx: Optional[Context] = None) -> Dict[str, Any]:
+    """轮询任务表直到结束或超时，执行期间按预计耗时上报进度"""
+    store = get_job_store()
+    deadline = time.monotonic() + timeout
+    while True:
+        job = await asyncio.to_thread(store.get, job_id)
+        if job is None or job['state'] in (STATE_SUCCEEDED, STATE_FAILED) or time.monotonic() >= deadline:
+            return job
+        if ctx is not None and job['state'] == STATE_RUNNING and job.get('started_at'):
+            elapsed = time.time() - job['started_at']
+            estimated = job.get('estimated_cost') or Config.CONVERSION_TIMEOUT
+            await ctx.report_progress(min(elapsed / estimated, 0.95), 1.0)
+        await asyncio.sleep(POLL_INTERVAL)
+
+
+@mcp.tool()
+async def convert_document(path: str, export_format: str = 'MARKDOWN', ocr_profile: Optional[str] = None,
+                           pdf_engine: Optional[str] = None, upright: bool = False,
+                           chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None,
+                           wait_seconds: Optional[float] = None, ctx: Context = None) -> Dict[str, Any]:
+    """
+    转换本机上的一个文档
+
+    Args:
+        path: 输入文件路径（pdf、caj、docx、doc、xlsx、xls、csv、html、txt、md）
+        export_format: MARKDOWN、TEXT、PDF、DOCX、XLSX、CSV 或 JSONL（检索分块，每行一块）
+        ocr_profile: fast / balanced / accurate / auto
+        pdf_engine: Markdown 转 PDF 引擎 auto / weasyprint / xelatex
+        upright: 页面均为正向时跳过方向分类
+        chunk_size: JSONL 每块正文的最大字符数，默认 CHUNK_SIZE
+        chunk_overlap: JSONL 相邻文本块重叠的字符数，默认 CHUNK_OVERLAP
+        wait_seconds: 最长等待秒数，默认 CONVERSION_TIMEOUT；超时后用 job_status 继续查询
+
+    Returns:
+        dict: 任务ID和状态；文本结果较小时在 content 中，否则在 chunks 中给出分块资源地址
+    """
+    path = _check_path(path)
+    try:
+        job_id, reused = await asyncio.to_thread(_submit, path, export_format,
+                                                 _options(ocr_profile, pdf_engine, upright,
+                                                          chunk_size, chunk_overlap))
+    except UnroutableJobError as e:
+        raise ValueError(f"没有在线 worker 能执行该转换（需要 {', '.join(e.required)}），"
+                         f"请启动 Web 应用或 python -m modules.worker") from e
+    job = await _wait(job_id, wait_seconds or Config.CONVERSION_TIMEOUT, ctx)
+    if job is None:
+        raise ValueError(f"任务不存在: {job_id}")
+    return _job_summary(job, reused)
+
+
+@mcp.tool()
+async def convert_batch(paths: List[str], export_format: str = 'MARKDOWN', ocr_profile: Optional[str] = None,
+                        pdf_engine: Optional[str] = None, upright: bool = False,
+                        chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None,
+                        wait_seconds: Optional[float] = None, ctx: Context = None) -> List[Dict[str, Any]]:
+    """
+    批量转换多个文档：全部登记后由各 worker 并行执行，按输入顺序返回每个文件的结果
+
+    参数含义同 convert_document；单个文件失败不影响其它文件。
+    """
+    options = _options(ocr_profile, pdf_engine, upright, chunk_size, chunk_overlap)
+    submitted: List[Tuple[str, Optional[str], bool, Optional[str]]] = []
+    for path in paths:
+        try:
+            job_id, reused = await asyncio.to_thread(_submit, _check_path(path), export_format, options)
+            submitted.append((path, job_id, reused, None))
+        except Exception as e:
+            submitted.append((path, None, False, str(e)))
+
+    deadline = time.monotonic() + (wait_seconds or Config.CONVERSION_TIMEOUT)
+    results = []
+    for done, (path, job_id, reused, error) in enumerate(submitted):
+        if job_id is None:
+            results.append({'path': path, 'state': STATE_FAILED, 'error': error})
+            continue
+        job = await _wait(job_id, max(deadline - time.monotonic(), 0))
+        results.append(dict(_job_summary(job, reused), path=path))
+        if ctx is not None:
+            await ctx.report_progress(done + 1, len(submitted))
+    return results
+
+
+@mcp.tool()
+async def job_status(job_id: str) -> Dict[str, Any]:
+    """查询 convert_document / convert_batch 超时后仍在执行的任务"""
+    job = await asyncio.to_thread(get_job_store().get, job_id)
+    if job is None:
+        raise ValueError(f"任务不存在: {job_id}")
+    return _job_summary(job, reused=False)
+
+
+def _sniff(path: str) -> str:
+    """按文件头判断实际格式（扩展名可能不可信，如伪装成 CAJ 的 PDF）"""
+    header = read_header(path, 8)
+    if header.startswith(b'%PDF'):
+        return 'pdf'
+    if header.startswith(b'CAJ') or header.startswith(b'HN') or header[0:1] == b'\xc8':
+        return 'caj'
+    if header.startswith(b'PK\x03\x04'):
+        try:
+            with zipfile.ZipFile(path) as archive:
+                names = archive.namelist()
+        except zipfile.BadZipFile:
+            return 'zip'
+        if any(name.startswith('word/') for name in names):
+            return 'docx'
+        if any(name.startswith('xl/') for name in names):
+            return 'xlsx'
+        return 'zip'
+    if header.startswith(b'\xd0\xcf\x11\xe0'):
+        # OLE 复合文档：doc 或 xls，沿用扩展名
+        ext = path.rsplit('.', 1)[-1].lower()
+        return ext if ext in ('doc', 'xls') else 'ole'
+    return path.rsplit('.', 1)[-1].lower()
+
+
+@mcp.tool()
+async def detect_format(path: str) -> Dict[str, Any]:
+    """
+    识别文档的实际格式和规模，并列出当前在线 worker 能导出的格式（只读取元数据，不做转换）
+
+    Returns:
+        dict: detected_format、pages、text_layer（PDF 是否有文本层）、scan_dpi、size_bytes、
+              exports（每种导出格式的路线、所需能力和是否可执行）
+    """
+    path = _check_path(path)
+
+    def inspect() -> Dict[str, Any]:
+        store = get_job_store()
+        ext = path.rsplit('.', 1)[-1].lower()
+        estimate = estimate_job(path, 'MARKDOWN')
+        exports = {}
+        for export_format in EXPORT_FORMATS:
+            if output_extension(export_format) == ext:
+                continue
+            required = required_capabilities(ext, export_format, path)
+            exports[export_format] = {
+                'route': estimate_job(path, export_format)['route'],
+                'required_capabilities': required,
+                'available': store.can_route(required, Config.JOB_STALE_AFTER),
+            }
+        return {
+            'path': path,
+            'extension': ext,
+            'detected_format': _sniff(path),
+            'size_bytes': estimate['size_bytes'],
+            'pages': estimate['pages'],
+            'text_layer': estimate['text_layer'],
+            'scan_dpi': estimate['scan_dpi'],
+            'exports': exports,
+        }
+
+    return await asyncio.to_thread(inspect)
+
+
+@mcp.resource('conversion://{job_id}/chunks/{index}')
+def conversion_chunk(job_id: str, index: str) -> Any:
+    """转换结果的第 index 块：文本格式按 UTF-8 字符边界切分返回文本，其余返回二进制"""
+    job = get_job_store().get(job_id)
+    if job is None or job['state'] != STATE_SUCCEEDED:
+        raise ValueError(f"任务不存在或未完成: {job_id}")
+    artifacts = get_artifact_store()
+    if not job['result_path'] or not artifacts.exists(job['result_path']):
+        raise ValueError(f"结果已过期: {job_id}")
+    index = int(index)
+    if not 0 <= index < chunk_count(job['result_size']):
+        raise ValueError(f"分块序号超出范围: {index}")
+    text = job['export_format'] in TEXT_FORMATS
+    data = read_chunk(artifacts.local_path(job['result_path']), index, text)
+    return data.decode('utf-8', errors='replace') if text else data
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="文档转换 MCP 服务")
+    parser.add_argument('--transport', default='stdio', choices=('stdio', 'sse', 'streamable-http'))
+    parser.add_argument('--host', default='127.0.0.1', help="sse / streamable-http 的监听地址")
+    parser.add_argument('--port', type=int, default=8765, help="sse / streamable-http 的监听端口")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="本进程内的转换线程数；0 表示只登记任务，由 Web 进程或独立 worker 执行")
+    args = parser.parse_args()
+    if args.transport in NETWORK_TRANSPORTS and not _allowed_roots():
+        parser.error(f"{args.transport} 传输必须通过 MCP_ALLOWED_ROOTS 限制可读取的目录")
+
+    # stdio 传输占用标准输出，日志只写文件和标准错误
+    setup_logging(Config)
+    if args.workers > 0:
+        from modules.job_runner import JobRunner, create_scheduler
+        from modules.capabilities import detect_capabilities
+        from modules.scheduler import get_cost_model
+        from modules.admission import create_admission_controller
+        runner = JobRunner(get_job_store(), get_artifact_store(), args.workers, detect_capabilities(),
+                           scheduler=create_scheduler(), cost_model=get_cost_model(),
+                           admission=create_admission_controller())
+        runner.start()
+
+    mcp.settings.host = args.host
+    mcp.settings.port = args.port
+    logger.info(f"🐑 MCP 服务已启动 ({args.transport})")
+    mcp.run(transport=args.transport)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,318 @@
+"""
+内存准入控制模块
+按输入特征（页数、扫描分辨率、表格行数）和历史峰值内存估算每个任务的内存占用，
+只在主机的内存预算允许时开始执行；超出整个预算的大 PDF 降级为分片识别，
+任务结束后记录实际峰值 RSS 继续修正估算
+
+预留记录在共享任务表中，同一主机上的所有执行进程（gunicorn worker、独立 worker、MCP 服务）共用一份预算。
+"""
+
+import os
+import time
+import socket
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .scheduler import CostModel
+
+logger = logging.getLogger(__name__)
+
+# 尝试导入psutil（可选，用于统计 pandoc、xelatex 等子进程的内存）
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+# 路线先验：(基础内存 MB, 每单位内存 MB)；单位见 memory_units()
+MEMORY_PRIORS: Dict[str, Tuple[float, float]] = {
+    'pdf:scan': (900.0, 40.0),    # Docling 版面模型 + OCR，单位为按分辨率折算的页数
+    'pdf:text': (700.0, 10.0),
+    'pdf->DOCX': (150.0, 6.0),
+    'docx->PDF': (250.0, 20.0),   # pandoc + xelatex 子进程
+    'md->PDF': (200.0, 10.0),
+    'md->XLSX': (150.0, 60.0),    # pandas/openpyxl，单位为千行表格
+    'md': (100.0, 20.0),
+    'text': (20.0, 2.0),
+    'html': (30.0, 5.0),
+    'docx->md': (80.0, 10.0),
+    'sheet': (80.0, 5.0),         # 流式读写，与行数基本无关（xls 由 xlrd 整表载入）
+    'caj': (300.0, 30.0),
+    'default': (400.0, 50.0),
+}
+
+# 可按页分片执行的路线（Docling 逐页导出 Markdown/文本）
+SHARDABLE_ROUTES = ('pdf:scan', 'pdf:text')
+SHARDABLE_FORMATS = ('MARKDOWN', 'TEXT', 'JSONL')
+
+# 扫描分辨率折算的参考值：200dpi 的一页记为 1 个单位
+REFERENCE_DPI = 200
+
+
+def memory_units(estimate: Dict[str, Any]) -> float:
+    """
+    由 estimate_job() 的结果计算内存模型的单位数
+
+    PDF 按页计（扫描件按分辨率平方折算），Markdown 转 XLSX 按千行表格计，其余沿用耗时模型的单位。
+    """
+    route = estimate['route']
+    if route == 'pdf:scan' and estimate.get('pages'):
+        dpi = estimate.get('scan_dpi') or REFERENCE_DPI
+        scale = min(max((dpi / REFERENCE_DPI) ** 2, 0.25), 4.0)
+        return estimate['pages'] * scale
+    if route == 'md->XLSX' and estimate.get('table_rows'):
+        return max(estimate['table_rows'] / 1000, 0.1)
+    return estimate['units']
+
+
+class MemoryModel(CostModel):
+    """按路线学习峰值内存：预计峰值 = 基础内存 + 每单位内存 × 单位数（MB）"""
+
+    TABLE = 'route_memory'
+    PRIORS = MEMORY_PRIORS
+
+
+def _rss_mb() -> Optional[float]:
+    """当前进程 RSS（MB），无法读取时返回 None"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    if PSUTIL_AVAILABLE:
+        return psutil.Process().memory_info().rss / 1024 / 1024
+    return None
+
+
+def _children_rss_mb(process) -> float:
+    """子进程（pandoc、xelatex、caj2pdf…）RSS 之和（MB）"""
+    if process is None:
+        return 0.0
+    total = 0
+    try:
+        for child in process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                continue
+    except psutil.Error:
+        pass
+    return total / 1024 / 1024
+
+
+def total_memory_mb() -> Optional[float]:
+    """物理内存总量（MB）"""
+    try:
+        return os.sysconf('SC_PHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (ValueError, OSError, AttributeError):
+        pass
+    if PSUTIL_AVAILABLE:
+        return psutil.virtual_memory().total / 1024 / 1024
+    return None
+
+
+class PeakRssTracker:
+    """
+    在上下文内定期采样进程（含子进程）RSS，记录相对开始时的峰值增量
+
+    同一进程内并发执行的任务共享 RSS，只有独占执行（exclusive）时的峰值才适合用来修正估算。
+    """
+
+    def __init__(self, interval: float = 0.2, concurrency: Optional[Callable[[], int]] = None):
+        """
+        Args:
+            interval: 采样间隔（秒）
+            concurrency: 返回本进程当前运行中任务数的函数
+        """
+        self.interval = interval
+        self.concurrency = concurrency
+        self.peak_mb: Optional[float] = None
+        self.exclusive = True
+        self._baseline: Optional[float] = None
+        self._max_rss = 0.0
+        self._process = psutil.Process() if PSUTIL_AVAILABLE else None
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name='rss-tracker')
+
+    def _sample(self) -> None:
+        rss = _rss_mb()
+        if rss is None:
+            return
+        self._max_rss = max(self._max_rss, rss + _children_rss_mb(self._process))
+        if self.concurrency is not None and self.concurrency() > 1:
+            self.exclusive = False
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            self._sample()
+
+    def __enter__(self) -> 'PeakRssTracker':
+        self._baseline = _rss_mb()
+        if self._baseline is not None:
+            self._max_rss = self._baseline
+            self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self._baseline is None:
+            return
+        self._stop_event.set()
+        self._thread.join()
+        self._sample()
+        self.peak_mb = max(self._max_rss - self._baseline, 0.0)
+
+
+class AdmissionController:
+    """
+    主机内存预算：为每个开始执行的任务预留其预计峰值内存
+
+    - 预计峰值不超过剩余预算：立即执行
+    - 超过剩余预算但不超过总预算：留在队列中，等运行中的任务释放内存（或由其它主机的 worker 领取）
+    - 超过总预算：可分片的 PDF 降级为按页分片识别；否则等主机上没有运行中的任务后独占执行
+
+    预留随领取写入任务表（JobStore.claim），任务结束或放回队列时释放。
+    """
+
+    def __init__(self, budget_mb: float, model: MemoryModel, store, max_wait: float = 300.0,
+                 host: Optional[str] = None):
+        """
+        Args:
+            budget_mb: 主机可分配给转换任务的内存（MB）
+            model: 峰值内存模型
+            store: 共享任务表，记录各进程的预留
+            max_wait: 被阻塞的任务排在队首等待超过该秒数后，不再放行后面的任务
+            host: 主机标识，默认主机名
+        """
+        self.budget_mb = budget_mb
+        self.model = model
+        self.store = store
+        self.max_wait = max_wait
+        self.host = host or socket.gethostname()
+
+    @property
+    def reserved_mb(self) -> float:
+        """主机上所有执行进程已预留的内存"""
+        return self.store.reserved_memory_mb(self.host)
+
+    def estimate(self, job: Dict[str, Any]) -> float:
+        """任务的预计峰值内存（MB）"""
+        if job.get('estimated_memory_mb'):
+            return job['estimated_memory_mb']
+        return self.model.predict(job.get('cost_route') or 'default', job.get('memory_units') or 0)
+
+    def plan(self, job: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        判断任务现在能否开始
+
+        Returns:
+            dict: {'memory_mb': 预留内存, 'page_shard': 每片页数或 None}；需要继续排队时返回 None
+        """
+        reserved = self.reserved_mb
+        available = self.budget_mb - reserved
+        estimated = self.estimate(job)
+        if estimated <= available:
+            return {'memory_mb': estimated, 'page_shard': None}
+        if estimated <= self.budget_mb:
+            return None
+
+        shard = self._shard_pages(job, available)
+        if shard is not None:
+            return shard
+        if reserved == 0:
+            # 超出预算又无法分片：主机空闲时独占执行，避免永远饿死
+            logger.warning(f"任务 {job['id']} 预计峰值 {estimated:.0f}MB 超过内存预算 {self.budget_mb:.0f}MB，独占执行")
+            return {'memory_mb': self.budget_mb, 'page_shard': None}
+        return None
+
+    def _shard_pages(self, job: Dict[str, Any], available: float) -> Optional[Dict[str, Any]]:
+        """可分片任务在剩余预算内每片能处理的页数"""
+        route = job.get('cost_route')
+        pages = job.get('cost_units') or 0
+        if route not in SHARDABLE_ROUTES or job.get('export_format') not in SHARDABLE_FORMATS or pages < 2:
+            return None
+        base_mb, mb_per_unit = self.model.params(route)
+        units_per_page = (job.get('memory_units') or pages) / pages
+        per_page_mb = max(mb_per_unit * units_per_page, 1e-6)
+        shard = int((available - base_mb) // per_page_mb)
+        if shard < 1:
+            if available < self.budget_mb:
+                return None
+            shard = 1
+        shard = min(shard, int(pages) - 1)
+        return {'memory_mb': min(base_mb + shard * per_page_mb, available), 'page_shard': shard}
+
+    def select(self, jobs: List[Dict[str, Any]],
+               now: Optional[float] = None) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+        """
+        从已排序的候选任务中筛出现在能开始的任务（保持顺序）
+
+        Returns:
+            tuple: (可开始的任务列表, 任务ID -> plan)
+        """
+        now = now or time.time()
+        admitted, plans = [], {}
+        for job in jobs:
+            plan = self.plan(job)
+            if plan is not None:
+                admitted.append(job)
+                plans[job['id']] = plan
+            elif now - job['created_at'] > self.max_wait:
+                # 大任务等待过久：停止放行后面的小任务，让内存逐步腾出来
+                logger.info(f"任务 {job['id']} 等待内存超过 {self.max_wait:.0f}s，暂停放行其它任务")
+                break
+        return admitted, plans
+
+    def claim_args(self, plan: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """领取任务时写入任务表的预留参数（JobStore.claim）"""
+        if plan is None:
+            return {}
+        return {'memory_mb': plan['memory_mb'], 'host': self.host, 'budget_mb': self.budget_mb}
+
+    def release(self, job_id: str) -> None:
+        self.store.release_memory(job_id)
+
+
+def memory_budget_mb(configured_mb: int, fraction: float = 0.6) -> Optional[float]:
+    """
+    主机的转换内存预算（MB），由主机上所有执行进程共享
+
+    Args:
+        configured_mb: Config.WORKER_MEMORY_BUDGET_MB，0 表示按物理内存的 fraction 自动计算
+        fraction: 自动计算时占物理内存的比例
+    """
+    if configured_mb > 0:
+        return float(configured_mb)
+    total = total_memory_mb()
+    return total * fraction if total else None
+
+
+# 全局实例
+_memory_model: Optional[MemoryModel] = None
+_memory_model_lock = threading.Lock()
+
+
+def get_memory_model() -> MemoryModel:
+    """获取峰值内存模型实例"""
+    global _memory_model
+    if _memory_model is None:
+        with _memory_model_lock:
+            if _memory_model is None:
+                from config import Config
+                _memory_model = MemoryModel(Config.JOB_DB_PATH)
+    return _memory_model
+
+
+def create_admission_controller() -> Optional[AdmissionController]:
+    """按配置创建准入控制（ADMISSION_ENABLED=false 或无法确定内存时返回 None）"""
+    from config import Config
+    if not Config.ADMISSION_ENABLED:
+        return None
+    budget = memory_budget_mb(Config.WORKER_MEMORY_BUDGET_MB)
+    if not budget:
+        logger.warning("无法确定物理内存，内存准入控制未启用")
+        return None
+    from .job_store import get_job_store
+    controller = AdmissionController(budget, get_memory_model(), get_job_store(), Config.ADMISSION_MAX_WAIT)
+    logger.info(f"内存准入控制: 主机 {controller.host} 预算 {budget:.0f}MB（各执行进程共享）")
+    return controller
@@ -0,0 +1,128 @@
+"""
+任务文件存储模块
+保存任务的输入文件和转换结果，供 Web 进程和各节点的转换 worker 共享
+
+默认实现基于文件系统：单机直接使用本地目录，多机时把 ARTIFACT_ROOT 挂载为共享目录（NFS 等）。
+其它存储（对象存储等）可继承 ArtifactStore，并通过 ARTIFACT_STORE='模块:类名' 指定；
+缺少接口方法的实现在创建实例时即报错（TypeError），不会到任务执行中途才失败。
+"""
+
+import os
+import shutil
+import logging
+import importlib
+import threading
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from .input_handle import link_or_copy
+
+logger = logging.getLogger(__name__)
+
+
+class ArtifactStore(ABC):
+    """任务文件存储接口，文件以键（job_id/文件名）标识"""
+
+    @abstractmethod
+    def put(self, job_id: str, name: str, src_path: str) -> str:
+        """
+        保存本地文件
+
+        Args:
+            job_id: 任务ID
+            name: 存储的文件名
+            src_path: 本地文件路径
+
+        Returns:
+            str: 文件键
+        """
+
+    @abstractmethod
+    def local_path(self, key: str) -> str:
+        """返回可直接读取的本地路径（远程存储需先下载到本地缓存）"""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        """文件是否存在"""
+
+    def partial_path(self, job_id: str) -> Optional[str]:
+        """
+        流式结果写出过程中可被其它进程边写边读的本地路径
+
+        Returns:
+            Optional[str]: 路径；存储不支持读取未完成的文件时返回 None（结果仍在完成后整体写入）
+        """
+        return None
+
+    @abstractmethod
+    def delete_job(self, job_id: str) -> None:
+        """删除任务的全部文件"""
+
+
+class FilesystemArtifactStore(ArtifactStore):
+    """基于（共享）目录的文件存储"""
+
+    def __init__(self, root: str):
+        """
+        Args:
+            root: 存储根目录，每个任务一个子目录
+        """
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def job_dir(self, job_id: str) -> str:
+        return os.path.join(self.root, job_id)
+
+    def put(self, job_id: str, name: str, src_path: str) -> str:
+        job_dir = self.job_dir(job_id)
+        os.makedirs(job_dir, exist_ok=True)
+        dst_path = os.path.join(job_dir, name)
+        if os.path.abspath(src_path) != dst_path:
+            if os.path.exists(dst_path):
+                os.remove(dst_path)
+            link_or_copy(src_path, dst_path)
+        return f"{job_id}/{name}"
+
+    def local_path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        # 键来自任务表，仍防止越出根目录
+        if os.path.commonpath([path, self.root]) != self.root:
+            raise ValueError(f"非法的文件键: {key}")
+        return path
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.local_path(key))
+
+    def partial_path(self, job_id: str) -> Optional[str]:
+        job_dir = self.job_dir(job_id)
+        os.makedirs(job_dir, exist_ok=True)
+        return os.path.join(job_dir, 'result.partial')
+
+    def delete_job(self, job_id: str) -> None:
+        shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+
+
+def _load_class(spec: str):
+    """按 '模块:类名' 加载类"""
+    module_name, _, class_name = spec.partition(':')
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+# 全局实例
+_artifact_store: Optional[ArtifactStore] = None
+_artifact_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> ArtifactStore:
+    """获取任务文件存储实例（由 Config.ARTIFACT_STORE 决定实现）"""
+    global _artifact_store
+    if _artifact_store is None:
+        with _artifact_store_lock:
+            if _artifact_store is None:
+                from config import Config
+                if Config.ARTIFACT_STORE == 'filesystem':
+                    _artifact_store = FilesystemArtifactStore(Config.ARTIFACT_ROOT)
+                else:
+                    _artifact_store = _load_class(Config.ARTIFACT_STORE)(Config.ARTIFACT_ROOT)
+                logger.info(f"任务文件存储: {type(_artifact_store).__name__} ({Config.ARTIFACT_ROOT})")
+    return _artifact_store
@@ -0,0 +1,227 @@
+"""
+前端静态资源构建模块
+把 CDN 上的 Vue / Element Plus 依赖下载到本地，与本项目的 JS/CSS 一起压缩、按内容哈希命名，
+并预先生成 gzip / brotli 版本，由 /assets/<文件名> 以长期不可变缓存头提供
+
+用法:
+    python -m modules.assets                # 构建到 static/dist（依赖下载缓存在 static/vendor）
+    python -m modules.assets --offline      # 只使用已缓存的依赖
+
+未构建时页面从 CDN（固定版本的生产构建）和 /static 加载。
+"""
+
+import os
+import re
+import sys
+import gzip
+import json
+import shutil
+import hashlib
+import logging
+import argparse
+import threading
+import urllib.request
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 尝试导入压缩器（未安装时原样复制，仍有内容哈希和预压缩）
+try:
+    import rjsmin
+    RJSMIN_AVAILABLE = True
+except ImportError:
+    RJSMIN_AVAILABLE = False
+
+try:
+    import rcssmin
+    RCSSMIN_AVAILABLE = True
+except ImportError:
+    RCSSMIN_AVAILABLE = False
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATIC_DIR = os.path.join(ROOT, 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+VENDOR_DIR = os.path.join(STATIC_DIR, 'vendor')
+MANIFEST_NAME = 'manifest.json'
+
+# 第三方依赖：(资源名, 固定版本的生产构建地址)
+VENDOR_ASSETS: List[Tuple[str, str]] = [
+    ('vue.js', 'https://cdn.jsdelivr.net/npm/vue@3.4.38/dist/vue.global.prod.js'),
+    ('element-plus.js', 'https://cdn.jsdelivr.net/npm/element-plus@2.8.4/dist/index.full.min.js'),
+    ('element-plus.css', 'https://cdn.jsdelivr.net/npm/element-plus@2.8.4/dist/index.css'),
+    ('element-plus-icons.js', 'https://cdn.jsdelivr.net/npm/@element-plus/icons-vue@2.3.1/dist/index.iife.min.js'),
+]
+
+# 本项目资源：资源名 -> static 下的路径
+LOCAL_ASSETS: Dict[str, str] = {
+    'main.css': 'css/main.css',
+    'api.js': 'js/api.js',
+    'DocumentConverter.js': 'components/DocumentConverter.js',
+    'main.js': 'js/main.js',
+}
+
+# 未构建时的回退地址
+FALLBACK_URLS: Dict[str, str] = dict(VENDOR_ASSETS, **{name: f'/static/{path}' for name, path in LOCAL_ASSETS.items()})
+
+HASH_LENGTH = 10
+# 内容哈希命名的文件内容不会变化
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.DOTALL)
+_CSS_SPACE = re.compile(r'\s*([{};,])\s*')
+
+
+def minify_js(source: str) -> str:
+    return rjsmin.jsmin(source) if RJSMIN_AVAILABLE else source
+
+
+def minify_css(source: str) -> str:
+    """rcssmin 不可用时只去掉注释和多余空白（不改写任何值）"""
+    if RCSSMIN_AVAILABLE:
+        return rcssmin.cssmin(source)
+    source = _CSS_COMMENT.sub('', source)
+    source = _CSS_SPACE.sub(r'\1', source)
+    return re.sub(r'\s+', ' ', source).replace(';}', '}').strip()
+
+
+def fetch_vendor(name: str, url: str, offline: bool = False) -> str:
+    """下载依赖到 static/vendor（已缓存时直接使用）"""
+    os.makedirs(VENDOR_DIR, exist_ok=True)
+    path = os.path.join(VENDOR_DIR, name)
+    if os.path.exists(path):
+        return path
+    if offline:
+        raise FileNotFoundError(f"依赖未缓存且处于离线模式: {name} ({url})")
+    logger.info(f"⬇️ 下载 {url}")
+    with urllib.request.urlopen(url, timeout=60) as response, open(f"{path}.tmp", 'wb') as f:
+        shutil.copyfileobj(response, f)
+    os.replace(f"{path}.tmp", path)
+    return path
+
+
+def write_asset(name: str, content: bytes, dist_dir: str) -> str:
+    """按内容哈希命名写出资源，并写出 .gz / .br 预压缩版本，返回文件名"""
+    stem, ext = os.path.splitext(name)
+    digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+    filename = f"{stem}.{digest}{ext}"
+    path = os.path.join(dist_dir, filename)
+    with open(path, 'wb') as f:
+        f.write(content)
+    with open(f"{path}.gz", 'wb') as f:
+        # mtime=0 使相同内容的构建结果逐字节一致
+        f.write(gzip.compress(content, compresslevel=9, mtime=0))
+    if BROTLI_AVAILABLE:
+        with open(f"{path}.br", 'wb') as f:
+            f.write(brotli.compress(content, quality=11))
+    return filename
+
+
+def build(dist_dir: str = DIST_DIR, offline: bool = False) -> Dict[str, str]:
+    """
+    构建全部资源并写出清单
+
+    上一次构建的文件保留一代，已打开旧页面的浏览器仍能加载；更早的文件被清理。
+
+    Args:
+        dist_dir: 输出目录
+        offline: 不下载依赖，只使用 static/vendor 中的缓存
+
+    Returns:
+        dict: 资源名 -> 内容哈希文件名
+    """
+    os.makedirs(dist_dir, exist_ok=True)
+    manifest_path = os.path.join(dist_dir, MANIFEST_NAME)
+    previous: Dict[str, str] = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding='utf-8') as f:
+            previous = json.load(f)
+    sources = [(name, fetch_vendor(name, url, offline)) for name, url in VENDOR_ASSETS]
+    sources += [(name, os.path.join(STATIC_DIR, path)) for name, path in LOCAL_ASSETS.items()]
+
+    manifest = {}
+    for name, source_path in sources:
+        with open(source_path, encoding='utf-8') as f:
+            source = f.read()
+        minified = minify_css(source) if name.endswith('.css') else minify_js(source)
+        manifest[name] = write_asset(name, minified.encode('utf-8'), dist_dir)
+        logger.info(f"📦 {name}: {len(source.encode('utf-8')) / 1024:.0f}KB -> "
+                    f"{len(minified.encode('utf-8')) / 1024:.0f}KB -> {manifest[name]}")
+    # 资源文件全部写完后再原子替换清单，运行中的进程不会引用还不存在的文件
+    with open(f"{manifest_path}.tmp", 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(f"{manifest_path}.tmp", manifest_path)
+
+    keep = set(manifest.values()) | set(previous.values())
+    for filename in os.listdir(dist_dir):
+        if filename != MANIFEST_NAME and re.sub(r'\.(gz|br)$', '', filename) not in keep:
+            os.remove(os.path.join(dist_dir, filename))
+    return manifest
+
+
+class AssetManifest:
+    """按资源名查找构建后的地址；清单文件变化（重新构建）后自动重新加载"""
+
+    def __init__(self, dist_dir: str = DIST_DIR):
+        self.path = os.path.join(dist_dir, MANIFEST_NAME)
+        self._mtime: Optional[float] = None
+        self._entries: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, str]:
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return {}
+        if mtime != self._mtime:
+            with self._lock:
+                with open(self.path, encoding='utf-8') as f:
+                    self._entries = json.load(f)
+                self._mtime = mtime
+        return self._entries
+
+    def url(self, name: str) -> str:
+        filename = self._load().get(name)
+        if filename:
+            return f'/assets/{filename}'
+        if name in LOCAL_ASSETS:
+            # 未构建时按修改时间区分版本，代替手工修改的 ?v= 参数
+            mtime = int(os.path.getmtime(os.path.join(STATIC_DIR, LOCAL_ASSETS[name])))
+            return f'{FALLBACK_URLS[name]}?v={mtime}'
+        return FALLBACK_URLS[name]
+
+
+_manifest = AssetManifest()
+
+
+def asset_url(name: str) -> str:
+    """模板中使用的资源地址：已构建时为内容哈希地址，否则为 CDN / /static 原地址"""
+    return _manifest.url(name)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="构建前端静态资源")
+    parser.add_argument('--offline', action='store_true', help="不下载依赖，只使用 static/vendor 中的缓存")
+    parser.add_argument('--dist', default=DIST_DIR, help="输出目录")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    try:
+        manifest = build(args.dist, args.offline)
+    except Exception as e:
+        logger.error(f"构建失败: {e}")
+        return 1
+    if not RJSMIN_AVAILABLE or not RCSSMIN_AVAILABLE:
+        logger.info("提示: pip install rjsmin rcssmin 可进一步压缩本项目的 JS/CSS")
+    if not BROTLI_AVAILABLE:
+        logger.info("提示: pip install brotli 可额外生成 .br 版本")
+    logger.info(f"✅ 已构建 {len(manifest)} 个资源 -> {args.dist}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
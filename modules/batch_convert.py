@@ -0,0 +1,353 @@
+"""
+批量目录转换
+递归遍历输入目录，用进程池并行转换，跳过输出已是最新的文件（按大小/修改时间，可选按内容哈希），
+每完成一个文件就追加写入 JSONL 清单，中断后重新运行即可从断点继续
+
+用法:
+    python -m modules.batch_convert /data/papers /data/markdown
+    python -m modules.batch_convert /data/papers /data/docx --format DOCX --jobs 4
+    python -m modules.batch_convert /data/papers /data/markdown --skip-by hash --extensions pdf,caj
+
+清单默认写在输出目录的 .convert-manifest.jsonl，每行一条记录（相对路径、大小、修改时间、哈希、耗时、状态），
+同一文件以最后一条记录为准。
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# 与 app.py 一致：导入转换模块前设置离线模式
+os.environ['HF_HUB_OFFLINE'] = '1'
+os.environ['TRANSFORMERS_OFFLINE'] = '1'
+os.environ['HF_DATASETS_OFFLINE'] = '1'
+os.environ['HF_HUB_DISABLE_IMPLICIT_TOKEN'] = '1'
+
+from config import Config
+from modules import logging_setup
+from modules.logging_setup import setup_logging
+from modules.job_runner import file_sha256, output_extension
+from modules.search_index import get_search_index
+from modules.output_optimizer import optimize_output
+
+logger = logging.getLogger('modules.batch_convert')
+
+MANIFEST_NAME = '.convert-manifest.jsonl'
+STATUS_OK = 'ok'
+STATUS_FAILED = 'failed'
+SKIP_BY = ('mtime', 'hash')
+EXPORT_FORMATS = ('MARKDOWN', 'TEXT', 'PDF', 'DOCX', 'XLSX', 'CSV', 'JSONL')
+
+
+def iter_inputs(input_dir: str, extensions: List[str], exclude_dir: Optional[str] = None) -> Iterator[str]:
+    """按固定顺序递归列出扩展名匹配的文件（跳过隐藏文件和输出目录）"""
+    exclude_dir = os.path.abspath(exclude_dir) if exclude_dir else None
+    for root, dirs, files in os.walk(input_dir):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.')
+                         and os.path.abspath(os.path.join(root, d)) != exclude_dir)
+        for name in sorted(files):
+            if not name.startswith('.') and name.rsplit('.', 1)[-1].lower() in extensions:
+                yield os.path.join(root, name)
+
+
+class Manifest:
+    """追加写入的 JSONL 转换清单：同一 (相对路径, 格式) 以最后一条记录为准"""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: 清单文件路径，不存在时创建
+        """
+        self.path = path
+        self.records: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        self.records[(record['input'], record['format'])] = record
+                    except (ValueError, KeyError):
+                        # 中断时可能留下半行
+                        continue
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def get(self, rel_path: str, export_format: str) -> Optional[Dict[str, Any]]:
+        return self.records.get((rel_path, export_format))
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """写入一条记录并立即落盘，进程被杀时最多丢失正在转换的文件"""
+        self.records[(record['input'], record['format'])] = record
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def up_to_date(record: Optional[Dict[str, Any]], input_path: str, output_path: str,
+               stat: os.stat_result, skip_by: str) -> Tuple[bool, Optional[str]]:
+    """
+    判断输出是否已是最新
+
+    先比较大小和修改时间；skip_by='hash' 时二者有变化再比较内容哈希（例如文件被重新复制过）。
+
+    Returns:
+        tuple: (是否最新, 为判断而计算的哈希或 None)
+    """
+    if record is None or record.get('status') != STATUS_OK or not os.path.exists(output_path):
+        return False, None
+    if record.get('size') == stat.st_size and record.get('mtime_ns') == stat.st_mtime_ns:
+        return True, None
+    if skip_by != 'hash' or not record.get('sha256') or record.get('size') != stat.st_size:
+        return False, None
+    digest = file_sha256(input_path)
+    return digest == record['sha256'], digest
+
+
+# 进程池中的每个进程各自创建转换器（Docling/OCR 模型不能跨 fork 共享）
+_converter = None
+
+
+def _init_worker() -> None:
+    """子进程初始化：恢复日志线程（fork）或重新配置日志（spawn），加载并按配置预热转换器"""
+    global _converter
+    logging_setup.restart_after_fork()
+    setup_logging(Config)
+    from modules.document_converter import get_document_converter
+    from modules.docling_service import warm_up_ocr
+    from modules.pdf_renderer import warm_up_pdf_renderer
+    _converter = get_document_converter()
+    warm_up_ocr(Config.OCR_WARMUP)
+    warm_up_pdf_renderer(Config.PDF_RENDERER_WARMUP)
+
+
+def _convert_one(input_path: str, output_path: str, export_format: str,
+                 options: Dict[str, Any], compute_hash: bool) -> Dict[str, Any]:
+    """在子进程中转换一个文件：先写到输出目录下的临时目录，成功后原子替换，半成品不会被当作最新输出"""
+    start = time.perf_counter()
+    output_dir = os.path.dirname(output_path)
+    os.makedirs(output_dir, exist_ok=True)
+    temp_dir = tempfile.mkdtemp(prefix='.converting-', dir=output_dir)
+    try:
+        temp_output = os.path.join(temp_dir, os.path.basename(output_path))
+        _converter.convert_document(input_path, temp_output, export_format, options)
+        bytes_saved = optimize_output(temp_output, export_format, Config.OUTPUT_IMAGE_DPI, Config.OUTPUT_JPEG_QUALITY,
+                                      Config.OUTPUT_LOSSY_IMAGES) if Config.OUTPUT_OPTIMIZE_ENABLED else 0
+        os.replace(temp_output, output_path)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    result = {'seconds': time.perf_counter() - start, 'output_size': os.path.getsize(output_path),
+              'bytes_saved': bytes_saved}
+    index = get_search_index()
+    if compute_hash or index is not None:
+        result['sha256'] = file_sha256(input_path)
+    if index is not None:
+        try:
+            index.index_conversion(result['sha256'], os.path.basename(input_path), input_path, output_path,
+                                   export_format)
+        except Exception as e:
+            logger.warning(f"写入全文索引失败: {input_path}: {e}")
+    return result
+
+
+class Progress:
+    """吞吐统计：文件/秒、输入 MB/秒、预计剩余时间"""
+
+    def __init__(self, total: int, total_bytes: int, interval: float):
+        self.total = total
+        self.total_bytes = total_bytes
+        self.interval = interval
+        self.done = 0
+        self.failed = 0
+        self.done_bytes = 0
+        self.started = time.perf_counter()
+        self._last_report = self.started
+
+    def update(self, size: int, ok: bool) -> None:
+        self.done += 1
+        self.done_bytes += size
+        if not ok:
+            self.failed += 1
+        now = time.perf_counter()
+        if now - self._last_report >= self.interval or self.done == self.total:
+            self._last_report = now
+            self.report()
+
+    def report(self) -> None:
+        elapsed = max(time.perf_counter() - self.started, 1e-6)
+        files_per_sec = self.done / elapsed
+        mb_per_sec = self.done_bytes / 1024 / 1024 / elapsed
+        # 按字节估算剩余时间（大文件耗时更长）
+        remaining = (self.total_bytes - self.done_bytes) / (self.done_bytes / elapsed) if self.done_bytes else 0
+        logger.info(f"📊 [{self.done}/{self.total}] {files_per_sec:.2f} 文件/s, {mb_per_sec:.2f} MB/s, "
+                    f"失败 {self.failed}, 已用 {elapsed:.0f}s, 预计剩余 {remaining:.0f}s")
+
+
+def plan_jobs(args, manifest: Manifest) -> Tuple[List[Tuple[str, str, str, os.stat_result]], int]:
+    """
+    列出需要转换的文件，已是最新的跳过
+
+    Returns:
+        tuple: ([(输入路径, 输出路径, 相对路径, stat)], 跳过数)
+    """
+    extensions = [ext.strip().lower() for ext in args.extensions.split(',') if ext.strip()]
+    ext = output_extension(args.format)
+    jobs, skipped = [], 0
+    outputs = set()
+    for input_path in iter_inputs(args.input_dir, extensions, exclude_dir=args.output_dir):
+        rel_path = os.path.relpath(input_path, args.input_dir)
+        output_path = os.path.join(args.output_dir, rel_path.rsplit('.', 1)[0] + '.' + ext)
+        if output_path in outputs:
+            # 同名不同扩展名（如 a.pdf 和 a.caj）：保留原扩展名区分
+            output_path = os.path.join(args.output_dir, rel_path + '.' + ext)
+        outputs.add(output_path)
+        stat = os.stat(input_path)
+        record = manifest.get(rel_path, args.format)
+        if not args.force:
+            fresh, digest = up_to_date(record, input_path, output_path, stat, args.skip_by)
+            if fresh:
+                skipped += 1
+                if digest is not None:
+                    # 内容未变只是修改时间变了：更新记录，下次直接按修改时间跳过
+                    manifest.append(dict(record, size=stat.st_size, mtime_ns=stat.st_mtime_ns,
+                                         finished_at=time.time()))
+                continue
+        jobs.append((input_path, output_path, rel_path, stat))
+    # 大文件先提交，避免最后只剩一个长任务拖尾
+    jobs.sort(key=lambda job: job[3].st_size, reverse=True)
+    return jobs, skipped
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="批量目录转换")
+    parser.add_argument('input_dir', help="输入目录（递归遍历）")
+    parser.add_argument('output_dir', help="输出目录（保持输入的子目录结构）")
+    parser.add_argument('--format', default='MARKDOWN', type=str.upper, choices=EXPORT_FORMATS, help="导出格式")
+    parser.add_argument('--jobs', type=int, default=max((os.cpu_count() or 2) // 2, 1),
+                        help="并行进程数（每个进程各自加载 Docling/OCR 模型，注意内存）")
+    parser.add_argument('--extensions', default=','.join(Config.ALLOWED_EXTENSIONS),
+                        help="逗号分隔的输入扩展名")
+    parser.add_argument('--skip-by', default='mtime', choices=SKIP_BY,
+                        help="mtime：大小和修改时间不变即跳过；hash：修改时间变化时再比较内容哈希")
+    parser.add_argument('--force', action='store_true', help="忽略清单，全部重新转换")
+    parser.add_argument('--manifest', help=f"清单路径（默认 输出目录/{MANIFEST_NAME}）")
+    parser.add_argument('--ocr-profile', help="OCR 档位：fast / balanced / accurate / auto")
+    parser.add_argument('--pdf-engine', help="Markdown 转 PDF 引擎：auto / weasyprint / xelatex")
+    parser.add_argument('--upright', action='store_true', help="页面均为正向，跳过方向分类")
+    parser.add_argument('--chunk-size', type=int, help="JSONL 分块每块正文的最大字符数（默认 CHUNK_SIZE）")
+    parser.add_argument('--chunk-overlap', type=int, help="JSONL 相邻文本块重叠的字符数（默认 CHUNK_OVERLAP）")
+    parser.add_argument('--progress-interval', type=float, default=5.0, help="吞吐统计输出间隔（秒）")
+    args = parser.parse_args()
+
+    if args.jobs > 1:
+        # 进程池中的进程共用同一个日志文件，不能各自按大小滚动
+        Config.LOG_ROTATE = os.getenv('LOG_ROTATE', 'external')
+    setup_logging(Config)
+    if not os.path.isdir(args.input_dir):
+        logger.error(f"输入目录不存在: {args.input_dir}")
+        return 2
+
+    options: Dict[str, Any] = {}
+    if args.ocr_profile:
+        options['ocr_profile'] = args.ocr_profile.lower()
+    if args.pdf_engine:
+        options['pdf_engine'] = args.pdf_engine.lower()
+    if args.upright:
+        options['upright'] = True
+    if args.chunk_size:
+        options['chunk_size'] = args.chunk_size
+    if args.chunk_overlap is not None:
+        options['chunk_overlap'] = args.chunk_overlap
+
+    manifest = Manifest(args.manifest or os.path.join(args.output_dir, MANIFEST_NAME))
+    jobs, skipped = plan_jobs(args, manifest)
+    logger.info(f"🐑 批量转换: {len(jobs)} 个文件待转换, {skipped} 个已是最新 -> {args.output_dir} ({args.format})")
+    if not jobs:
+        manifest.close()
+        return 0
+
+    progress = Progress(len(jobs), sum(job[3].st_size for job in jobs), args.progress_interval)
+    workers = min(args.jobs, len(jobs))
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+    try:
+        # 只保持有限数量的任务在途，清单和统计随完成逐个更新
+        pending: Dict[Any, Tuple[str, str, str, os.stat_result]] = {}
+        queue = iter(jobs)
+        # 进程池崩溃时在途的文件：逐个单独重试一次，单独运行仍崩溃的才记为失败
+        retry: List[Tuple[str, str, str, os.stat_result]] = []
+        retried: set = set()
+
+        def can_submit() -> bool:
+            if any(job[2] in retried for job in pending.values()):
+                return False
+            if retry:
+                return not pending
+            return len(pending) < args.jobs * 2
+
+        while True:
+            while can_submit():
+                job = retry.pop(0) if retry else next(queue, None)
+                if job is None:
+                    break
+                input_path, output_path, _, _ = job
+                try:
+                    future = executor.submit(_convert_one, input_path, output_path, args.format,
+                                             options, args.skip_by == 'hash')
+                except BrokenProcessPool:
+                    # 某个转换进程异常退出（OOM、段错误）后进程池不可再用，换新进程池继续
+                    logger.warning("⚠️ 转换进程异常退出，重建进程池后继续")
+                    executor.shutdown(wait=False)
+                    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+                    future = executor.submit(_convert_one, input_path, output_path, args.format,
+                                             options, args.skip_by == 'hash')
+                pending[future] = job
+            if not pending:
+                break
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                job = pending.pop(future)
+                input_path, output_path, rel_path, stat = job
+                record = {'input': rel_path, 'format': args.format,
+                          'output': os.path.relpath(output_path, args.output_dir),
+                          'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'finished_at': time.time()}
+                try:
+                    result = future.result()
+                    record.update(result, status=STATUS_OK)
+                    logger.debug("✅ %s (%.1fs)", rel_path, result['seconds'])
+                except BrokenProcessPool as e:
+                    if rel_path not in retried:
+                        # 不确定是哪个文件导致崩溃，稍后单独重试
+                        retried.add(rel_path)
+                        retry.append(job)
+                        logger.warning(f"⚠️ {rel_path}: 转换进程异常退出，稍后单独重试")
+                        continue
+                    record.update(status=STATUS_FAILED, error=f"转换进程异常退出: {e}")
+                    logger.error(f"❌ {rel_path}: 单独运行时转换进程仍异常退出")
+                except Exception as e:
+                    record.update(status=STATUS_FAILED, error=str(e))
+                    logger.error(f"❌ {rel_path}: {e}")
+                manifest.append(record)
+                progress.update(stat.st_size, record['status'] == STATUS_OK)
+    except KeyboardInterrupt:
+        logger.info("收到中断，取消未开始的文件（已完成的已写入清单，重新运行即可继续）")
+        executor.shutdown(wait=False, cancel_futures=True)
+        return 130
+    finally:
+        executor.shutdown(wait=True)
+        manifest.close()
+
+    progress.report()
+    logger.info(f"批量转换完成: 成功 {progress.done - progress.failed}, 失败 {progress.failed}, 跳过 {skipped}")
+    return 1 if progress.failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
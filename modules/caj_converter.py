@@ -9,6 +9,7 @@ import shutil
 import subprocess
 from pathlib import Path
 import logging
+from .input_handle import read_header, link_or_copy
 
 # 添加caj2pdf到Python路径
 current_dir = Path(__file__).parent.parent
@@ -54,17 +55,16 @@ class CAJConverter:
             
         # 检查文件头部特征
         try:
-            with open(file_path, 'rb') as f:
-                header = f.read(8)  # 读取更多字节进行判断
-                
-                # 检查是否是PDF文件（很多CAJ文件实际是PDF）
-                if header.startswith(b'%PDF'):
-                    logger.info(f"检测到CAJ文件实际为PDF格式: {file_path}")
-                    return False  # 不是真正的CAJ文件，是PDF文件
-                
-                # CAJ文件的常见头部标识
-                if header.startswith(b'CAJ') or header.startswith(b'HN') or header[0:1] == b'\xc8':
-                    return True
+            header = read_header(file_path, 8)  # 读取更多字节进行判断
+            
+            # 检查是否是PDF文件（很多CAJ文件实际是PDF）
+            if header.startswith(b'%PDF'):
+                logger.info(f"检测到CAJ文件实际为PDF格式: {file_path}")
+                return False  # 不是真正的CAJ文件，是PDF文件
+            
+            # CAJ文件的常见头部标识
+            if header.startswith(b'CAJ') or header.startswith(b'HN') or header[0:1] == b'\xc8':
+                return True
                     
         except Exception as e:
             logger.warning(f"检查CAJ文件头部时出错: {e}")
@@ -88,9 +88,7 @@ class CAJConverter:
             return False
             
         try:
-            with open(file_path, 'rb') as f:
-                header = f.read(8)
-                return header.startswith(b'%PDF')
+            return read_header(file_path, 8).startswith(b'%PDF')
         except Exception as e:
             logger.warning(f"检查PDF头部时出错: {e}")
             return False
@@ -156,9 +154,8 @@ class CAJConverter:
             output_filename = os.path.splitext(input_filename)[0] + '.pdf'
             output_path = os.path.join(output_dir, output_filename)
             
-            # 直接复制文件
-            import shutil
-            shutil.copy2(caj_file_path, output_path)
+            # 直接链接（跨文件系统时复制）
+            link_or_copy(caj_file_path, output_path)
             logger.info(f"PDF文件复制成功: {output_path}")
             return output_path
             
@@ -0,0 +1,138 @@
+"""
+转换能力检测模块
+检测本机可运行的转换后端，并给出每条转换路线所需的能力，用于把任务路由到能执行它的 worker
+"""
+
+import os
+import sys
+import shutil
+import logging
+import importlib.util
+from functools import lru_cache
+from typing import List, Optional
+
+from config import Config
+from .input_handle import read_header
+from .pdf_renderer import ENGINE_WEASYPRINT, ENGINE_XELATEX, WEASYPRINT_AVAILABLE, needs_latex
+
+logger = logging.getLogger(__name__)
+
+# 能力名称
+CAP_DOCLING = 'docling'    # Docling 文档解析
+CAP_OCR = 'ocr'            # Docling 的 OCR 引擎（RapidOCR 模型或 macOS OCR）
+CAP_PANDOC = 'pandoc'
+CAP_LATEX = 'latex'        # xelatex / pdflatex / lualatex
+CAP_PDF2DOCX = 'pdf2docx'
+CAP_CAJ2PDF = 'caj2pdf'
+CAP_XLRD = 'xlrd'          # 读取旧版 .xls
+CAP_WEASYPRINT = 'weasyprint'  # HTML + CSS 排版 Markdown 转 PDF
+
+ALL_CAPABILITIES = (CAP_DOCLING, CAP_OCR, CAP_PANDOC, CAP_LATEX, CAP_PDF2DOCX, CAP_CAJ2PDF, CAP_XLRD,
+                    CAP_WEASYPRINT)
+
+
+@lru_cache(maxsize=1)
+def detect_capabilities() -> List[str]:
+    """检测本机已安装的转换后端（结果缓存，进程内只检测一次）"""
+    from . import document_converter as dc
+    from .caj_converter import caj2pdf_path
+
+    capabilities = []
+    if dc.is_docling_available():
+        capabilities.append(CAP_DOCLING)
+        processor = dc.get_docling_processor()
+        if getattr(processor, 'models_available', False) or sys.platform == 'darwin':
+            capabilities.append(CAP_OCR)
+    try:
+        dc.pypandoc.get_pandoc_version()
+        capabilities.append(CAP_PANDOC)
+    except Exception:
+        pass
+    if dc._detect_latex_engine() is not None:
+        capabilities.append(CAP_LATEX)
+    if dc.PDF2DOCX_AVAILABLE:
+        capabilities.append(CAP_PDF2DOCX)
+    if os.path.exists(os.path.join(str(caj2pdf_path), 'caj2pdf')):
+        capabilities.append(CAP_CAJ2PDF)
+    if importlib.util.find_spec('xlrd') is not None:
+        capabilities.append(CAP_XLRD)
+    if WEASYPRINT_AVAILABLE:
+        capabilities.append(CAP_WEASYPRINT)
+    logger.info(f"🧰 本机转换能力: {', '.join(capabilities) or '无'}")
+    return capabilities
+
+
+def _markdown_pdf_capabilities(pdf_engine: Optional[str], latex_content: Optional[bool]) -> List[str]:
+    """
+    Markdown 转 PDF 首选引擎所需的能力
+
+    Args:
+        pdf_engine: 请求指定的引擎，None 使用 Config.PDF_ENGINE
+        latex_content: 文档是否公式密集或含原生 LaTeX，None 表示未知（按 xelatex 路由）
+    """
+    engine = (pdf_engine or Config.PDF_ENGINE).lower()
+    if engine not in (ENGINE_WEASYPRINT, ENGINE_XELATEX):
+        latex = not WEASYPRINT_AVAILABLE or latex_content is not False
+        engine = ENGINE_XELATEX if latex else ENGINE_WEASYPRINT
+    return [CAP_PANDOC, CAP_LATEX if engine == ENGINE_XELATEX else CAP_WEASYPRINT]
+
+
+def required_capabilities(input_ext: str, export_format: str, input_path: Optional[str] = None,
+                          pdf_engine: Optional[str] = None) -> List[str]:
+    """
+    转换路线所需的最少能力（回退后端不计入）
+
+    Args:
+        input_ext: 输入文件扩展名
+        export_format: 导出格式
+        input_path: 输入文件路径，提供时用于识别伪装成 CAJ 的 PDF，以及判断 Markdown 是否公式密集
+        pdf_engine: 请求指定的 Markdown 转 PDF 引擎，None 使用 Config.PDF_ENGINE
+
+    Returns:
+        list: 能力名称列表
+    """
+    input_ext = input_ext.lower()
+    export_format = export_format.upper()
+    if input_ext == 'caj':
+        if input_path is not None and read_header(input_path, 4).startswith(b'%PDF'):
+            # 伪装成 CAJ 的 PDF，按 PDF 路由，不需要 caj2pdf
+            return [] if export_format == 'PDF' else required_capabilities('pdf', export_format)
+        pdf_required = [] if export_format == 'PDF' else required_capabilities('pdf', export_format)
+        return [CAP_CAJ2PDF] + pdf_required
+    if input_ext == 'pdf' and export_format == 'DOCX':
+        return [CAP_PDF2DOCX]
+    if input_ext in ('docx', 'doc') and export_format == 'PDF':
+        return [CAP_PANDOC, CAP_LATEX]
+    if input_ext in ('md', 'txt'):
+        if export_format == 'PDF':
+            return _markdown_pdf_capabilities(pdf_engine, needs_latex(input_path) if input_path else None)
+        return {'DOCX': [CAP_PANDOC]}.get(export_format, [])
+    if input_ext in ('xlsx', 'xls', 'csv'):
+        reader = [CAP_XLRD] if input_ext == 'xls' else []
+        if export_format == 'PDF':
+            # 表格导出的 Markdown 不含公式
+            return reader + _markdown_pdf_capabilities(pdf_engine, False)
+        return reader + {'DOCX': [CAP_PANDOC]}.get(export_format, [])
+    if export_format in ('MARKDOWN', 'TEXT') and Config.LIGHT_CONVERTERS_ENABLED:
+        # 轻量路线（Docling 只是回退）
+        if input_ext == 'html':
+            return []
+        if input_ext == 'docx':
+            return [CAP_PANDOC]
+    required = [CAP_DOCLING]
+    if input_ext == 'pdf':
+        required.append(CAP_OCR)
+    if export_format == 'PDF':
+        required += [CAP_PANDOC, CAP_LATEX]
+    return required
+
+
+def parse_capabilities(value: str) -> List[str]:
+    """解析逗号分隔的能力列表，'auto' 表示自动检测"""
+    if not value or value.strip().lower() == 'auto':
+        return detect_capabilities()
+    capabilities = [item.strip().lower() for item in value.split(',') if item.strip()]
+    unknown = [item for item in capabilities if item not in ALL_CAPABILITIES]
+    if unknown:
+        raise ValueError(f"未知的能力: {', '.join(unknown)}（可选: {', '.join(ALL_CAPABILITIES)}）")
+    return capabilities
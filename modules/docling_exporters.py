@@ -0,0 +1,427 @@
+"""
+Docling 原生导出模块
+直接遍历 DoclingDocument 文档树写出 DOCX / XLSX，以及供检索管道使用的 JSONL 分块，避免 Markdown 中转
+"""
+
+import re
+import json
+import logging
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 尝试导入python-docx
+try:
+    from docx import Document as DocxDocument
+    PYTHON_DOCX_AVAILABLE = True
+except ImportError:
+    PYTHON_DOCX_AVAILABLE = False
+    logger.warning("python-docx库不可用，DOCX原生导出不可用")
+
+# 尝试导入openpyxl
+try:
+    from openpyxl import Workbook
+    from openpyxl.styles import Font
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+    logger.warning("openpyxl库不可用，XLSX原生导出不可用")
+
+# 不写入正文的版面元素
+SKIPPED_LABELS = {'page_header', 'page_footer'}
+HEADING_LABELS = {'title', 'section_header'}
+
+
+def _label_of(item) -> str:
+    """获取文档元素的标签名"""
+    label = getattr(item, 'label', None)
+    return getattr(label, 'value', str(label)) if label is not None else ''
+
+
+def _iter_body_items(doc) -> Iterator[Tuple[object, str]]:
+    """按阅读顺序遍历正文元素，返回 (元素, 标签)"""
+    for item, _level in doc.iterate_items():
+        label = _label_of(item)
+        if label in SKIPPED_LABELS:
+            continue
+        yield item, label
+
+
+def _table_grid(item) -> Tuple[int, int, List[dict]]:
+    """
+    读取表格单元格结构
+
+    Returns:
+        Tuple[行数, 列数, 单元格列表]，单元格包含文本、起止行列和是否表头
+    """
+    data = item.data
+    cells = []
+    seen = set()
+    for cell in data.table_cells:
+        # 跨行/跨列单元格可能重复出现，按起始坐标去重
+        origin = (cell.start_row_offset_idx, cell.start_col_offset_idx)
+        if origin in seen:
+            continue
+        seen.add(origin)
+        cells.append({
+            'text': cell.text or '',
+            'row': cell.start_row_offset_idx,
+            'col': cell.start_col_offset_idx,
+            'end_row': max(cell.end_row_offset_idx, cell.start_row_offset_idx + 1),
+            'end_col': max(cell.end_col_offset_idx, cell.start_col_offset_idx + 1),
+            'header': bool(getattr(cell, 'column_header', False)),
+        })
+    return data.num_rows, data.num_cols, cells
+
+
+def export_docling_to_docx(doc, output_path: str) -> None:
+    """
+    将 DoclingDocument 直接写为 DOCX
+
+    Args:
+        doc: DoclingDocument 实例
+        output_path: 输出文件路径
+    """
+    if not PYTHON_DOCX_AVAILABLE:
+        raise Exception("python-docx未安装，无法原生导出DOCX")
+
+    document = DocxDocument()
+    for item, label in _iter_body_items(doc):
+        if label == 'title':
+            document.add_heading(item.text, level=0)
+        elif label == 'section_header':
+            # python-docx 支持 1~9 级标题
+            level = min(max(int(getattr(item, 'level', 1)), 1), 9)
+            document.add_heading(item.text, level=level)
+        elif label == 'list_item':
+            style = 'List Number' if getattr(item, 'enumerated', False) else 'List Bullet'
+            document.add_paragraph(item.text, style=style)
+        elif label == 'table':
+            _write_docx_table(document, item)
+        elif label == 'picture':
+            # 图像本身不回嵌，题注作为独立元素照常写入
+            continue
+        elif label in ('code', 'formula'):
+            paragraph = document.add_paragraph()
+            run = paragraph.add_run(getattr(item, 'text', ''))
+            run.font.name = 'Courier New'
+        else:
+            text = getattr(item, 'text', '')
+            if text:
+                document.add_paragraph(text)
+
+    document.save(output_path)
+    logger.info(f"DOCX 原生导出成功: {output_path}")
+
+
+def _write_docx_table(document, item) -> None:
+    """写入带真实单元格结构（含合并单元格）的 Word 表格"""
+    num_rows, num_cols, cells = _table_grid(item)
+    if num_rows == 0 or num_cols == 0:
+        return
+
+    table = document.add_table(rows=num_rows, cols=num_cols)
+    table.style = 'Table Grid'
+    for cell in cells:
+        target = table.cell(cell['row'], cell['col'])
+        if cell['end_row'] - cell['row'] > 1 or cell['end_col'] - cell['col'] > 1:
+            target = target.merge(table.cell(cell['end_row'] - 1, cell['end_col'] - 1))
+        target.text = cell['text']
+        if cell['header']:
+            for paragraph in target.paragraphs:
+                for run in paragraph.runs:
+                    run.bold = True
+
+
+def export_docling_to_xlsx(doc, output_path: str) -> None:
+    """
+    将 DoclingDocument 直接写为 XLSX
+
+    与 Markdown 中转方案保持相同的工作表布局：每个表格一个工作表，
+    另有“文档结构”工作表；都没有时写入“文档内容”。
+
+    Args:
+        doc: DoclingDocument 实例
+        output_path: 输出文件路径
+    """
+    if not OPENPYXL_AVAILABLE:
+        raise Exception("openpyxl未安装，无法原生导出XLSX")
+
+    tables = []
+    structure: List[Dict[str, str]] = []
+    lines: List[str] = []
+    current_section = ""
+    content_buffer: List[str] = []
+
+    for item, label in _iter_body_items(doc):
+        if label == 'table':
+            tables.append(item)
+            continue
+        text = (getattr(item, 'text', '') or '').strip()
+        if not text:
+            continue
+        lines.append(text)
+        if label in HEADING_LABELS:
+            if current_section and content_buffer:
+                structure.append({'章节': current_section, '内容': '\n'.join(content_buffer)})
+            current_section = text
+            content_buffer = []
+        else:
+            content_buffer.append(text)
+
+    if current_section and content_buffer:
+        structure.append({'章节': current_section, '内容': '\n'.join(content_buffer)})
+
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    bold = Font(bold=True)
+
+    for i, table in enumerate(tables):
+        sheet_name = f'表格_{i+1}' if len(tables) > 1 else '表格'
+        _write_xlsx_table(workbook.create_sheet(sheet_name), table, bold)
+
+    if structure:
+        sheet = workbook.create_sheet('文档结构')
+        sheet.append(['章节', '内容'])
+        for row in structure:
+            sheet.append([row['章节'], row['内容']])
+        for cell in sheet[1]:
+            cell.font = bold
+
+    if not tables and not structure:
+        sheet = workbook.create_sheet('文档内容')
+        sheet.append(['内容'])
+        for line in lines:
+            sheet.append([line])
+
+    workbook.save(output_path)
+    logger.info(f"XLSX 原生导出成功: {output_path} ({len(tables)} 个表格)")
+
+
+def _write_xlsx_table(sheet, item, bold) -> None:
+    """按单元格坐标写入表格，保留合并单元格与表头"""
+    _num_rows, _num_cols, cells = _table_grid(item)
+    for cell in cells:
+        # openpyxl 行列从1开始
+        row, col = cell['row'] + 1, cell['col'] + 1
+        target = sheet.cell(row=row, column=col, value=cell['text'])
+        if cell['header']:
+            target.font = bold
+        end_row, end_col = cell['end_row'], cell['end_col']
+        if end_row - cell['row'] > 1 or end_col - cell['col'] > 1:
+            sheet.merge_cells(start_row=row, start_column=col, end_row=end_row, end_column=end_col)
+
+
+# 当前转换请求的分块大小和重叠字符数（由 DocumentConverter 按请求选项设置）
+_chunk_request: contextvars.ContextVar = contextvars.ContextVar('chunk_request', default=None)
+
+# 长段落优先在句末切分
+_SENTENCE_END = re.compile(r'(?<=[。！？；.!?;])\s*')
+
+
+@contextmanager
+def chunk_request(chunk_size: Optional[int] = None, overlap: Optional[int] = None) -> Iterator[None]:
+    """
+    在上下文内为 JSONL 分块导出指定分块参数
+
+    Args:
+        chunk_size: 每块正文的最大字符数，None 使用 Config.CHUNK_SIZE
+        overlap: 相邻文本块重叠的字符数，None 使用 Config.CHUNK_OVERLAP
+    """
+    token = _chunk_request.set((chunk_size, overlap))
+    try:
+        yield
+    finally:
+        _chunk_request.reset(token)
+
+
+def chunk_settings() -> Tuple[int, int]:
+    """当前请求的 (分块大小, 重叠字符数)"""
+    from config import Config
+    chunk_size, overlap = _chunk_request.get() or (None, None)
+    chunk_size = chunk_size or Config.CHUNK_SIZE
+    overlap = Config.CHUNK_OVERLAP if overlap is None else overlap
+    return chunk_size, min(overlap, chunk_size // 2)
+
+
+def _split_text(text: str, limit: int) -> List[str]:
+    """把超过 limit 的段落按句子切开，单句仍超长时硬切"""
+    if len(text) <= limit:
+        return [text]
+    pieces, current = [], ''
+    for sentence in _SENTENCE_END.split(text):
+        while len(sentence) > limit:
+            if current:
+                pieces.append(current)
+                current = ''
+            pieces.append(sentence[:limit])
+            sentence = sentence[limit:]
+        if current and len(current) + len(sentence) > limit:
+            pieces.append(current)
+            current = ''
+        current += sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _item_pages(item, page_offset: int) -> Set[int]:
+    """元素所在页码（从1开始，加上分段转换的页偏移）"""
+    return {prov.page_no + page_offset for prov in getattr(item, 'prov', None) or []}
+
+
+class DoclingChunker:
+    """
+    把 DoclingDocument 按章节切成检索用的块，每完成一块立即交给 emit
+
+    文本块不跨章节，携带标题路径、页码和元素类型，相邻块之间重叠 overlap 个字符；
+    表格单独成块并保留单元格结构，超长表格按行分块并重复表头行。
+    可多次 feed（PDF 分段转换时逐段送入），标题路径跨段保持。
+    """
+
+    def __init__(self, emit: Callable[[Dict[str, Any]], None], chunk_size: int = 1000, overlap: int = 100):
+        """
+        Args:
+            emit: 接收每个块（dict）的回调
+            chunk_size: 每块正文的最大字符数（不含重叠部分）
+            overlap: 相邻文本块重叠的字符数
+        """
+        self.emit = emit
+        self.chunk_size = max(chunk_size, 1)
+        self.overlap = max(min(overlap, self.chunk_size // 2), 0)
+        self.count = 0
+        self._headings: List[Tuple[int, str]] = []
+        self._parts: List[str] = []
+        self._length = 0
+        self._pages: Set[int] = set()
+        self._types: List[str] = []
+        self._carry = ''
+
+    @property
+    def heading_path(self) -> List[str]:
+        return [text for _level, text in self._headings]
+
+    def feed(self, doc, page_offset: int = 0) -> None:
+        """送入一个文档（或 PDF 的一段），page_offset 为该段首页之前的页数"""
+        for item, label in _iter_body_items(doc):
+            pages = _item_pages(item, page_offset)
+            if label in HEADING_LABELS:
+                text = (getattr(item, 'text', '') or '').strip()
+                if not text:
+                    continue
+                self._flush()
+                self._carry = ''
+                level = 0 if label == 'title' else int(getattr(item, 'level', 1) or 1)
+                self._headings = [heading for heading in self._headings if heading[0] < level] + [(level, text)]
+            elif label == 'table':
+                self._flush()
+                self._carry = ''
+                self._emit_table(item, pages)
+            else:
+                text = (getattr(item, 'text', '') or '').strip()
+                if text:
+                    self._add_text(text, label, pages)
+
+    def close(self) -> None:
+        self._flush()
+
+    def _add_text(self, text: str, label: str, pages: Set[int]) -> None:
+        for piece in _split_text(text, self.chunk_size):
+            if self._length and self._length + len(piece) > self.chunk_size:
+                self._flush()
+            self._parts.append(piece)
+            self._length += len(piece)
+            self._pages.update(pages)
+            if label not in self._types:
+                self._types.append(label)
+
+    def _record(self, chunk_type: str, text: str, pages: Iterable[int], types: List[str]) -> Dict[str, Any]:
+        record = {
+            'chunk_id': self.count,
+            'type': chunk_type,
+            'heading_path': self.heading_path,
+            'pages': sorted(pages),
+            'element_types': types,
+            'text': text,
+        }
+        self.count += 1
+        return record
+
+    def _flush(self) -> None:
+        if not self._parts:
+            return
+        body = '\n'.join(self._parts)
+        text = f"{self._carry}\n{body}" if self._carry else body
+        record = self._record('text', text, self._pages, self._types)
+        if self._carry:
+            record['overlap_chars'] = len(self._carry) + 1
+        self.emit(record)
+        self._carry = body[-self.overlap:] if self.overlap else ''
+        self._parts, self._length, self._pages, self._types = [], 0, set(), []
+
+    def _emit_table(self, item, pages: Set[int]) -> None:
+        num_rows, num_cols, cells = _table_grid(item)
+        if not cells:
+            return
+        by_row: Dict[int, List[dict]] = {}
+        for cell in cells:
+            by_row.setdefault(cell['row'], []).append(cell)
+        lines = {row: ' | '.join(cell['text'] for cell in sorted(row_cells, key=lambda c: c['col']))
+                 for row, row_cells in by_row.items()}
+        header_rows = sorted(row for row, row_cells in by_row.items() if all(c['header'] for c in row_cells))
+        header_cells = [cell for row in header_rows for cell in by_row[row]]
+        header_text = '\n'.join(lines[row] for row in header_rows)
+        body_rows = [row for row in sorted(by_row) if row not in header_rows]
+
+        def emit_group(group: List[int]) -> None:
+            text = '\n'.join(filter(None, [header_text] + [lines[row] for row in group]))
+            record = self._record('table', text, pages, ['table'])
+            record['table'] = {
+                'num_rows': num_rows,
+                'num_cols': num_cols,
+                'header_rows': header_rows,
+                'rows': [group[0], group[-1] + 1] if group else [0, num_rows],
+                'cells': header_cells + [cell for row in group for cell in by_row[row]],
+            }
+            self.emit(record)
+
+        group: List[int] = []
+        length = len(header_text)
+        for row in body_rows:
+            if group and length + len(lines[row]) > self.chunk_size:
+                emit_group(group)
+                group, length = [], len(header_text)
+            group.append(row)
+            length += len(lines[row]) + 1
+        if group or not body_rows:
+            emit_group(group)
+
+
+def export_docling_to_jsonl(docs: Iterable[Tuple[Any, int]], output_path: str,
+                            chunk_size: int = 1000, overlap: int = 100) -> int:
+    """
+    将 DoclingDocument 流式写为 JSONL 分块，每块写完立即刷新，下游可边读边建索引
+
+    Args:
+        docs: (DoclingDocument, 页偏移) 序列；PDF 可按页段逐段产生
+        output_path: 输出文件路径
+        chunk_size: 每块正文的最大字符数
+        overlap: 相邻文本块重叠的字符数
+
+    Returns:
+        int: 写出的块数
+    """
+    with open(output_path, 'w', encoding='utf-8') as out:
+        def emit(record: Dict[str, Any]) -> None:
+            out.write(json.dumps(record, ensure_ascii=False) + '\n')
+            out.flush()
+
+        chunker = DoclingChunker(emit, chunk_size, overlap)
+        for doc, page_offset in docs:
+            chunker.feed(doc, page_offset)
+            del doc
+        chunker.close()
+    logger.info(f"JSONL 分块导出成功: {output_path} ({chunker.count} 块)")
+    return chunker.count
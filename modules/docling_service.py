@@ -3,10 +3,20 @@ Docling 文档处理模块
 集成 OCR 和高级文档转换功能
 """
 
+import io
 import os
+import time
 import logging
+import threading
+import contextvars
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Literal, Optional, Tuple
+from typing import Dict, Iterator, List, Literal, Optional, Tuple
+from .ocr_page_cache import get_ocr_page_cache, install_ocr_cache, extract_pages, pdf_page_count
+from .onnx_cache import resolve_model_path
+from .ocr_batching import install_batching
+from .ocr_profiles import (PROFILE_ACCURATE, PROFILE_AUTO, OCR_PROFILES, available_profiles,
+                           choose_profile, profile_model_paths)
 
 # 完全禁用HuggingFace的网络连接检查
 os.environ['HF_HUB_OFFLINE'] = '1'
@@ -20,7 +30,7 @@ logger = logging.getLogger(__name__)
 try:
     from docling.document_converter import DocumentConverter, WordFormatOption, PowerpointFormatOption, HTMLFormatOption, \
         MarkdownFormatOption, AsciiDocFormatOption, ExcelFormatOption
-    from docling.datamodel.base_models import InputFormat
+    from docling.datamodel.base_models import InputFormat, DocumentStream
     from docling.datamodel.pipeline_options import PdfPipelineOptions, RapidOcrOptions, OcrMacOptions, AcceleratorDevice, AcceleratorOptions
     from docling.document_converter import PdfFormatOption, ImageFormatOption
     DOCLING_AVAILABLE = True
@@ -29,6 +39,27 @@ except ImportError as e:
     DOCLING_AVAILABLE = False
     logger.warning(f"Docling 模块导入失败: {e}")
 
+# 当前转换请求的 OCR 档位、方向提示和分片页数（由 DocumentConverter 按请求选项设置）
+_ocr_request: contextvars.ContextVar = contextvars.ContextVar('ocr_request', default=None)
+
+
+@contextmanager
+def ocr_request(profile: Optional[str] = None, upright: bool = False,
+                page_shard: Optional[int] = None) -> Iterator[None]:
+    """
+    在上下文内为 Docling 转换指定 OCR 档位
+    
+    Args:
+        profile: fast / balanced / accurate / auto，None 使用 Config.OCR_PROFILE
+        upright: 调用方确认页面均为正向时跳过方向分类模型
+        page_shard: PDF 每次送入 Docling 的最大页数，用于限制峰值内存；None 表示整本转换
+    """
+    token = _ocr_request.set((profile, upright, page_shard))
+    try:
+        yield
+    finally:
+        _ocr_request.reset(token)
+
 class DoclingProcessor:
     """Docling 文档处理器"""
     
@@ -45,6 +76,12 @@ class DoclingProcessor:
         logger.info(f"模型目录设置为: {self.models_dir}")
         
         self.converter = None
+        self.pipeline_accelerator = None
+        # (档位, 是否使用方向分类) -> 转换器，按需创建
+        self._tier_converters: Dict[Tuple[str, bool], object] = {}
+        self._tier_lock = threading.Lock()
+        # 各转换器共享已初始化的管道（含 OCR 推理会话），选项相同的管道只加载一次
+        self._shared_pipelines: Dict = {}
         
         logger.info("开始设置模型...")
         self._setup_models()
@@ -72,6 +109,28 @@ class DoclingProcessor:
         else:
             logger.warning("RapidOCR 模型文件未找到，OCR功能可能无法正常工作")
             self.models_available = False
+        self.ocr_profiles = available_profiles(self.models_dir)
+        logger.info(f"可用OCR档位: {', '.join(self.ocr_profiles) or '无'}")
+        self.ocr_model_version = self._model_version(
+            (self.det_model_path, self.rec_model_path, self.cls_model_path), use_cls=True
+        )
+    
+    def _model_version(self, model_paths: Tuple[str, ...], use_cls: bool) -> str:
+        """OCR 模型版本标识（模型文件名与大小 + docling 版本），用作 OCR 结果缓存键的一部分"""
+        parts = []
+        for path in model_paths:
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            parts.append(f"{os.path.basename(path)}:{size}")
+        if not self.models_available:
+            parts.append('ocrmac')
+        if not use_cls:
+            parts.append('no-cls')
+        try:
+            from importlib.metadata import version
+            parts.append(f"docling:{version('docling')}")
+        except Exception:
+            pass
+        return '|'.join(parts)
     
     def _init_converter(self):
         """初始化文档转换器"""
@@ -101,10 +160,11 @@ class DoclingProcessor:
                 logger.debug(f"识别模型: {self.rec_model_path}")
                 logger.debug(f"分类模型: {self.cls_model_path}")
                 
+                # 加载预先优化过的模型，避免每次启动重复图优化
                 ocr_options = RapidOcrOptions(
-                    det_model_path=self.det_model_path,
-                    rec_model_path=self.rec_model_path,
-                    cls_model_path=self.cls_model_path,
+                    det_model_path=resolve_model_path(self.det_model_path),
+                    rec_model_path=resolve_model_path(self.rec_model_path),
+                    cls_model_path=resolve_model_path(self.cls_model_path),
                 )
                 logger.info("RapidOCR选项配置完成")
             else:
@@ -115,18 +175,36 @@ class DoclingProcessor:
             
             # 配置管道选项
             logger.debug("配置PDF管道选项...")
-            pipeline_options = PdfPipelineOptions(ocr_options=ocr_options)
-            pipeline_options.accelerator_options = accelerator_options
-            logger.info("PDF管道选项配置完成")
+            self.pipeline_accelerator = accelerator_options
+            self.converter = self._build_converter(ocr_options)
             
-            # 初始化转换器（强制使用本地文件）
-            logger.debug("初始化DocumentConverter...")
-            self.converter = DocumentConverter()
-            logger.info("DocumentConverter创建成功")
+            logger.info("✅ Docling 转换器初始化成功")
             
-            # 设置支持的格式
-            logger.debug("设置支持的文件格式...")
-            self.converter.allowed_formats = [
+        except Exception as e:
+            logger.error(f"❌ 初始化 Docling 转换器失败: {e}")
+            logger.error(f"错误类型: {type(e).__name__}")
+            logger.error(f"错误详情: {str(e)}")
+            import traceback
+            logger.error(f"完整堆栈:\n{traceback.format_exc()}")
+            self.converter = None
+    
+    def _build_converter(self, ocr_options):
+        """按给定 OCR 选项创建 Docling 转换器"""
+        pipeline_options = PdfPipelineOptions(ocr_options=ocr_options)
+        pipeline_options.accelerator_options = self.pipeline_accelerator
+        logger.info("PDF管道选项配置完成")
+        
+        # 初始化转换器（强制使用本地文件）
+        logger.debug("初始化DocumentConverter...")
+        converter = DocumentConverter()
+        # 新版 docling 按 (管道类, 选项哈希) 缓存管道，才能安全地在转换器之间共享
+        if hasattr(converter, '_get_pipeline_options_hash'):
+            converter.initialized_pipelines = self._shared_pipelines
+        logger.info("DocumentConverter创建成功")
+        
+        # 设置支持的格式
+        logger.debug("设置支持的文件格式...")
+        converter.allowed_formats = [
                 InputFormat.PDF,
                 InputFormat.IMAGE,
                 InputFormat.DOCX,
@@ -137,37 +215,109 @@ class DoclingProcessor:
                 InputFormat.CSV,
                 InputFormat.MD,
             ]
-            logger.debug(f"支持的格式: {len(self.converter.allowed_formats)}种")
-            
-            # 设置格式选项
-            logger.debug("设置格式选项...")
-            self.converter.format_to_options = {
-                InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options),
-                InputFormat.IMAGE: ImageFormatOption(pipeline_options=pipeline_options),
-                InputFormat.DOCX: WordFormatOption(),
-                InputFormat.PPTX: PowerpointFormatOption(),
-                InputFormat.HTML: HTMLFormatOption(),
-                InputFormat.MD: MarkdownFormatOption(),
-                InputFormat.ASCIIDOC: AsciiDocFormatOption(),
-                InputFormat.CSV: ExcelFormatOption(),
-                InputFormat.XLSX: ExcelFormatOption(),
-            }
-            logger.info("格式选项配置完成")
-            
-            logger.info("✅ Docling 转换器初始化成功")
-            
+        logger.debug(f"支持的格式: {len(converter.allowed_formats)}种")
+        
+        # 设置格式选项
+        logger.debug("设置格式选项...")
+        converter.format_to_options = {
+            InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options),
+            InputFormat.IMAGE: ImageFormatOption(pipeline_options=pipeline_options),
+            InputFormat.DOCX: WordFormatOption(),
+            InputFormat.PPTX: PowerpointFormatOption(),
+            InputFormat.HTML: HTMLFormatOption(),
+            InputFormat.MD: MarkdownFormatOption(),
+            InputFormat.ASCIIDOC: AsciiDocFormatOption(),
+            InputFormat.CSV: ExcelFormatOption(),
+            InputFormat.XLSX: ExcelFormatOption(),
+        }
+        logger.info("格式选项配置完成")
+        return converter
+    
+    def _tier_converter(self, profile: str, use_cls: bool):
+        """
+        获取指定 OCR 档位的转换器（首次使用时创建并复用）
+        
+        Returns:
+            tuple: (转换器, OCR 模型版本标识)；模型缺失时返回默认转换器
+        """
+        paths = profile_model_paths(self.models_dir, profile) if self.models_available else None
+        if paths is None:
+            return self.converter, self.ocr_model_version
+        key = (paths['profile'], use_cls)
+        version = self._model_version((paths['det'], paths['rec'], paths['cls']), use_cls)
+        # 高精度档且需要方向分类，与默认转换器完全相同
+        if key == (PROFILE_ACCURATE, True):
+            return self.converter, version
+        with self._tier_lock:
+            converter = self._tier_converters.get(key)
+            if converter is None:
+                logger.info(f"创建OCR档位转换器: {paths['profile']} (方向分类: {'开' if use_cls else '关'})")
+                converter = self._build_converter(RapidOcrOptions(
+                    det_model_path=resolve_model_path(paths['det']),
+                    rec_model_path=resolve_model_path(paths['rec']),
+                    cls_model_path=resolve_model_path(paths['cls']),
+                    use_cls=use_cls,
+                ))
+                self._tier_converters[key] = converter
+        return converter, version
+    
+    def _select_converter(self, file_path: str):
+        """
+        按当前请求的 OCR 档位选择转换器
+        
+        Returns:
+            tuple: (转换器, OCR 模型版本标识)
+        """
+        from config import Config
+        if self.converter is None:
+            return None, self.ocr_model_version
+        profile, upright, _ = _ocr_request.get() or (None, False, None)
+        profile = (profile or Config.OCR_PROFILE).lower()
+        if profile not in OCR_PROFILES and profile != PROFILE_AUTO:
+            raise ValueError(f"未知的OCR档位: {profile}")
+        is_pdf = str(file_path).lower().endswith('.pdf')
+        if profile == PROFILE_AUTO:
+            if not is_pdf:
+                profile = PROFILE_ACCURATE
+            else:
+                profile, detected_upright = choose_profile(str(file_path))
+                upright = upright or detected_upright
+        return self._tier_converter(profile, use_cls=not upright)
+    
+    def warm_up(self, mode: str) -> None:
+        """
+        预热 OCR，使第一个真实请求不再承担模型加载
+        
+        Args:
+            mode: load 只加载管道和推理会话；infer 额外对一页合成扫描件做一次完整识别
+        """
+        if not self.is_available() or mode not in ('load', 'infer'):
+            return
+        start = time.perf_counter()
+        try:
+            if mode == 'load' and hasattr(self.converter, 'initialize_pipeline'):
+                self.converter.initialize_pipeline(InputFormat.PDF)
+                self._install_ocr_hooks(self.converter)
+            else:
+                import fitz
+                with fitz.open() as source, fitz.open() as scanned:
+                    page = source.new_page(width=300, height=120)
+                    page.insert_text((20, 60), "Warm up 预热", fontname='china-s', fontsize=18)
+                    target = scanned.new_page(width=300, height=120)
+                    target.insert_image(target.rect, pixmap=page.get_pixmap(dpi=150, colorspace=fitz.csGRAY))
+                    pdf_bytes = scanned.tobytes()
+                converter, _ = self._select_converter('warmup.pdf')
+                self._convert_source(DocumentStream(name='warmup.pdf', stream=io.BytesIO(pdf_bytes)), converter)
+            logger.info(f"🔥 OCR预热完成 ({mode}): {time.perf_counter() - start:.2f}s")
         except Exception as e:
-            logger.error(f"❌ 初始化 Docling 转换器失败: {e}")
-            logger.error(f"错误类型: {type(e).__name__}")
-            logger.error(f"错误详情: {str(e)}")
-            import traceback
-            logger.error(f"完整堆栈:\n{traceback.format_exc()}")
-            self.converter = None
+            logger.warning(f"OCR预热失败: {e}")
     
     def is_available(self) -> bool:
         """检查 Docling 是否可用"""
         available = DOCLING_AVAILABLE and self.converter is not None
-        logger.debug(f"Docling可用性检查: DOCLING_AVAILABLE={DOCLING_AVAILABLE}, converter存在={self.converter is not None}, 最终结果={available}")
+        # 热路径：每次状态轮询都会调用，使用惰性格式化
+        logger.debug("Docling可用性检查: DOCLING_AVAILABLE=%s, converter存在=%s, 最终结果=%s",
+                     DOCLING_AVAILABLE, self.converter is not None, available)
         return available
     
     def convert_document(self, file_path: str, export_format: Literal["MARKDOWN", "TEXT"] = "MARKDOWN") -> Tuple[str, str]:
@@ -186,36 +336,93 @@ class DoclingProcessor:
         """
         logger.info(f"准备转换文档: {file_path}, 目标格式: {export_format}")
         
-        # 详细检查可用性
+        is_pdf = str(file_path).lower().endswith('.pdf')
+        if is_pdf and self._page_shard():
+            converter, _ = self._select_converter(file_path)
+            page_count = pdf_page_count(str(file_path))
+            pages = self._convert_pdf_pages(str(file_path), list(range(page_count)), page_count, converter)
+            field = 'markdown' if export_format.upper() == "MARKDOWN" else 'text'
+            content = '\n\n'.join(pages[index][field] for index in range(page_count) if pages[index][field].strip())
+            logger.info(f"文档转换成功: {file_path}")
+            return content, "md" if export_format.upper() == "MARKDOWN" else "txt"
+        
+        doc = self.convert_to_document(file_path)
+        
+        # 根据格式导出内容
+        if export_format.upper() == "MARKDOWN":
+            content = doc.export_to_markdown()
+            file_extension = "md"
+        else:
+            content = doc.export_to_text()
+            file_extension = "txt"
+        
+        logger.info(f"文档转换成功: {file_path}")
+        return content, file_extension
+    
+    def convert_to_document(self, file_path: str):
+        """
+        转换文档并返回结构化的 DoclingDocument，供原生导出器直接使用
+        
+        Args:
+            file_path: 输入文件路径
+            
+        Returns:
+            DoclingDocument: 转换后的文档树
+            
+        Raises:
+            Exception: 转换失败时抛出异常
+        """
+        logger.info(f"开始转换文档: {file_path}")
+        converter, _ = self._select_converter(file_path)
+        return self._convert_source(str(file_path), converter)
+
+    def iter_documents(self, file_path: str, window: Optional[int] = None) -> Iterator[Tuple[object, int]]:
+        """
+        逐段转换文档，供流式导出边转换边写出
+
+        PDF 每次送入 window 页（请求指定了分片页数时取二者较小值），每段转换完即交给调用方并释放；
+        其它格式整份转换。
+
+        Args:
+            file_path: 输入文件路径
+            window: PDF 每段页数，None 或 0 表示整本转换
+
+        Yields:
+            Tuple[DoclingDocument, int]: 该段文档和段首页之前的页数
+        """
+        converter, _ = self._select_converter(file_path)
+        shard = self._page_shard()
+        window = min(filter(None, (window, shard)), default=None)
+        page_count = pdf_page_count(str(file_path)) if str(file_path).lower().endswith('.pdf') and window else 0
+        if page_count <= (window or 0):
+            yield self._convert_source(str(file_path), converter), 0
+            return
+        for start in range(0, page_count, window):
+            pages = list(range(start, min(start + window, page_count)))
+            subset = extract_pages(str(file_path), pages)
+            yield self._convert_source(
+                DocumentStream(name=os.path.basename(str(file_path)), stream=io.BytesIO(subset)), converter
+            ), start
+            logger.info(f"分段转换进度: {pages[-1] + 1}/{page_count} 页")
+
+    def _convert_source(self, source, converter):
+        """对路径或 DocumentStream 运行 Docling 转换，返回 DoclingDocument"""
         if not DOCLING_AVAILABLE:
             logger.error("❌ Docling库不可用")
             raise Exception("Docling 库未正确安装或导入失败")
         
-        if self.converter is None:
+        if converter is None:
             logger.error("❌ Docling转换器为None，初始化可能失败")
             raise Exception("Docling 转换器初始化失败，请检查启动日志")
         
-        logger.info("✅ Docling转换器可用，开始转换...")
-        
         try:
-            logger.info(f"开始转换文档: {file_path}")
-            
-            # 执行转换
-            result = self.converter.convert(source=str(file_path))
+            # 首次转换时管道才被初始化，转换前后各检查一次
+            self._install_ocr_hooks(converter)
+            result = converter.convert(source=source)
+            self._install_ocr_hooks(converter)
             
             if result.status.name == "SUCCESS" or result.status.name == "PARTIAL_SUCCESS":
-                doc = result.document
-                
-                # 根据格式导出内容
-                if export_format.upper() == "MARKDOWN":
-                    content = doc.export_to_markdown()
-                    file_extension = "md"
-                else:
-                    content = doc.export_to_text()
-                    file_extension = "txt"
-                
-                logger.info(f"文档转换成功: {file_path}")
-                return content, file_extension
+                return result.document
             else:
                 error_msg = f"转换失败: {result.status.name}"
                 if result.errors:
@@ -226,6 +433,74 @@ class DoclingProcessor:
             logger.error(f"转换文档时发生错误: {e}")
             raise
 
+    def _install_ocr_hooks(self, converter) -> None:
+        """
+        为转换器已初始化的管道安装 OCR 结果缓存和批量识别层（未开启或已安装时不做任何事）
+
+        扫描件常被反复上传新版本：未改动页面的 OCR 输入图像相同，直接复用缓存的识别结果。
+        """
+        from config import Config
+        pipelines = list((getattr(converter, 'initialized_pipelines', None) or {}).values())
+        if not pipelines:
+            return
+        page_cache = get_ocr_page_cache()
+        if page_cache is not None:
+            install_ocr_cache(pipelines, page_cache, self._pipeline_model_version)
+        if Config.OCR_BATCH_ENABLED:
+            install_batching(pipelines, Config.OCR_BATCH_SIZE, Config.OCR_BATCH_MAX_WAIT_MS / 1000,
+                             Config.OCR_BATCH_WIDTH_BUCKET, Config.OCR_BATCH_PAGE_THREADS)
+
+    @staticmethod
+    def _page_shard() -> Optional[int]:
+        """当前请求的分片页数"""
+        request = _ocr_request.get()
+        return request[2] if request else None
+
+    def _pipeline_model_version(self, pipeline) -> str:
+        """管道所用 OCR 模型的版本标识（各档位的管道共享同一个字典，需按管道自身的选项计算）"""
+        ocr_options = getattr(getattr(pipeline, 'pipeline_options', None), 'ocr_options', None)
+        paths = tuple(getattr(ocr_options, name, None)
+                      for name in ('det_model_path', 'rec_model_path', 'cls_model_path'))
+        if not all(paths):
+            return self.ocr_model_version
+        return self._model_version(paths, bool(getattr(ocr_options, 'use_cls', True)))
+
+    def _convert_pdf_pages(self, file_path: str, indexes: List[int], page_count: int,
+                           converter) -> Dict[int, Dict[str, str]]:
+        """
+        识别 PDF 的指定页（从0开始），返回每页的 Markdown 和文本
+        
+        请求指定了分片页数时按片送入 Docling，每片转换完即释放页面图像和版面结果，峰值内存与片大小成正比。
+        
+        Args:
+            file_path: PDF文件路径
+            indexes: 需要识别的页
+            page_count: PDF 总页数（需要识别全部页面时直接转换原文件）
+            converter: Docling 转换器
+        """
+        shard = self._page_shard() or len(indexes)
+        results = {}
+        for start in range(0, len(indexes), shard):
+            chunk = indexes[start:start + shard]
+            if len(chunk) == page_count:
+                doc = self._convert_source(str(file_path), converter)
+            else:
+                # 只把需要的页面拆成子 PDF 送去识别
+                subset = extract_pages(file_path, chunk)
+                doc = self._convert_source(
+                    DocumentStream(name=os.path.basename(file_path), stream=io.BytesIO(subset)), converter
+                )
+            for position, index in enumerate(chunk):
+                page_no = position + 1
+                results[index] = {
+                    'markdown': doc.export_to_markdown(page_no=page_no),
+                    'text': doc.export_to_text(page_no=page_no),
+                }
+            del doc
+            if len(indexes) > len(chunk):
+                logger.info(f"分片识别进度: {min(start + shard, len(indexes))}/{len(indexes)} 页")
+        return results
+
 # 全局实例
 docling_processor = None
 
@@ -249,9 +524,18 @@ def get_docling_processor() -> DoclingProcessor:
     """获取 Docling 处理器实例"""
     return _create_docling_processor()
 
+def warm_up_ocr(mode: str) -> None:
+    """按 OCR_WARMUP 预热全局处理器（需在 fork 之后的进程内调用）"""
+    if mode == 'off':
+        return
+    processor = _create_docling_processor()
+    if processor is not None:
+        processor.warm_up(mode)
+
 def is_docling_available() -> bool:
     """检查 Docling 是否可用"""
     processor = _create_docling_processor()
     available = DOCLING_AVAILABLE and processor is not None and processor.is_available()
-    logger.debug(f"全局Docling可用性检查: DOCLING_AVAILABLE={DOCLING_AVAILABLE}, processor存在={processor is not None}, 最终结果={available}")
+    logger.debug("全局Docling可用性检查: DOCLING_AVAILABLE=%s, processor存在=%s, 最终结果=%s",
+                 DOCLING_AVAILABLE, processor is not None, available)
     return available 
\ No newline at end of file
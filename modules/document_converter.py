@@ -4,12 +4,27 @@
 """
 
 import os
+import shutil
 import logging
+import tempfile
+import subprocess
+from functools import lru_cache
+from typing import Any, Dict, Optional
 import pandas as pd
 import pypandoc
-from .docling_service import get_docling_processor, is_docling_available
+from config import Config
+from .docling_service import get_docling_processor, is_docling_available, ocr_request
 from .markdown_processor import parse_markdown_to_structured_data
 from .caj_converter import CAJConverter, convert_caj_to_pdf
+from .fallback_engine import ConversionBackend, FallbackEngine, find_risky_pdf_pages
+from .docling_exporters import (export_docling_to_docx, export_docling_to_xlsx, export_docling_to_jsonl,
+                                chunk_request, chunk_settings)
+from .input_handle import open_input, link_or_copy
+from .light_converters import convert_html, transcode_text
+from .spreadsheet_reader import SPREADSHEET_EXTENSIONS, SPREADSHEET_EXPORT_FORMATS, convert_spreadsheet
+from .pdf_renderer import (ENGINE_AUTO, ENGINE_WEASYPRINT, ENGINE_XELATEX, WEASYPRINT_AVAILABLE,
+                           choose_pdf_engine, get_weasyprint_renderer, pdf_engine_request,
+                           requested_pdf_engine)
 
 logger = logging.getLogger(__name__)
 
@@ -50,14 +65,35 @@ except OSError:
 except Exception as e:
     logger.warning(f"检查Pandoc版本失败: {e}")
 
+@lru_cache(maxsize=1)
+def _detect_latex_engine() -> Optional[str]:
+    """检测可用的LaTeX引擎（结果缓存，避免每次转换都启动子进程）"""
+    for engine in ['xelatex', 'pdflatex', 'lualatex']:
+        if shutil.which(engine) is None:
+            continue
+        try:
+            result = subprocess.run([engine, '--version'], capture_output=True, timeout=5)
+            if result.returncode == 0:
+                logger.info(f"✅ 检测到可用的LaTeX引擎: {engine}")
+                return engine
+        except Exception:
+            continue
+    logger.warning("⚠️ 未检测到LaTeX引擎")
+    return None
+
 class DocumentConverter:
     """统一文档转换器"""
     
     def __init__(self):
         """初始化转换器"""
         self.docling_processor = get_docling_processor()
+        self.fallback_engine = FallbackEngine(
+            memory_size=Config.FALLBACK_MEMORY_SIZE,
+            race_timeout=Config.CONVERSION_TIMEOUT
+        )
     
-    def convert_document(self, input_path: str, output_path: str, export_format: str) -> None:
+    def convert_document(self, input_path: str, output_path: str, export_format: str,
+                         options: Optional[Dict[str, Any]] = None) -> None:
         """
         转换文档
         
@@ -65,40 +101,71 @@ class DocumentConverter:
             input_path: 输入文件路径
             output_path: 输出文件路径
             export_format: 导出格式
+            options: 转换选项，例如 {'interactive': True} 表示交互式请求，
+                     {'ocr_profile': 'fast'} 指定 OCR 档位，{'upright': True} 表示页面均为正向，
+                     {'page_shard': 20} 表示 PDF 每次最多识别 20 页（内存准入降级），
+                     {'pdf_engine': 'weasyprint'} 指定 Markdown 转 PDF 的渲染引擎，
+                     {'chunk_size': 800, 'chunk_overlap': 80} 指定 JSONL 分块大小和重叠字符数
             
         Raises:
             Exception: 转换失败时抛出异常
         """
+        options = options or {}
         file_extension = self._get_file_extension(input_path)
         export_format = export_format.upper()
+        # 仅交互式请求允许并行竞速后端
+        race = Config.FALLBACK_RACE_ENABLED and bool(options.get('interactive'))
         
         logger.debug(f"文件扩展名: {file_extension}, 目标格式: {export_format}")
         logger.info(f"开始转换: {input_path} -> {output_path} (格式: {export_format})")
         
-        # 根据文件类型和目标格式选择转换策略
-        if file_extension == 'caj':
-            # CAJ文件转换（自动处理真正的CAJ和伪装的PDF）
-            logger.debug("选择CAJ转换策略")
-            self._convert_caj_file(input_path, output_path, export_format)
-        elif file_extension == 'pdf' and export_format == 'DOCX' and PDF2DOCX_AVAILABLE:
-            # PDF直接转Word（保持格式）
-            logger.debug("选择pdf2docx直接转换策略")
-            self._convert_pdf_to_docx_direct(input_path, output_path)
-        elif file_extension in ['docx', 'doc'] and export_format == 'PDF':
-            # DOCX/DOC使用pandoc直接转PDF（需要LaTeX引擎）
-            logger.debug("选择pandoc直接转换策略")
-            self._convert_docx_to_pdf_with_pandoc(input_path, output_path)
-        elif file_extension == 'md' and export_format in ['PDF', 'DOCX', 'XLSX']:
-            # Markdown 本地转换
-            logger.debug("选择本地Markdown转换策略")
-            self._convert_markdown_local(input_path, output_path, export_format)
-        elif self._should_use_docling(file_extension, export_format):
-            # 使用 Docling 转换
-            logger.debug("选择Docling转换策略")
-            self._convert_with_docling(input_path, output_path, export_format)
-        else:
-            logger.debug("没有可用的转换策略")
-            raise Exception(f"不支持的转换: {file_extension} -> {export_format}")
+        # 整个转换过程共享同一个输入映射（哈希、嗅探、后端读取）
+        with open_input(input_path) as handle, \
+                ocr_request(options.get('ocr_profile'), bool(options.get('upright')), options.get('page_shard')), \
+                pdf_engine_request(options.get('pdf_engine')), \
+                chunk_request(options.get('chunk_size'), options.get('chunk_overlap')):
+            logger.debug(f"输入文件已映射: {handle.size} bytes")
+            
+            # 根据文件类型和目标格式选择转换策略
+            if file_extension == 'caj':
+                # CAJ文件转换（自动处理真正的CAJ和伪装的PDF）
+                logger.debug("选择CAJ转换策略")
+                self._convert_caj_file(input_path, output_path, export_format)
+            elif file_extension == 'pdf' and export_format == 'DOCX' and PDF2DOCX_AVAILABLE:
+                # PDF直接转Word（保持格式）
+                logger.debug("选择pdf2docx直接转换策略")
+                self._convert_pdf_to_docx_direct(input_path, output_path, race=race)
+            elif file_extension in ['docx', 'doc'] and export_format == 'PDF':
+                # DOCX/DOC使用pandoc直接转PDF（需要LaTeX引擎）
+                logger.debug("选择pandoc直接转换策略")
+                self._convert_docx_to_pdf_with_pandoc(input_path, output_path, race=race)
+            elif file_extension in ['txt', 'md'] and export_format in ['TEXT', 'MARKDOWN']:
+                # 文本直通（非 UTF-8 时转码）
+                logger.debug("选择文本直通策略")
+                transcode_text(input_path, output_path)
+            elif file_extension in ['txt', 'md'] and export_format in ['PDF', 'DOCX', 'XLSX']:
+                # Markdown 本地转换
+                logger.debug("选择本地Markdown转换策略")
+                self._convert_text_local(input_path, output_path, export_format)
+            elif file_extension in SPREADSHEET_EXTENSIONS:
+                # 电子表格逐行流式读取，不经过 Docling
+                logger.debug("选择流式电子表格转换策略")
+                self._convert_spreadsheet(input_path, output_path, export_format)
+            elif file_extension == 'html' and export_format in ['MARKDOWN', 'TEXT'] and Config.LIGHT_CONVERTERS_ENABLED:
+                # 轻量 HTML 解析，失败时回退到 Docling
+                logger.debug("选择轻量HTML转换策略")
+                self._convert_html_light(input_path, output_path, export_format)
+            elif file_extension == 'docx' and export_format in ['MARKDOWN', 'TEXT'] and Config.LIGHT_CONVERTERS_ENABLED:
+                # pandoc 直接读取 DOCX，失败时回退到 Docling
+                logger.debug("选择pandoc DOCX转换策略")
+                self._convert_docx_to_markdown(input_path, output_path, export_format)
+            elif self._should_use_docling(file_extension, export_format):
+                # 使用 Docling 转换
+                logger.debug("选择Docling转换策略")
+                self._convert_with_docling(input_path, output_path, export_format)
+            else:
+                logger.debug("没有可用的转换策略")
+                raise Exception(f"不支持的转换: {file_extension} -> {export_format}")
     
     def _get_file_extension(self, filename: str) -> str:
         """获取文件扩展名"""
@@ -136,6 +203,72 @@ class DocumentConverter:
             logger.error(f"Markdown 本地转换失败: {e}")
             raise
     
+    def _convert_text_local(self, input_path: str, output_path: str, export_format: str) -> None:
+        """纯文本/Markdown 转 PDF、DOCX、XLSX：先统一为 UTF-8 再走本地 Markdown 转换"""
+        temp_dir = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(output_path)))
+        try:
+            temp_md_path = os.path.join(temp_dir, 'input.md')
+            transcode_text(input_path, temp_md_path)
+            self._convert_markdown_local(temp_md_path, output_path, export_format)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+    
+    def _convert_spreadsheet(self, input_path: str, output_path: str, export_format: str) -> None:
+        """xlsx / xls / csv 转换：表格类格式流式写出，PDF/DOCX 经 Markdown 中转"""
+        if export_format in SPREADSHEET_EXPORT_FORMATS:
+            convert_spreadsheet(input_path, output_path, export_format)
+        elif export_format in ['PDF', 'DOCX']:
+            temp_dir = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(output_path)))
+            try:
+                temp_md_path = os.path.join(temp_dir, 'sheets.md')
+                convert_spreadsheet(input_path, temp_md_path, 'MARKDOWN')
+                self._convert_markdown_local(temp_md_path, output_path, export_format)
+            finally:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+        else:
+            raise Exception(f"不支持的转换: {self._get_file_extension(input_path)} -> {export_format}")
+    
+    def _convert_html_light(self, input_path: str, output_path: str, export_format: str) -> None:
+        """HTML 转 Markdown/文本：流式解析，Docling 作为回退（不竞速，避免为毫秒级的解析空跑 Docling）"""
+        plain = export_format == 'TEXT'
+        backends = [
+            ConversionBackend('html-parser', lambda src, dst: convert_html(src, dst, plain=plain)),
+            ConversionBackend(
+                'docling',
+                lambda src, dst: self._convert_with_docling(src, dst, export_format),
+                precheck=lambda _: is_docling_available()
+            ),
+        ]
+        self.fallback_engine.run(
+            f'html->{export_format}', input_path, output_path, backends, error_label="HTML转换失败"
+        )
+    
+    def _convert_docx_to_markdown(self, input_path: str, output_path: str, export_format: str) -> None:
+        """DOCX 转 Markdown/文本：pandoc 直接读取，Docling 作为回退"""
+        backends = [
+            ConversionBackend(
+                'pandoc',
+                lambda src, dst: self._run_pandoc_docx_to_markdown(src, dst, export_format)
+            ),
+            ConversionBackend(
+                'docling',
+                lambda src, dst: self._convert_with_docling(src, dst, export_format),
+                precheck=lambda _: is_docling_available()
+            ),
+        ]
+        self.fallback_engine.run(
+            f'docx->{export_format}', input_path, output_path, backends, error_label="DOCX转换失败"
+        )
+    
+    def _run_pandoc_docx_to_markdown(self, input_path: str, output_path: str, export_format: str) -> None:
+        """pandoc 转换 DOCX 为 GitHub 风格 Markdown 或纯文本"""
+        target = 'plain' if export_format == 'TEXT' else 'gfm'
+        logger.info(f"Pandoc DOCX -> {target}: {input_path} -> {output_path}")
+        pypandoc.convert_file(input_path, target, format='docx', outputfile=output_path,
+                              extra_args=['--wrap=none'])
+        if not (os.path.exists(output_path) and os.path.getsize(output_path) > 0):
+            raise Exception("pandoc 未生成内容")
+    
     def _convert_with_docling(self, input_path: str, output_path: str, export_format: str) -> None:
         """使用 Docling 转换文档"""
         try:
@@ -150,29 +283,75 @@ class DocumentConverter:
                     f.write(content)
                 
                 logger.info(f"Docling 转换成功: {output_path}")
+            elif export_format == 'JSONL':
+                # 按页段转换并逐块写出，下游可在整份文档完成前开始建索引
+                chunk_size, overlap = chunk_settings()
+                documents = self.docling_processor.iter_documents(input_path, Config.CHUNK_STREAM_PAGES)
+                export_docling_to_jsonl(documents, output_path, chunk_size, overlap)
+            elif export_format in ['DOCX', 'XLSX'] and Config.DOCLING_NATIVE_EXPORT:
+                # 直接遍历文档树导出，保留真实表格结构
+                doc = self.docling_processor.convert_to_document(input_path)
+                try:
+                    if export_format == 'DOCX':
+                        export_docling_to_docx(doc, output_path)
+                    else:
+                        export_docling_to_xlsx(doc, output_path)
+                except Exception as e:
+                    logger.warning(f"原生导出失败，回退到Markdown中转: {e}")
+                    self._convert_markdown_content(doc.export_to_markdown(), input_path, output_path, export_format)
             else:
                 # 对于其他格式，先转换为 Markdown，然后本地转换
                 content, _ = self.docling_processor.convert_document(input_path, "MARKDOWN")
-                
-                # 创建临时 Markdown 文件
-                temp_md_path = input_path + ".temp.md"
-                try:
-                    with open(temp_md_path, 'w', encoding='utf-8') as f:
-                        f.write(content)
-                    
-                    # 使用本地转换处理 Markdown -> 目标格式
-                    self._convert_markdown_local(temp_md_path, output_path, export_format)
-                finally:
-                    # 清理临时文件
-                    if os.path.exists(temp_md_path):
-                        os.remove(temp_md_path)
+                self._convert_markdown_content(content, input_path, output_path, export_format)
                         
         except Exception as e:
             logger.error(f"Docling 转换失败: {e}")
             raise
     
+    def _convert_markdown_content(self, content: str, input_path: str, output_path: str, export_format: str) -> None:
+        """将内存中的 Markdown 内容经临时文件转换为目标格式"""
+        # 创建临时 Markdown 文件
+        temp_md_path = input_path + ".temp.md"
+        try:
+            with open(temp_md_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            
+            # 使用本地转换处理 Markdown -> 目标格式
+            self._convert_markdown_local(temp_md_path, output_path, export_format)
+        finally:
+            # 清理临时文件
+            if os.path.exists(temp_md_path):
+                os.remove(temp_md_path)
+    
     def _markdown_to_pdf(self, input_path: str, output_path: str) -> None:
-        """Markdown 转 PDF"""
+        """
+        Markdown 转 PDF：普通文档用 WeasyPrint 排版（共享字体缓存），公式密集的文档用 xelatex
+        
+        请求明确指定引擎时只使用该引擎；auto 时另一个引擎作为回退。
+        """
+        requested = requested_pdf_engine().lower()
+        engine = choose_pdf_engine(input_path, requested)
+        backends = {
+            ENGINE_WEASYPRINT: ConversionBackend(
+                ENGINE_WEASYPRINT,
+                lambda src, dst: get_weasyprint_renderer().render_markdown(src, dst),
+                precheck=lambda _: WEASYPRINT_AVAILABLE
+            ),
+            ENGINE_XELATEX: ConversionBackend(
+                ENGINE_XELATEX,
+                self._run_xelatex_markdown_to_pdf,
+                precheck=lambda _: _detect_latex_engine() is not None
+            ),
+        }
+        if requested == ENGINE_AUTO:
+            ordered = [backends[engine]] + [b for name, b in backends.items() if name != engine]
+        else:
+            ordered = [backends[engine]]
+        logger.debug(f"Markdown 转 PDF 引擎: {engine} (请求: {requested})")
+        self.fallback_engine.run('md->PDF', input_path, output_path, ordered, error_label="Markdown转PDF失败")
+    
+    def _run_xelatex_markdown_to_pdf(self, input_path: str, output_path: str) -> None:
+        """pandoc + xelatex 转换 Markdown 为 PDF"""
         try:
             logger.info(f"Pandoc PDF 转换: {input_path} -> {output_path}")
             extra_args = ['--pdf-engine=xelatex', '-V', 'mainfont=SimSun']
@@ -242,23 +421,36 @@ class DocumentConverter:
             logger.error(f"Markdown 转 Excel 失败: {e}")
             raise
     
-    def _convert_pdf_to_docx_direct(self, input_path: str, output_path: str) -> None:
-        """直接PDF转DOCX（保持格式）"""
+    def _convert_pdf_to_docx_direct(self, input_path: str, output_path: str, race: bool = False) -> None:
+        """直接PDF转DOCX（保持格式），预测或实际失败时回退到Docling + OCR"""
+        backends = [
+            ConversionBackend('pdf2docx', self._run_pdf2docx, precheck=self._precheck_pdf2docx),
+            ConversionBackend(
+                'docling',
+                lambda src, dst: self._convert_with_docling(src, dst, "DOCX"),
+                precheck=lambda _: is_docling_available()
+            ),
+        ]
+        winner = self.fallback_engine.run(
+            'pdf->DOCX', input_path, output_path, backends,
+            race=race, error_label="PDF转Word失败"
+        )
+        if winner != 'pdf2docx':
+            logger.info("✅ 回退转换成功（可能格式略有差异）")
+    
+    def _run_pdf2docx(self, input_path: str, output_path: str, start: int = 0, end: Optional[int] = None) -> None:
+        """使用pdf2docx转换指定页范围 [start, end)"""
+        logger.info(f"pdf2docx 直接转换: {input_path} -> {output_path}")
+        # 按路径打开：传入字节流会把整个文件复制一份到内存
+        cv = PDF2DOCXConverter(input_path)
         try:
-            logger.info(f"pdf2docx 直接转换: {input_path} -> {output_path}")
-            
-            # 直接转换
-            cv = PDF2DOCXConverter(input_path)
             cv.convert(
                 output_path, 
-                start=0, 
-                end=None,
+                start=start, 
+                end=end,
                 multi_processing=False,  # 禁用多进程避免兼容性问题
                 cpu_count=1  # 使用单线程
             )
-            cv.close()
-            logger.info("✅ pdf2docx 直接转换成功")
-            
         except Exception as e:
             error_msg = str(e).lower()
             
@@ -268,97 +460,93 @@ class DocumentConverter:
                 logger.info("📋 提示：此PDF可能包含特殊格式的图像，将使用OCR方案处理")
             elif "font" in error_msg:
                 logger.warning(f"pdf2docx遇到字体问题: {e}")
-            else:
-                logger.error(f"pdf2docx转换失败: {e}")
-            
-            logger.info("🔄 自动回退到Docling + OCR方案...")
-            
-            # 回退到原来的方式
-            try:
-                self._convert_with_docling(input_path, output_path, "DOCX")
-                logger.info("✅ 回退转换成功（可能格式略有差异）")
-            except Exception as fallback_e:
-                logger.error(f"❌ 回退转换也失败: {fallback_e}")
-                raise Exception(f"PDF转Word失败: pdf2docx错误={e}, 回退错误={fallback_e}")
+            raise
+        finally:
+            cv.close()
     
-    def _convert_docx_to_pdf_with_pandoc(self, input_path: str, output_path: str) -> None:
-        """使用pandoc直接转换DOCX为PDF（推荐方案）"""
+    def _precheck_pdf2docx(self, input_path: str) -> bool:
+        """
+        预测pdf2docx能否成功
+        
+        先扫描图像色彩空间；只有存在高风险图像时，才对第一个风险页做单页试转，
+        避免整本转换到最后才失败。
+        """
+        risky_pages = find_risky_pdf_pages(input_path, Config.FALLBACK_TRIAL_MAX_PAGES)
+        if not risky_pages:
+            return True
+        
+        trial_page = risky_pages[0]
+        logger.info(f"🔍 第{trial_page + 1}页包含高风险图像，进行单页试转")
+        trial_dir = tempfile.mkdtemp()
         try:
-            logger.info(f"pypandoc 转换: {input_path} -> {output_path}")
-            
-            # 自动检测可用的LaTeX引擎
-            engines = ['xelatex', 'pdflatex', 'lualatex']
-            available_engine = None
-            
-            for engine in engines:
-                try:
-                    import subprocess
-                    result = subprocess.run([engine, '--version'], 
-                                          capture_output=True, timeout=5)
-                    if result.returncode == 0:
-                        available_engine = engine
-                        logger.info(f"✅ 检测到可用的LaTeX引擎: {engine}")
-                        break
-                except:
-                    continue
-            
-            if not available_engine:
-                logger.warning("⚠️ 未检测到LaTeX引擎，尝试默认转换")
-                # 不指定引擎，让pandoc自己选择
-                pypandoc.convert_file(input_path, 'pdf', outputfile=output_path)
-            else:
-                # 使用检测到的引擎，配置中文支持
-                extra_args = [f'--pdf-engine={available_engine}']
-                
-                if available_engine == 'xelatex':
-                    # XeLaTeX对中文支持最好
-                    extra_args.extend([
-                        '-V', 'mainfont=PingFang SC',  # macOS中文字体
-                        '-V', 'CJKmainfont=PingFang SC'
-                    ])
-                elif available_engine == 'lualatex':
-                    # LuaLaTeX也支持中文
-                    extra_args.extend([
-                        '-V', 'mainfont=PingFang SC'
-                    ])
-                
-                logger.info(f"🔧 使用引擎: {available_engine}")
-                pypandoc.convert_file(
-                    input_path, 
-                    'pdf', 
-                    outputfile=output_path,
-                    extra_args=extra_args
-                )
-            
-            # 验证转换结果
-            if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
-                logger.info("✅ pypandoc 转换成功")
-            else:
-                raise Exception("转换完成但输出文件无效")
-                
+            self._run_pdf2docx(input_path, os.path.join(trial_dir, 'trial.docx'),
+                               start=trial_page, end=trial_page + 1)
+            return True
         except Exception as e:
-            error_msg = str(e).lower()
-            
-            if "not found" in error_msg or "engine" in error_msg:
-                logger.warning(f"LaTeX引擎问题: {e}")
-                logger.info("🔄 回退到Docling + HTML方案...")
-                
-                # 回退到Docling方案
-                try:
-                    self._convert_with_docling(input_path, output_path, "PDF")
-                    logger.info("✅ 回退转换成功")
-                except Exception as fallback_e:
-                    logger.error(f"❌ 回退转换也失败: {fallback_e}")
-                    raise Exception(f"DOCX转PDF失败: pandoc错误={e}, Docling错误={fallback_e}")
-            else:
-                logger.error(f"pypandoc转换失败: {e}")
-                raise Exception(f"DOCX转PDF失败: {e}")
+            logger.info(f"pdf2docx 单页试转失败: {e}")
+            return False
+        finally:
+            shutil.rmtree(trial_dir, ignore_errors=True)
     
-    def _convert_docx_to_pdf_direct(self, input_path: str, output_path: str) -> None:
-        """直接DOCX转PDF（保持格式）"""
-        try:
-            logger.info(f"pypandoc 直接转换: {input_path} -> {output_path}")
+    def _convert_docx_to_pdf_with_pandoc(self, input_path: str, output_path: str, race: bool = False) -> None:
+        """使用pandoc直接转换DOCX为PDF（推荐方案），无LaTeX引擎时直接走Docling"""
+        backends = [
+            ConversionBackend(
+                'pandoc',
+                self._run_pandoc_docx_to_pdf,
+                precheck=lambda _: _detect_latex_engine() is not None
+            ),
+            ConversionBackend(
+                'docling',
+                lambda src, dst: self._convert_with_docling(src, dst, "PDF"),
+                precheck=lambda _: is_docling_available()
+            ),
+        ]
+        self.fallback_engine.run(
+            'docx->PDF', input_path, output_path, backends,
+            race=race, error_label="DOCX转PDF失败"
+        )
+    
+    def _run_pandoc_docx_to_pdf(self, input_path: str, output_path: str) -> None:
+        """pandoc + 自动检测的LaTeX引擎转换DOCX为PDF"""
+        logger.info(f"pypandoc 转换: {input_path} -> {output_path}")
+        available_engine = _detect_latex_engine()
+        
+        if not available_engine:
+            logger.warning("⚠️ 未检测到LaTeX引擎，尝试默认转换")
+            # 不指定引擎，让pandoc自己选择
+            pypandoc.convert_file(input_path, 'pdf', outputfile=output_path)
+        else:
+            # 使用检测到的引擎，配置中文支持
+            extra_args = [f'--pdf-engine={available_engine}']
+            
+            if available_engine == 'xelatex':
+                # XeLaTeX对中文支持最好
+                extra_args.extend([
+                    '-V', 'mainfont=PingFang SC',  # macOS中文字体
+                    '-V', 'CJKmainfont=PingFang SC'
+                ])
+            elif available_engine == 'lualatex':
+                # LuaLaTeX也支持中文
+                extra_args.extend([
+                    '-V', 'mainfont=PingFang SC'
+                ])
             
+            logger.info(f"🔧 使用引擎: {available_engine}")
+            pypandoc.convert_file(
+                input_path, 
+                'pdf', 
+                outputfile=output_path,
+                extra_args=extra_args
+            )
+        
+        # 验证转换结果
+        if not (os.path.exists(output_path) and os.path.getsize(output_path) > 0):
+            raise Exception("转换完成但输出文件无效")
+    
+    def _convert_docx_to_pdf_direct(self, input_path: str, output_path: str, race: bool = False) -> None:
+        """直接DOCX转PDF（保持格式）：XeLaTeX -> 默认引擎 -> Docling"""
+        def run_xelatex(src: str, dst: str) -> None:
             # 使用pandoc直接转换DOCX到PDF，保持格式
             extra_args = [
                 '--pdf-engine=xelatex',
@@ -366,44 +554,23 @@ class DocumentConverter:
                 '--from=docx',
                 '--to=pdf'
             ]
-            
-            pypandoc.convert_file(
-                input_path, 
-                'pdf', 
-                outputfile=output_path, 
-                extra_args=extra_args
-            )
-            logger.info("✅ pypandoc DOCX转PDF成功")
-            
-        except Exception as e:
-            error_msg = str(e).lower()
-            
-            # 友好的错误提示
-            if "no pandoc was found" in error_msg:
-                logger.error("Pandoc未安装，请运行: conda install -c conda-forge pandoc")
-                raise Exception("Pandoc未安装")
-            elif "xelatex" in error_msg:
-                logger.warning(f"XeLaTeX引擎问题: {e}")
-                logger.info("🔄 尝试使用默认PDF引擎...")
-                
-                # 回退到默认引擎
-                try:
-                    pypandoc.convert_file(input_path, 'pdf', outputfile=output_path)
-                    logger.info("✅ 使用默认引擎转换成功")
-                except Exception as fallback_e:
-                    logger.error(f"❌ 默认引擎也失败: {fallback_e}")
-                    raise Exception(f"DOCX转PDF失败: {fallback_e}")
-            else:
-                logger.error(f"pypandoc DOCX转PDF失败: {e}")
-                logger.info("🔄 自动回退到Docling + OCR方案...")
-                
-                # 回退到Docling方案
-                try:
-                    self._convert_with_docling(input_path, output_path, "PDF")
-                    logger.info("✅ 回退转换成功（可能格式略有差异）")
-                except Exception as fallback_e:
-                    logger.error(f"❌ 回退转换也失败: {fallback_e}")
-                    raise Exception(f"DOCX转PDF失败: pypandoc错误={e}, 回退错误={fallback_e}")
+            pypandoc.convert_file(src, 'pdf', outputfile=dst, extra_args=extra_args)
+        
+        def run_default(src: str, dst: str) -> None:
+            pypandoc.convert_file(src, 'pdf', outputfile=dst)
+        
+        backends = [
+            ConversionBackend('pandoc-xelatex', run_xelatex,
+                              precheck=lambda _: shutil.which('xelatex') is not None),
+            ConversionBackend('pandoc-default', run_default,
+                              precheck=lambda _: _detect_latex_engine() is not None),
+            ConversionBackend('docling', lambda src, dst: self._convert_with_docling(src, dst, "PDF"),
+                              precheck=lambda _: is_docling_available()),
+        ]
+        self.fallback_engine.run(
+            'docx->PDF(direct)', input_path, output_path, backends,
+            race=race, error_label="DOCX转PDF失败"
+        )
     
     def _convert_caj_file(self, input_path: str, output_path: str, export_format: str) -> None:
         """
@@ -425,21 +592,18 @@ class DocumentConverter:
                 logger.info("检测到CAJ文件实际为PDF格式，直接处理")
                 
                 if export_format == 'PDF':
-                    # 直接复制文件
-                    import shutil
-                    shutil.copy2(input_path, output_path)
+                    # 直接链接（跨文件系统时复制）
+                    link_or_copy(input_path, output_path)
                     logger.info(f"PDF文件复制成功: {output_path}")
                 else:
                     # 对于其他格式，创建临时PDF文件并使用PDF转换逻辑
-                    import tempfile
-                    import shutil
-                    
-                    temp_dir = tempfile.mkdtemp()
+                    # 与上传文件放在同一文件系统，便于硬链接而非复制
+                    temp_dir = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(input_path)))
                     try:
                         # 创建临时PDF文件（正确的扩展名）
                         temp_pdf_name = "temp_pdf_file.pdf"
                         temp_pdf_path = os.path.join(temp_dir, temp_pdf_name)
-                        shutil.copy2(input_path, temp_pdf_path)
+                        link_or_copy(input_path, temp_pdf_path)
                         logger.info(f"创建临时PDF文件: {temp_pdf_path}")
                         
                         # 使用PDF转换逻辑处理
@@ -471,7 +635,6 @@ class DocumentConverter:
                 logger.info(f"CAJ文件需要先转换为PDF，再转换为{export_format}")
                 
                 # 创建临时PDF文件
-                import tempfile
                 temp_dir = tempfile.mkdtemp()
                 
                 try:
@@ -491,7 +654,7 @@ class DocumentConverter:
                     if export_format == 'DOCX' and PDF2DOCX_AVAILABLE:
                         logger.info("步骤2: 使用pdf2docx直接转换为DOCX")
                         self._convert_pdf_to_docx_direct(pdf_path, output_path)
-                    elif export_format in ['MARKDOWN', 'TEXT', 'DOCX', 'XLSX']:
+                    elif export_format in ['MARKDOWN', 'TEXT', 'DOCX', 'XLSX', 'JSONL']:
                         logger.info(f"步骤2: 将PDF转换为{export_format}")
                         self._convert_with_docling(pdf_path, output_path, export_format)
                     else:
@@ -499,7 +662,6 @@ class DocumentConverter:
                         
                 finally:
                     # 清理临时文件
-                    import shutil
                     try:
                         shutil.rmtree(temp_dir)
                     except:
@@ -514,7 +676,6 @@ class DocumentConverter:
                     
                     # 如果输出路径不同，移动文件
                     if pdf_path != output_path:
-                        import shutil
                         shutil.move(pdf_path, output_path)
                     
                     # 提取大纲（可选）
@@ -0,0 +1,273 @@
+"""
+转换后端回退引擎
+预检预测可用后端、可选并行竞速，并按文档指纹记住成功的后端
+"""
+
+import os
+import time
+import hashlib
+import logging
+import threading
+import multiprocessing
+import queue
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+from .input_handle import get_open_handle
+from .logging_setup import restart_after_fork
+
+logger = logging.getLogger(__name__)
+
+# 尝试导入PyMuPDF（用于PDF预检）
+try:
+    import fitz
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    PYMUPDF_AVAILABLE = False
+
+# pdf2docx 转PNG时容易出错的色彩空间/编码
+RISKY_COLORSPACES = ('DeviceCMYK', 'Separation', 'DeviceN', 'Lab')
+RISKY_IMAGE_FILTERS = ('JPXDecode', 'JBIG2Decode')
+
+
+class ConversionBackend:
+    """单个转换后端（名称 + 转换函数 + 可选的廉价预检）"""
+
+    def __init__(self, name: str, convert: Callable[[str, str], None],
+                 precheck: Optional[Callable[[str], bool]] = None):
+        """
+        Args:
+            name: 后端名称，用于日志和指纹记忆
+            convert: 转换函数 convert(input_path, output_path)
+            precheck: 预检函数 precheck(input_path)，返回 False 表示预测会失败
+        """
+        self.name = name
+        self.convert = convert
+        self.precheck = precheck
+
+
+def compute_fingerprint(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """计算文件内容指纹（SHA-256），优先复用已打开的共享句柄"""
+    handle = get_open_handle(file_path)
+    if handle is not None:
+        return handle.sha256
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def find_risky_pdf_pages(file_path: str, max_pages: Optional[int] = None) -> List[int]:
+    """
+    查找包含 pdf2docx 易出错图像（CMYK、专色、JPX 等）的页码
+
+    Args:
+        file_path: PDF文件路径
+        max_pages: 最多检查的页数，None 表示全部
+
+    Returns:
+        list: 有风险的页码（从0开始）
+    """
+    if not PYMUPDF_AVAILABLE:
+        return []
+
+    risky_pages = []
+    handle = get_open_handle(file_path)
+    with (handle.open_pdf() if handle is not None else fitz.open(file_path)) as doc:
+        page_count = doc.page_count if max_pages is None else min(doc.page_count, max_pages)
+        for page_index in range(page_count):
+            for image in doc[page_index].get_images(full=True):
+                # (xref, smask, width, height, bpc, colorspace, alt_colorspace, name, filter, ...)
+                colorspace, alt_colorspace, image_filter = image[5], image[6], image[8]
+                if (colorspace in RISKY_COLORSPACES or alt_colorspace in RISKY_COLORSPACES
+                        or image_filter in RISKY_IMAGE_FILTERS):
+                    risky_pages.append(page_index)
+                    break
+    return risky_pages
+
+
+def _race_worker(backend: ConversionBackend, input_path: str, output_path: str, result_queue) -> None:
+    """竞速子进程入口"""
+    # 父进程的日志线程不会被继承，队列锁也可能在 fork 时被其它线程持有，先换成子进程自己的队列和线程
+    restart_after_fork()
+    try:
+        backend.convert(input_path, output_path)
+        result_queue.put((backend.name, None))
+    except Exception as e:
+        result_queue.put((backend.name, str(e)))
+
+
+class FallbackEngine:
+    """两级回退转换引擎"""
+
+    def __init__(self, memory_size: int = 1024, race_timeout: int = 300):
+        """
+        Args:
+            memory_size: 指纹记忆的最大条目数（LRU）
+            race_timeout: 并行竞速的总等待时间（秒），从启动子进程起计算
+        """
+        self.memory_size = memory_size
+        self.race_timeout = race_timeout
+        self._memory: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def recall(self, route: str, fingerprint: str) -> Optional[str]:
+        """查询该文档在此转换路线上曾经成功的后端"""
+        with self._lock:
+            key = (route, fingerprint)
+            backend_name = self._memory.get(key)
+            if backend_name is not None:
+                self._memory.move_to_end(key)
+            return backend_name
+
+    def remember(self, route: str, fingerprint: str, backend_name: str) -> None:
+        """记住该文档在此转换路线上成功的后端"""
+        with self._lock:
+            self._memory[(route, fingerprint)] = backend_name
+            self._memory.move_to_end((route, fingerprint))
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    def run(self, route: str, input_path: str, output_path: str,
+            backends: List[ConversionBackend], race: bool = False,
+            error_label: str = "转换失败") -> str:
+        """
+        按预测顺序执行转换，返回成功的后端名称
+
+        Args:
+            route: 转换路线标识，例如 "pdf->DOCX"
+            input_path: 输入文件路径
+            output_path: 输出文件路径
+            backends: 候选后端（按默认优先级排序）
+            race: 是否并行竞速（仅用于交互式请求）
+            error_label: 全部失败时的错误前缀
+
+        Raises:
+            Exception: 所有后端均失败时抛出异常
+        """
+        fingerprint = compute_fingerprint(input_path)
+        ordered = self._order_backends(route, fingerprint, backends)
+        candidates = self._precheck(ordered, input_path)
+
+        errors: Dict[str, str] = {}
+        if race and len(candidates) > 1 and self._race_supported():
+            winner = self._run_race(candidates, input_path, output_path, errors)
+        else:
+            winner = self._run_sequential(candidates, input_path, output_path, errors)
+
+        if winner is None:
+            details = ", ".join(f"{name}错误={error}" for name, error in errors.items())
+            raise Exception(f"{error_label}: {details}")
+
+        self.remember(route, fingerprint, winner)
+        return winner
+
+    def _order_backends(self, route: str, fingerprint: str,
+                        backends: List[ConversionBackend]) -> List[ConversionBackend]:
+        """把曾经成功的后端排到最前"""
+        remembered = self.recall(route, fingerprint)
+        if remembered is None:
+            return list(backends)
+        logger.info(f"🧠 该文档曾使用 {remembered} 转换成功，优先尝试")
+        return sorted(backends, key=lambda backend: backend.name != remembered)
+
+    def _precheck(self, backends: List[ConversionBackend], input_path: str) -> List[ConversionBackend]:
+        """运行廉价预检，剔除预测会失败的后端"""
+        candidates = []
+        for backend in backends:
+            if backend.precheck is None:
+                candidates.append(backend)
+                continue
+            try:
+                if backend.precheck(input_path):
+                    candidates.append(backend)
+                else:
+                    logger.info(f"⏭️ 预检预测 {backend.name} 会失败，跳过")
+            except Exception as e:
+                # 预检本身出错时不做判断，保留该后端
+                logger.warning(f"{backend.name} 预检出错，保留该后端: {e}")
+                candidates.append(backend)
+
+        # 所有后端都被预测失败时，仍按原顺序尝试
+        return candidates or list(backends)
+
+    def _run_sequential(self, backends: List[ConversionBackend], input_path: str,
+                        output_path: str, errors: Dict[str, str]) -> Optional[str]:
+        """依次尝试各后端"""
+        for backend in backends:
+            try:
+                logger.info(f"🔧 使用 {backend.name} 转换")
+                backend.convert(input_path, output_path)
+                logger.info(f"✅ {backend.name} 转换成功")
+                return backend.name
+            except Exception as e:
+                logger.warning(f"{backend.name} 转换失败: {e}")
+                errors[backend.name] = str(e)
+        return None
+
+    def _race_supported(self) -> bool:
+        """
+        竞速依赖 fork：子进程直接沿用已加载的 Docling 模型，后端转换函数（闭包、绑定方法）也无需序列化
+
+        spawn / forkserver 需要在每个子进程中重新加载模型，比竞速节省的时间还长，因此不使用。
+        代价是在多线程进程中 fork：其它线程持有的锁在子进程里不会释放。子进程只运行一个后端，
+        日志改用新队列和线程（见 _race_worker），不访问父进程的任务表连接；Docling 后端在子进程中
+        使用 PyTorch/OpenMP 线程池时仍有挂起的可能，由竞速总超时兜底并终止。竞速默认关闭
+        （FALLBACK_RACE_ENABLED）。
+        """
+        return 'fork' in multiprocessing.get_all_start_methods()
+
+    def _run_race(self, backends: List[ConversionBackend], input_path: str,
+                  output_path: str, errors: Dict[str, str]) -> Optional[str]:
+        """并行运行各后端，取第一个成功者并终止其余进程"""
+        ctx = multiprocessing.get_context('fork')
+        result_queue = ctx.Queue()
+        output_dir, output_name = os.path.split(output_path)
+
+        processes = {}
+        part_paths = {}
+        for backend in backends:
+            # 保留原扩展名，部分后端依据扩展名决定输出格式
+            part_paths[backend.name] = os.path.join(output_dir, f".{backend.name}.{output_name}")
+            process = ctx.Process(
+                target=_race_worker,
+                args=(backend, input_path, part_paths[backend.name], result_queue)
+            )
+            process.start()
+            processes[backend.name] = process
+        logger.info(f"🏁 并行竞速: {', '.join(processes)}")
+
+        winner = None
+        # 整场竞速共用一个截止时间，每次只等待剩余时间
+        deadline = time.monotonic() + self.race_timeout
+        try:
+            pending = set(processes)
+            while pending and winner is None:
+                try:
+                    name, error = result_queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    for name in pending:
+                        errors[name] = "竞速超时"
+                    break
+                pending.discard(name)
+                if error is None and os.path.exists(part_paths[name]):
+                    winner = name
+                    os.replace(part_paths[name], output_path)
+                    logger.info(f"✅ {name} 赢得竞速")
+                else:
+                    errors[name] = error or "未生成输出文件"
+        finally:
+            for name, process in processes.items():
+                if process.is_alive():
+                    logger.debug(f"终止竞速失败者: {name}")
+                    process.terminate()
+                process.join(timeout=5)
+            for name, part_path in part_paths.items():
+                if os.path.exists(part_path):
+                    try:
+                        os.remove(part_path)
+                    except OSError:
+                        pass
+            result_queue.close()
+
+        return winner
@@ -0,0 +1,176 @@
+"""
+输入文件句柄模块
+上传文件只做一次内存映射，哈希、格式嗅探、页面拆分和文本读取共享同一视图；
+只接受路径的后端（Docling、pdf2docx）直接按路径打开，不再把整个文件复制到内存中转交
+"""
+
+import io
+import os
+import mmap
+import hashlib
+import logging
+import shutil
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# 尝试导入PyMuPDF
+try:
+    import fitz
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    PYMUPDF_AVAILABLE = False
+
+
+class InputHandle:
+    """上传文件的只读内存映射视图"""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: 输入文件路径
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        self.size = os.fstat(self._file.fileno()).st_size
+        # 空文件无法映射，使用空视图
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+        self.view = memoryview(self._mmap) if self._mmap is not None else memoryview(b'')
+        self._sha256: Optional[str] = None
+        # 统计各环节从映射中读取的字节数，便于观察重复读取
+        self.stats = {'hash': 0, 'sniff': 0, 'read': 0}
+
+    def header(self, length: int = 8) -> bytes:
+        """读取文件头部，用于格式嗅探"""
+        self.stats['sniff'] += min(length, self.size)
+        return bytes(self.view[:length])
+
+    @property
+    def sha256(self) -> str:
+        """内容指纹（只计算一次）"""
+        if self._sha256 is None:
+            self._sha256 = hashlib.sha256(self.view).hexdigest()
+            self.stats['hash'] += self.size
+        return self._sha256
+
+    def reader(self) -> io.BufferedReader:
+        """返回直接读取映射视图的二进制流（按块读取，不复制整个文件）"""
+        return io.BufferedReader(_MappedReader(self))
+
+    def open_pdf(self):
+        """基于共享视图打开PDF（PyMuPDF），不支持时退回按路径打开"""
+        if not PYMUPDF_AVAILABLE:
+            raise Exception("PyMuPDF未安装")
+        try:
+            return fitz.open(stream=self.view, filetype='pdf')
+        except (TypeError, ValueError):
+            return fitz.open(self.path)
+
+    def close(self) -> None:
+        """释放映射和文件描述符"""
+        try:
+            self.view.release()
+            if self._mmap is not None:
+                self._mmap.close()
+        except BufferError:
+            # 仍有后端持有视图时交给垃圾回收释放
+            logger.debug(f"输入映射仍被引用，延迟释放: {self.path}")
+        self._file.close()
+
+
+class _MappedReader(io.RawIOBase):
+    """映射视图上的只读原始流"""
+
+    def __init__(self, handle: InputHandle):
+        self._handle = handle
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        view = self._handle.view[self._position:self._position + len(buffer)]
+        count = len(view)
+        memoryview(buffer).cast('B')[:count] = view
+        view.release()
+        self._position += count
+        self._handle.stats['read'] += count
+        return count
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: self._handle.size}[whence]
+        self._position = max(base + offset, 0)
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+
+# 当前打开的句柄（按真实路径索引），同一文件在一次转换中只映射一次
+_open_handles: Dict[str, InputHandle] = {}
+_refcounts: Dict[str, int] = {}
+_lock = threading.Lock()
+
+
+@contextmanager
+def open_input(path: str) -> Iterator[InputHandle]:
+    """
+    打开（或复用）文件的共享句柄
+
+    Args:
+        path: 输入文件路径
+    """
+    key = os.path.realpath(path)
+    with _lock:
+        handle = _open_handles.get(key)
+        if handle is None:
+            handle = InputHandle(path)
+            _open_handles[key] = handle
+            _refcounts[key] = 0
+        _refcounts[key] += 1
+    try:
+        yield handle
+    finally:
+        with _lock:
+            _refcounts[key] -= 1
+            if _refcounts[key] == 0:
+                del _refcounts[key]
+                del _open_handles[key]
+                logger.debug(f"释放输入映射: {path} ({handle.size} bytes, 读取统计: {handle.stats})")
+                handle.close()
+
+
+def get_open_handle(path: str) -> Optional[InputHandle]:
+    """获取路径对应的已打开句柄，没有则返回 None"""
+    with _lock:
+        return _open_handles.get(os.path.realpath(path))
+
+
+def read_header(path: str, length: int = 8) -> bytes:
+    """读取文件头部，优先使用已打开的共享句柄"""
+    handle = get_open_handle(path)
+    if handle is not None:
+        return handle.header(length)
+    with open(path, 'rb') as f:
+        return f.read(length)
+
+
+def open_text(path: str, encoding: str, errors: str = 'strict', newline: Optional[str] = None):
+    """以文本方式读取输入文件，优先读取已打开的共享映射"""
+    handle = get_open_handle(path)
+    if handle is not None:
+        return io.TextIOWrapper(handle.reader(), encoding=encoding, errors=errors, newline=newline)
+    return open(path, 'r', encoding=encoding, errors=errors, newline=newline)
+
+
+def link_or_copy(src: str, dst: str) -> None:
+    """优先创建硬链接（零拷贝），跨文件系统时退回复制"""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
@@ -0,0 +1,490 @@
+"""
+转换任务执行模块
+从持久化任务表领取任务并在线程池中执行，负责心跳、中断恢复和过期清理
+"""
+
+import os
+import re
+import time
+import uuid
+import hashlib
+import shutil
+import socket
+import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import Config
+from .job_store import JobStore, get_job_store, STATE_SUCCEEDED, STATE_FAILED
+from .artifact_store import ArtifactStore, get_artifact_store
+from .scheduler import CostModel, JobScheduler, estimate_job, get_cost_model
+from .admission import (AdmissionController, PeakRssTracker, create_admission_controller, get_memory_model,
+                        memory_units)
+from .logging_setup import log_context
+from .profiler import profile_conversion, purge_profiles
+from .output_optimizer import optimize_output
+
+logger = logging.getLogger(__name__)
+
+# 边转换边写出的导出格式：运行中的结果可通过 /jobs/<job_id>/chunks 读取
+STREAMED_FORMATS = ('JSONL',)
+
+
+def clean_filename(name: str) -> str:
+    """清理文件名：处理过长和特殊字符"""
+    # 替换可能有问题的字符
+    name = re.sub(r'[、。，；：""''（）【】《》？！]', '_', name)
+    name = re.sub(r'[^\w\-_\u4e00-\u9fff]', '_', name)  # 保留中文、英文、数字、下划线、连字符
+    # 限制长度
+    if len(name) > 50:
+        name = name[:50]
+    return name
+
+
+def output_extension(export_format: str) -> str:
+    """导出格式对应的文件扩展名"""
+    output_ext = export_format.lower()
+    if output_ext == 'markdown':
+        output_ext = 'md'
+    elif output_ext == 'text':
+        output_ext = 'txt'
+    return output_ext
+
+
+def file_sha256(path: str) -> str:
+    """文件内容哈希（按块读取）"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class UnroutableJobError(Exception):
+    """没有在线 worker 具备执行该转换所需的能力"""
+
+    def __init__(self, required: List[str]):
+        self.required = required
+        super().__init__(f"没有可执行该任务的 worker（需要 {', '.join(required) or '无'}）")
+
+
+def enqueue_conversion(src_path: str, input_name: str, export_format: str,
+                       options: Optional[Dict[str, Any]] = None, client_id: Optional[str] = None,
+                       job_id: Optional[str] = None) -> Tuple[str, bool]:
+    """
+    登记转换任务：检查能力路由、复用已有结果、估算耗时和内存、写入文件存储和任务表
+
+    Web 接口和 MCP 服务共用，任务由任一具备能力的执行器（Web 进程内线程或独立 worker）领取。
+
+    Args:
+        src_path: 本地输入文件（写入文件存储时硬链接或复制，调用方可随后删除）
+        input_name: 上传时的原始文件名（扩展名决定转换路线，结果下载名沿用原始文件名；存储时另行清理）
+        export_format: 导出格式
+        options: 转换选项
+        client_id: 提交方标识（公平调度）
+        job_id: 指定任务ID，默认自动生成
+
+    Returns:
+        tuple: (任务ID, 是否复用了已完成任务的结果)；复用时新建一条已完成的任务记录指向已有结果，
+               下载名和提交方仍属于本次请求
+
+    Raises:
+        UnroutableJobError: 没有在线 worker 能执行该转换
+    """
+    from .capabilities import required_capabilities
+    export_format = export_format.upper()
+    options = options or {}
+    store = get_job_store()
+    input_ext = input_name.rsplit('.', 1)[-1].lower()
+    input_hash = file_sha256(src_path)
+
+    job_id = job_id or uuid.uuid4().hex
+    input_base, input_ext_raw = input_name.rsplit('.', 1)
+
+    # 同一输入、格式和选项的结果还在保留期内时直接复用（分析请求需要实际执行）
+    if Config.RESULT_REUSE_ENABLED and not options.get('profile'):
+        previous = store.find_result(input_hash, export_format, options)
+        if previous is not None and get_artifact_store().exists(previous['result_path']):
+            logger.info(f"♻️ 复用任务 {previous['id']} 的结果: {input_name} -> {export_format} (任务 {job_id})")
+            # 本次请求自己的任务记录：文件存储中的输入和结果沿用已有任务的，与其同时过期
+            store.create_job(previous['input_path'], input_name, os.path.getsize(src_path), export_format,
+                             options=options, input_hash=input_hash, client_id=client_id, job_id=job_id)
+            store.mark_succeeded(job_id, previous['result_path'],
+                                 f"{input_base}.{output_extension(export_format)}", previous['result_size'],
+                                 previous['expires_at'] - time.time())
+            return job_id, True
+
+    # 只把任务交给具备所需能力的 worker；没有在线 worker 能执行时直接拒绝
+    required = required_capabilities(input_ext, export_format, src_path, options.get('pdf_engine'))
+    if not store.can_route(required, Config.JOB_STALE_AFTER):
+        logger.warning(f"没有可执行该任务的 worker: {input_ext} -> {export_format} (需要 {required})")
+        raise UnroutableJobError(required)
+
+    # 执行前估算耗时，调度器据此短任务优先并在客户端之间公平分配
+    estimate = estimate_job(src_path, export_format)
+    estimated_cost = get_cost_model().predict(estimate['route'], estimate['units'])
+    # 峰值内存按页数、扫描分辨率、表格行数估算，worker 据此做内存准入
+    job_memory_units = memory_units(estimate)
+    estimated_memory_mb = get_memory_model().predict(estimate['route'], job_memory_units)
+    logger.debug("任务估算: %s, %.1f 单位, 预计 %.1fs / %.0fMB", estimate['route'], estimate['units'],
+                 estimated_cost, estimated_memory_mb)
+
+    artifacts = get_artifact_store()
+    try:
+        input_key = artifacts.put(job_id, f"{clean_filename(input_base)}.{input_ext_raw}", src_path)
+        store.create_job(input_key, input_name, os.path.getsize(src_path), export_format, options=options,
+                         input_hash=input_hash, required_capabilities=required,
+                         client_id=client_id, cost_route=estimate['route'], cost_units=estimate['units'],
+                         estimated_cost=estimated_cost, memory_units=job_memory_units,
+                         estimated_memory_mb=estimated_memory_mb, job_id=job_id)
+    except Exception:
+        artifacts.delete_job(job_id)
+        raise
+    return job_id, False
+
+
+class JobRunner:
+    """
+    任务执行器
+
+    Web 进程内和独立 worker（python -m modules.worker）共用同一套逻辑：
+    调度线程在有空闲转换线程时，从共享队列中按调度器排序领取能力匹配的任务。
+    """
+
+    def __init__(self, store: JobStore, artifacts: ArtifactStore, max_workers: int,
+                 capabilities: List[str], worker_id: Optional[str] = None,
+                 scheduler: Optional[JobScheduler] = None, cost_model: Optional[CostModel] = None,
+                 admission: Optional[AdmissionController] = None):
+        """
+        Args:
+            store: 任务表（共享队列）
+            artifacts: 任务文件存储
+            max_workers: 并发转换线程数，0 表示本进程只登记任务不执行
+            capabilities: 本进程可执行的转换能力
+            worker_id: worker 标识，默认 主机名:进程号
+            scheduler: 排队任务的调度策略，None 表示先进先出
+            cost_model: 耗时模型，任务成功后用实际耗时更新
+            admission: 内存准入控制，None 表示只按线程数限制并发
+        """
+        self.store = store
+        self.artifacts = artifacts
+        self.max_workers = max_workers
+        self.capabilities = list(capabilities)
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.scheduler = scheduler
+        self.cost_model = cost_model
+        self.admission = admission
+        self._plans: Dict[str, Dict[str, Any]] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='convert') \
+            if max_workers > 0 else None
+        self._slots = threading.BoundedSemaphore(max(max_workers, 1))
+        self._events: Dict[str, threading.Event] = {}
+        self._running: set = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._janitor = threading.Thread(target=self._janitor_loop, daemon=True, name='job-janitor')
+        self._dispatcher: Optional[threading.Thread] = None
+
+    def start(self, dispatch: bool = True) -> None:
+        """
+        登记能力、恢复中断的任务并启动后台线程
+
+        Args:
+            dispatch: 是否在后台线程中领取任务；独立 worker 在主线程调用 serve_forever()
+        """
+        if self._executor is not None:
+            self.store.register_worker(self.worker_id, self.capabilities, self.max_workers)
+            if dispatch:
+                self._dispatcher = threading.Thread(target=self.serve_forever, args=(Config.WORKER_POLL_INTERVAL,),
+                                                    daemon=True, name='job-dispatcher')
+                self._dispatcher.start()
+        self.recover()
+        self._janitor.start()
+        logger.info(f"任务执行器已启动: {self.worker_id} (线程: {self.max_workers}, "
+                    f"能力: {', '.join(self.capabilities) or '无'})")
+
+    def submit(self, job_id: str) -> None:
+        """通知调度线程有新任务；任务何时、在哪个 worker 上执行由调度器决定"""
+        if self._executor is None:
+            return
+        with self._lock:
+            self._events.setdefault(job_id, threading.Event())
+        self._wakeup.set()
+
+    def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        等待任务结束并返回任务记录
+
+        本进程执行的任务由事件唤醒；其它进程执行的任务轮询任务表。
+        """
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            event = self._events.get(job_id)
+        try:
+            while True:
+                job = self.store.get(job_id)
+                if job is None or job['state'] in (STATE_SUCCEEDED, STATE_FAILED):
+                    return job
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return job
+                if event is not None:
+                    event.wait(min(remaining, 1.0))
+                else:
+                    time.sleep(min(remaining, 0.5))
+        finally:
+            with self._lock:
+                self._events.pop(job_id, None)
+
+    def serve_forever(self, poll_interval: float = 1.0) -> None:
+        """从共享队列持续领取任务，直到 stop()"""
+        if self._executor is None:
+            raise ValueError("worker 线程数必须大于 0")
+        while not self._stop_event.is_set():
+            # 有空闲线程时才领取，避免把任务占在本机排队
+            if not self._slots.acquire(timeout=poll_interval):
+                continue
+            try:
+                job = self.store.claim_next(self.worker_id, self.capabilities, order=self._order,
+                                            reservation=self._reservation)
+            except Exception as e:
+                logger.warning(f"领取任务失败: {e}")
+                job = None
+            if job is None:
+                self._slots.release()
+                # 新任务提交或轮询间隔到期时再次尝试
+                self._wakeup.wait(poll_interval)
+                self._wakeup.clear()
+                continue
+            plan = self._plans.pop(job['id'], None)
+            self._plans.clear()
+            if plan is not None:
+                if plan['page_shard']:
+                    # 超出内存预算的大 PDF 降级为分片识别（只影响本次执行，不写回任务表）
+                    job['options']['page_shard'] = plan['page_shard']
+                    logger.info(f"任务 {job['id']} 预计内存超过预算，按每片 {plan['page_shard']} 页分片执行")
+            logger.info(f"📥 领取任务: {job['id']} ({job['input_name']} -> {job['export_format']}, "
+                        f"预计 {job.get('estimated_cost') or 0:.1f}s / {plan['memory_mb'] if plan else 0:.0f}MB)")
+            self._executor.submit(self._run_claimed, job)
+
+    def _order(self, jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """按调度策略排序候选任务，再筛掉内存预算暂时容纳不下的任务"""
+        if self.scheduler is not None:
+            jobs = self.scheduler.order(jobs, self.store.load_by_client())
+        if self.admission is not None:
+            jobs, self._plans = self.admission.select(jobs)
+        return jobs
+
+    def _reservation(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """领取任务时在任务表中写入的内存预留"""
+        if self.admission is None:
+            return {}
+        return self.admission.claim_args(self._plans.get(job['id']))
+
+    def _run_claimed(self, job: Dict[str, Any]) -> None:
+        """执行已领取的任务"""
+        job_id = job['id']
+        with self._lock:
+            self._running.add(job_id)
+        try:
+            with log_context(job_id=job_id):
+                self._execute(job)
+        except Exception as e:
+            logger.error(f"执行任务 {job_id} 时发生意外错误: {e}", exc_info=True)
+        finally:
+            with self._lock:
+                self._running.discard(job_id)
+                event = self._events.get(job_id)
+            if event is not None:
+                event.set()
+            if self.admission is not None:
+                self.admission.release(job_id)
+            self._slots.release()
+            # 释放的内存和线程可能让排队任务可以开始
+            self._wakeup.set()
+
+    def _execute(self, job: Dict[str, Any]) -> None:
+        """调用统一转换器完成任务，结果写入文件存储"""
+        from .document_converter import get_document_converter
+
+        job_id = job['id']
+        options = dict(job['options'])
+        output_ext = output_extension(job['export_format'])
+        base_name = job['input_name'].rsplit('.', 1)[0]
+        result_name = f"{base_name}.{output_ext}"
+        input_path = self.artifacts.local_path(job['input_path'])
+        # 在本地临时目录中转换，完成后再写入（可能是共享的）文件存储
+        work_dir = tempfile.mkdtemp(prefix=f"job_{job_id[:8]}_")
+        file_name = f"{clean_filename(base_name)}.{output_ext}"
+        # 流式格式直接写到存储中可被读取的位置，客户端无需等待整个任务完成
+        partial_path = self.artifacts.partial_path(job_id) if job['export_format'] in STREAMED_FORMATS else None
+        output_path = partial_path or os.path.join(work_dir, file_name)
+
+        if options.pop('profile', False):
+            profiling = profile_conversion(
+                job_id, Config.PROFILE_FOLDER,
+                metadata={'filename': job['input_name'], 'export_format': job['export_format']},
+                interval=Config.PROFILE_INTERVAL
+            )
+        else:
+            profiling = nullcontext()
+
+        tracker = PeakRssTracker(Config.MEMORY_SAMPLE_INTERVAL, concurrency=lambda: len(self._running))
+        started = time.time()
+        try:
+            with profiling, tracker:
+                get_document_converter().convert_document(
+                    input_path, output_path, job['export_format'], options=options
+                )
+
+            # 验证输出文件是否真的存在
+            if not os.path.exists(output_path):
+                raise Exception("转换失败：输出文件未生成。可能是文件名过长或包含特殊字符导致的问题。")
+            if os.path.getsize(output_path) == 0:
+                raise Exception("转换失败：生成的文件为空")
+            if Config.OUTPUT_OPTIMIZE_ENABLED:
+                bytes_saved = optimize_output(output_path, job['export_format'],
+                                              Config.OUTPUT_IMAGE_DPI, Config.OUTPUT_JPEG_QUALITY,
+                                              Config.OUTPUT_LOSSY_IMAGES)
+                self.store.record_bytes_saved(job_id, bytes_saved)
+            result_size = os.path.getsize(output_path)
+
+            result_key = self.artifacts.put(job_id, file_name, output_path)
+            self.store.mark_succeeded(job_id, result_key, result_name, result_size, Config.JOB_RESULT_TTL)
+            self._index_result(job, input_path, output_path)
+            if self.cost_model is not None and job.get('cost_route'):
+                self.cost_model.observe(job['cost_route'], job['cost_units'] or 0, time.time() - started)
+            # 并发或分片执行时 RSS 增量不能代表该任务单独运行的峰值
+            if self.admission is not None and job.get('cost_route') and tracker.peak_mb \
+                    and tracker.exclusive and not options.get('page_shard'):
+                self.admission.model.observe(job['cost_route'], job.get('memory_units') or 0, tracker.peak_mb)
+            logger.info(f"✅ 任务完成: {job_id} -> {result_key} (大小: {result_size} bytes)")
+        except Exception as e:
+            logger.error(f"任务失败: {job_id}: {e}", exc_info=True)
+            self.store.mark_failed(job_id, str(e), Config.JOB_RESULT_TTL)
+        finally:
+            if tracker.peak_mb is not None:
+                self.store.record_peak_memory(job_id, tracker.peak_mb)
+                logger.debug("任务 %s 峰值内存增量: %.0fMB", job_id, tracker.peak_mb)
+            shutil.rmtree(work_dir, ignore_errors=True)
+            if partial_path and os.path.exists(partial_path):
+                os.remove(partial_path)
+
+    @staticmethod
+    def _index_result(job: Dict[str, Any], input_path: str, output_path: str) -> None:
+        """把成功的转换写入全文索引；索引失败不影响任务结果"""
+        from .search_index import get_search_index
+
+        index = get_search_index()
+        if index is None or not job.get('input_hash'):
+            return
+        try:
+            index.index_conversion(job['input_hash'], job['input_name'], input_path, output_path,
+                                   job['export_format'], job_id=job['id'])
+        except Exception as e:
+            logger.warning(f"写入全文索引失败: {job['id']}: {e}")
+
+    def recover(self) -> None:
+        """重试心跳超时的运行中任务（所属进程已退出或卡死）"""
+        for job in self.store.list_stale_running(Config.JOB_STALE_AFTER):
+            if job['attempts'] >= Config.JOB_MAX_ATTEMPTS:
+                logger.warning(f"任务 {job['id']} 已中断 {job['attempts']} 次，标记为失败")
+                self.store.mark_failed(job['id'], "转换多次中断，已放弃", Config.JOB_RESULT_TTL)
+            elif self.store.requeue(job['id'], f"心跳超时（原执行器 {job['worker']}）"):
+                logger.info(f"♻️ 重新排队中断的任务: {job['id']}")
+                self._wakeup.set()
+
+    def cleanup_expired(self) -> None:
+        """删除过期任务的文件和记录，以及超过同一保留时间的分析文件"""
+        for job in self.store.list_expired():
+            self.artifacts.delete_job(job['id'])
+            self.store.delete(job['id'])
+            logger.debug("已清理过期任务: %s", job['id'])
+        purge_profiles(Config.PROFILE_FOLDER, Config.JOB_RESULT_TTL)
+
+    def _janitor_loop(self) -> None:
+        """定期心跳、恢复和清理"""
+        while not self._stop_event.wait(Config.JOB_JANITOR_INTERVAL):
+            try:
+                with self._lock:
+                    running = list(self._running)
+                self.store.heartbeat(running)
+                if self._executor is not None:
+                    self.store.touch_worker(self.worker_id)
+                self.recover()
+                self.cleanup_expired()
+            except Exception as e:
+                logger.warning(f"任务维护失败: {e}")
+
+    def stop(self) -> None:
+        """停止领取新任务（可在信号处理函数中调用）"""
+        self._stop_event.set()
+        self._wakeup.set()
+
+    def shutdown(self, wait: bool = False) -> None:
+        """停止领取新任务；wait=True 时等待进行中的任务完成"""
+        self.stop()
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self.store.unregister_worker(self.worker_id)
+
+
+    def abandon(self, reason: str) -> List[str]:
+        """
+        进程即将退出（gunicorn 回收 worker）：停止领取任务，把本执行器运行中的任务立即放回队列
+
+        不等待进行中的转换，其它 worker 无需等到心跳超时（JOB_STALE_AFTER）即可接手。
+
+        Returns:
+            List[str]: 放回队列的任务ID
+        """
+        self.stop()
+        if self._executor is None:
+            return []
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        requeued = self.store.requeue_worker(self.worker_id, reason)
+        self.store.unregister_worker(self.worker_id)
+        if requeued:
+            logger.info(f"♻️ 执行器 {self.worker_id} 退出，{len(requeued)} 个运行中的任务已放回队列")
+        return requeued
+
+
+def create_scheduler() -> Optional[JobScheduler]:
+    """按配置创建调度策略（SCHEDULER_POLICY=fifo 时返回 None）"""
+    if Config.SCHEDULER_POLICY == 'fifo':
+        return None
+    return JobScheduler(Config.SCHEDULER_AGING_RATE, Config.SCHEDULER_FAIR_SHARE_WEIGHT)
+
+
+# 全局实例（按进程区分，fork 出的 worker 各自创建）
+_job_runner: Optional[JobRunner] = None
+_job_runner_pid: Optional[int] = None
+_job_runner_lock = threading.Lock()
+
+
+def get_job_runner() -> JobRunner:
+    """获取本进程的任务执行器，首次调用时启动并恢复中断任务"""
+    global _job_runner, _job_runner_pid
+    if _job_runner is None or _job_runner_pid != os.getpid():
+        with _job_runner_lock:
+            if _job_runner is None or _job_runner_pid != os.getpid():
+                from .capabilities import detect_capabilities
+                capabilities = detect_capabilities() if Config.JOB_WORKERS > 0 else []
+                runner = JobRunner(get_job_store(), get_artifact_store(), Config.JOB_WORKERS, capabilities,
+                                   scheduler=create_scheduler(), cost_model=get_cost_model(),
+                                   admission=create_admission_controller() if Config.JOB_WORKERS > 0 else None)
+                runner.start()
+                _job_runner, _job_runner_pid = runner, os.getpid()
+    return _job_runner
+
+
+def release_job_runner(reason: str) -> List[str]:
+    """进程退出前放弃本进程的任务执行器（未创建时什么也不做），返回放回队列的任务ID"""
+    with _job_runner_lock:
+        if _job_runner is None or _job_runner_pid != os.getpid():
+            return []
+        return _job_runner.abandon(reason)
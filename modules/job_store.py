@@ -0,0 +1,509 @@
+"""
+转换任务持久化模块
+基于 SQLite（WAL 模式）记录任务输入、状态流转、耗时和结果位置，进程重启后可恢复
+
+任务表同时是转换 worker 的共享队列：worker 登记自己的能力，只领取能力满足要求的任务。
+单机或共享目录上的多进程直接使用；其它队列实现可通过 JOB_QUEUE='模块:类名' 指定。
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import importlib
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 任务状态
+STATE_QUEUED = 'queued'
+STATE_RUNNING = 'running'
+STATE_SUCCEEDED = 'succeeded'
+STATE_FAILED = 'failed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    input_path TEXT NOT NULL,          -- 文件存储中的键（job_id/文件名）
+    input_name TEXT NOT NULL,
+    input_hash TEXT,
+    input_size INTEGER,
+    export_format TEXT NOT NULL,
+    options TEXT,
+    required_capabilities TEXT,
+    client_id TEXT,                    -- 提交方（公平调度）
+    cost_route TEXT,                   -- 耗时模型路线
+    cost_units REAL,                   -- 页数或 MB
+    estimated_cost REAL,               -- 预计耗时（秒）
+    memory_units REAL,                 -- 内存模型单位数
+    estimated_memory_mb REAL,          -- 预计峰值内存
+    peak_memory_mb REAL,               -- 实际峰值内存（相对执行前的 RSS 增量）
+    bytes_saved INTEGER,               -- 输出体积优化节省的字节数
+    reserved_memory_mb REAL,           -- 执行期间在所在主机上预留的内存（内存准入）
+    reserved_host TEXT,                -- 预留内存的主机
+    result_path TEXT,                  -- 文件存储中的键
+    result_name TEXT,
+    result_size INTEGER,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    heartbeat_at REAL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs(state);
+CREATE INDEX IF NOT EXISTS idx_jobs_expires ON jobs(expires_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_input_hash ON jobs(input_hash);
+CREATE TABLE IF NOT EXISTS job_events (
+    job_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    at REAL NOT NULL,
+    detail TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_job_events_job ON job_events(job_id);
+CREATE TABLE IF NOT EXISTS workers (
+    id TEXT PRIMARY KEY,
+    capabilities TEXT NOT NULL,
+    slots INTEGER NOT NULL,
+    started_at REAL NOT NULL,
+    heartbeat_at REAL NOT NULL
+);
+"""
+
+# 影响转换结果的选项：只有这些选项相同的任务才能复用结果
+RESULT_OPTIONS = ('ocr_profile', 'upright', 'pdf_engine', 'chunk_size', 'chunk_overlap')
+
+# 旧版本数据库缺少的列
+MIGRATIONS = {
+    'required_capabilities': 'ALTER TABLE jobs ADD COLUMN required_capabilities TEXT',
+    'client_id': 'ALTER TABLE jobs ADD COLUMN client_id TEXT',
+    'cost_route': 'ALTER TABLE jobs ADD COLUMN cost_route TEXT',
+    'cost_units': 'ALTER TABLE jobs ADD COLUMN cost_units REAL',
+    'estimated_cost': 'ALTER TABLE jobs ADD COLUMN estimated_cost REAL',
+    'memory_units': 'ALTER TABLE jobs ADD COLUMN memory_units REAL',
+    'estimated_memory_mb': 'ALTER TABLE jobs ADD COLUMN estimated_memory_mb REAL',
+    'peak_memory_mb': 'ALTER TABLE jobs ADD COLUMN peak_memory_mb REAL',
+    'bytes_saved': 'ALTER TABLE jobs ADD COLUMN bytes_saved INTEGER',
+    'reserved_memory_mb': 'ALTER TABLE jobs ADD COLUMN reserved_memory_mb REAL',
+    'reserved_host': 'ALTER TABLE jobs ADD COLUMN reserved_host TEXT',
+}
+
+
+class JobStore:
+    """转换任务表"""
+
+    def __init__(self, db_path: str):
+        """
+        Args:
+            db_path: SQLite 数据库文件路径
+        """
+        self.db_path = db_path
+        db_dir = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(db_dir, exist_ok=True)
+        self._local = threading.local()
+        self._pid = os.getpid()
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        columns = {row['name'] for row in conn.execute('PRAGMA table_info(jobs)')}
+        for column, statement in MIGRATIONS.items():
+            if column not in columns:
+                conn.execute(statement)
+
+    def _conn(self) -> sqlite3.Connection:
+        """每个线程一个连接（sqlite3 连接不可跨线程、跨 fork 共享）"""
+        if self._pid != os.getpid():
+            # fork 后丢弃从父进程继承的连接
+            self._local = threading.local()
+            self._pid = os.getpid()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA busy_timeout=30000')
+            self._local.conn = conn
+        return conn
+
+    def _event(self, job_id: str, state: str, detail: Optional[str] = None) -> None:
+        self._conn().execute(
+            'INSERT INTO job_events (job_id, state, at, detail) VALUES (?, ?, ?, ?)',
+            (job_id, state, time.time(), detail)
+        )
+
+    def create_job(self, input_key: str, input_name: str, input_size: int, export_format: str,
+                   options: Optional[Dict[str, Any]] = None, input_hash: Optional[str] = None,
+                   required_capabilities: Optional[List[str]] = None,
+                   client_id: Optional[str] = None, cost_route: Optional[str] = None,
+                   cost_units: Optional[float] = None, estimated_cost: Optional[float] = None,
+                   memory_units: Optional[float] = None, estimated_memory_mb: Optional[float] = None,
+                   job_id: Optional[str] = None) -> str:
+        """
+        新建排队中的任务
+
+        Args:
+            input_key: 输入文件在文件存储中的键
+            input_name: 用户上传的原始文件名
+            input_size: 输入文件大小（字节）
+            export_format: 导出格式
+            options: 转换选项
+            input_hash: 输入文件 SHA-256
+            required_capabilities: 执行该任务所需的 worker 能力
+            client_id: 提交方标识，用于按客户端公平调度
+            cost_route: 耗时模型的路线键
+            cost_units: 任务规模（页数或 MB）
+            estimated_cost: 预计耗时（秒）
+            memory_units: 内存模型单位数
+            estimated_memory_mb: 预计峰值内存（MB）
+            job_id: 指定任务ID，默认自动生成
+
+        Returns:
+            str: 任务ID
+        """
+        job_id = job_id or uuid.uuid4().hex
+        now = time.time()
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                'INSERT INTO jobs (id, state, input_path, input_name, input_hash, input_size, '
+                'export_format, options, required_capabilities, client_id, cost_route, cost_units, '
+                'estimated_cost, memory_units, estimated_memory_mb, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (job_id, STATE_QUEUED, input_key, input_name, input_hash, input_size,
+                 export_format.upper(), json.dumps(options or {}, ensure_ascii=False),
+                 json.dumps(sorted(required_capabilities or [])), client_id, cost_route, cost_units,
+                 estimated_cost, memory_units, estimated_memory_mb, now)
+            )
+            self._event(job_id, STATE_QUEUED)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """查询任务，不存在时返回 None"""
+        row = self._conn().execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def events(self, job_id: str) -> List[Dict[str, Any]]:
+        """任务的状态流转记录"""
+        rows = self._conn().execute(
+            'SELECT state, at, detail FROM job_events WHERE job_id = ? ORDER BY at', (job_id,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def claim(self, job_id: str, worker: str, memory_mb: Optional[float] = None, host: Optional[str] = None,
+              budget_mb: Optional[float] = None) -> bool:
+        """
+        原子地把排队任务标记为运行中
+
+        Args:
+            job_id: 任务ID
+            worker: worker 标识
+            memory_mb: 在 host 上为任务预留的内存（MB），None 表示不预留
+            host: 预留内存的主机
+            budget_mb: host 的内存预算；与其它进程已预留的内存合计超出时不领取（主机上没有预留时除外）
+
+        Returns:
+            bool: 是否领取成功；已被其它 worker 领取或内存预算已被占满时返回 False
+        """
+        now = time.time()
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # 写事务互斥，同一主机上的各进程在此依次检查并写入预留，预算不会被重复分配
+            reserved = self.reserved_memory_mb(host) if memory_mb is not None and budget_mb is not None else 0.0
+            if reserved and reserved + memory_mb > budget_mb:
+                conn.execute('ROLLBACK')
+                return False
+            cursor = conn.execute(
+                'UPDATE jobs SET state = ?, worker = ?, started_at = ?, heartbeat_at = ?, '
+                'attempts = attempts + 1, reserved_memory_mb = ?, reserved_host = ? WHERE id = ? AND state = ?',
+                (STATE_RUNNING, worker, now, now, memory_mb, host, job_id, STATE_QUEUED)
+            )
+            claimed = cursor.rowcount == 1
+            if claimed:
+                self._event(job_id, STATE_RUNNING, worker)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return claimed
+
+    def claim_next(self, worker: str, capabilities: List[str],
+                   order: Optional[Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]] = None,
+                   per_client_limit: int = 50,
+                   reservation: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None) -> Optional[Dict[str, Any]]:
+        """
+        领取所需能力都在 capabilities 内的排队任务
+
+        Args:
+            worker: worker 标识
+            capabilities: worker 具备的能力
+            order: 对候选任务排序、筛选的函数（调度策略、内存准入），默认最早排队优先
+            per_client_limit: 每个客户端考察的排队任务数（最早排队的和预计耗时最短的各取这么多），
+                              避免一个客户端的大量积压挤出其它客户端的任务
+            reservation: 返回领取任务时传给 claim() 的内存预留参数的函数
+
+        Returns:
+            dict: 已领取的任务；没有可执行的任务时返回 None
+        """
+        available = set(capabilities)
+        rows = self._conn().execute(
+            'SELECT * FROM jobs WHERE id IN ('
+            '  SELECT id FROM ('
+            '    SELECT id,'
+            '      ROW_NUMBER() OVER (PARTITION BY client_id ORDER BY created_at) AS age_rank,'
+            '      ROW_NUMBER() OVER (PARTITION BY client_id ORDER BY estimated_cost, created_at) AS cost_rank'
+            '    FROM jobs WHERE state = ?'
+            '  ) WHERE age_rank <= ? OR cost_rank <= ?'
+            ') ORDER BY created_at',
+            (STATE_QUEUED, per_client_limit, per_client_limit)
+        ).fetchall()
+        candidates = [job for job in map(self._to_dict, rows)
+                      if set(job['required_capabilities']) <= available]
+        if order is not None and candidates:
+            candidates = order(candidates)
+        for job in candidates:
+            # 其它 worker 可能已抢先领取，依次尝试下一个
+            if self.claim(job['id'], worker, **(reservation(job) if reservation is not None else {})):
+                return self.get(job['id'])
+        return None
+
+    def reserved_memory_mb(self, host: Optional[str]) -> float:
+        """主机上所有进程为运行中任务预留的内存之和（MB）"""
+        row = self._conn().execute(
+            'SELECT SUM(reserved_memory_mb) AS reserved FROM jobs WHERE state = ? AND reserved_host IS ?',
+            (STATE_RUNNING, host)
+        ).fetchone()
+        return row['reserved'] or 0.0
+
+    def release_memory(self, job_id: str) -> None:
+        """释放任务的内存预留（任务结束或放回队列时调用）"""
+        self._conn().execute('UPDATE jobs SET reserved_memory_mb = NULL WHERE id = ?', (job_id,))
+
+    def record_peak_memory(self, job_id: str, peak_mb: float) -> None:
+        """记录任务执行期间的峰值内存"""
+        self._conn().execute('UPDATE jobs SET peak_memory_mb = ? WHERE id = ?', (peak_mb, job_id))
+
+    def record_bytes_saved(self, job_id: str, bytes_saved: int) -> None:
+        """记录输出体积优化节省的字节数"""
+        self._conn().execute('UPDATE jobs SET bytes_saved = ? WHERE id = ?', (bytes_saved, job_id))
+
+    def load_by_client(self) -> Dict[str, float]:
+        """各客户端运行中和排队中任务的预计耗时之和（公平调度）"""
+        rows = self._conn().execute(
+            'SELECT client_id, SUM(estimated_cost) AS cost FROM jobs WHERE state IN (?, ?) GROUP BY client_id',
+            (STATE_RUNNING, STATE_QUEUED)
+        ).fetchall()
+        return {row['client_id'] or '': row['cost'] or 0.0 for row in rows}
+
+    def heartbeat(self, job_ids: List[str]) -> None:
+        """刷新运行中任务的心跳"""
+        if not job_ids:
+            return
+        placeholders = ','.join('?' for _ in job_ids)
+        self._conn().execute(
+            f'UPDATE jobs SET heartbeat_at = ? WHERE state = ? AND id IN ({placeholders})',
+            (time.time(), STATE_RUNNING, *job_ids)
+        )
+
+    def mark_succeeded(self, job_id: str, result_key: str, result_name: str, result_size: int,
+                       ttl: float) -> None:
+        """记录成功结果，结果保留到 TTL 过期"""
+        now = time.time()
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                'UPDATE jobs SET state = ?, result_path = ?, result_name = ?, result_size = ?, '
+                'error = NULL, finished_at = ?, expires_at = ? WHERE id = ?',
+                (STATE_SUCCEEDED, result_key, result_name, result_size, now, now + ttl, job_id)
+            )
+            self._event(job_id, STATE_SUCCEEDED)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def mark_failed(self, job_id: str, error: str, ttl: float) -> None:
+        """记录失败"""
+        now = time.time()
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                'UPDATE jobs SET state = ?, error = ?, finished_at = ?, expires_at = ? WHERE id = ?',
+                (STATE_FAILED, error[:2000], now, now + ttl, job_id)
+            )
+            self._event(job_id, STATE_FAILED, error[:500])
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def requeue(self, job_id: str, reason: str) -> bool:
+        """把运行中的任务放回队列（重试）；任务已不在运行中时返回 False"""
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            cursor = conn.execute(
+                'UPDATE jobs SET state = ?, worker = NULL, heartbeat_at = NULL, reserved_memory_mb = NULL '
+                'WHERE id = ? AND state = ?',
+                (STATE_QUEUED, job_id, STATE_RUNNING)
+            )
+            requeued = cursor.rowcount == 1
+            if requeued:
+                self._event(job_id, STATE_QUEUED, reason)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return requeued
+
+    def requeue_worker(self, worker: str, reason: str) -> List[str]:
+        """把指定 worker 运行中的任务全部放回队列（该 worker 即将退出），返回放回的任务ID"""
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            job_ids = [row['id'] for row in conn.execute(
+                'SELECT id FROM jobs WHERE state = ? AND worker = ?', (STATE_RUNNING, worker)
+            ).fetchall()]
+            for job_id in job_ids:
+                conn.execute(
+                    'UPDATE jobs SET state = ?, worker = NULL, heartbeat_at = NULL, reserved_memory_mb = NULL '
+                    'WHERE id = ?',
+                    (STATE_QUEUED, job_id)
+                )
+                self._event(job_id, STATE_QUEUED, reason)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return job_ids
+
+    def find_result(self, input_hash: str, export_format: str, options: Optional[Dict[str, Any]] = None,
+                    min_ttl: float = 60.0) -> Optional[Dict[str, Any]]:
+        """
+        查找相同输入、格式和影响结果的选项下已成功且未过期的任务（结果复用）
+
+        Args:
+            input_hash: 输入文件 SHA-256
+            export_format: 导出格式
+            options: 转换选项，只比较 RESULT_OPTIONS 中的键
+            min_ttl: 结果至少还要保留的秒数
+
+        Returns:
+            dict: 最近完成的任务记录，没有时返回 None
+        """
+        wanted = {key: (options or {}).get(key) for key in RESULT_OPTIONS}
+        rows = self._conn().execute(
+            'SELECT * FROM jobs WHERE input_hash = ? AND export_format = ? AND state = ? AND expires_at > ? '
+            'ORDER BY finished_at DESC LIMIT 20',
+            (input_hash, export_format.upper(), STATE_SUCCEEDED, time.time() + min_ttl)
+        ).fetchall()
+        for row in rows:
+            job = self._to_dict(row)
+            if {key: job['options'].get(key) for key in RESULT_OPTIONS} == wanted:
+                return job
+        return None
+
+    def list_by_state(self, state: str, limit: int = 1000) -> List[Dict[str, Any]]:
+        """按状态列出任务（按创建时间排序）"""
+        rows = self._conn().execute(
+            'SELECT * FROM jobs WHERE state = ? ORDER BY created_at LIMIT ?', (state, limit)
+        ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def list_stale_running(self, stale_after: float) -> List[Dict[str, Any]]:
+        """心跳超时的运行中任务（所属进程已退出或卡死）"""
+        rows = self._conn().execute(
+            'SELECT * FROM jobs WHERE state = ? AND (heartbeat_at IS NULL OR heartbeat_at < ?)',
+            (STATE_RUNNING, time.time() - stale_after)
+        ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def list_expired(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """结果已过期的任务"""
+        rows = self._conn().execute(
+            'SELECT * FROM jobs WHERE expires_at IS NOT NULL AND expires_at < ?',
+            (now or time.time(),)
+        ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def delete(self, job_id: str) -> None:
+        """删除任务记录"""
+        conn = self._conn()
+        conn.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+        conn.execute('DELETE FROM job_events WHERE job_id = ?', (job_id,))
+
+    def register_worker(self, worker: str, capabilities: List[str], slots: int) -> None:
+        """登记（或刷新）worker 及其能力"""
+        now = time.time()
+        self._conn().execute(
+            'INSERT INTO workers (id, capabilities, slots, started_at, heartbeat_at) VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT(id) DO UPDATE SET capabilities = excluded.capabilities, slots = excluded.slots, '
+            'heartbeat_at = excluded.heartbeat_at',
+            (worker, json.dumps(sorted(capabilities)), slots, now, now)
+        )
+
+    def touch_worker(self, worker: str) -> None:
+        """刷新 worker 心跳"""
+        self._conn().execute('UPDATE workers SET heartbeat_at = ? WHERE id = ?', (time.time(), worker))
+
+    def unregister_worker(self, worker: str) -> None:
+        self._conn().execute('DELETE FROM workers WHERE id = ?', (worker,))
+
+    def list_workers(self, active_within: float) -> List[Dict[str, Any]]:
+        """最近有心跳的 worker"""
+        rows = self._conn().execute(
+            'SELECT * FROM workers WHERE heartbeat_at >= ? ORDER BY started_at',
+            (time.time() - active_within,)
+        ).fetchall()
+        workers = []
+        for row in rows:
+            worker = dict(row)
+            worker['capabilities'] = json.loads(worker['capabilities'])
+            workers.append(worker)
+        return workers
+
+    def can_route(self, required_capabilities: List[str], active_within: float) -> bool:
+        """是否有在线 worker 具备全部所需能力"""
+        required = set(required_capabilities)
+        return any(required <= set(worker['capabilities']) for worker in self.list_workers(active_within))
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job['options'] = json.loads(job['options']) if job.get('options') else {}
+        job['required_capabilities'] = json.loads(job.get('required_capabilities') or '[]')
+        return job
+
+
+# 全局实例
+_job_store: Optional[JobStore] = None
+_job_store_lock = threading.Lock()
+
+
+def get_job_store() -> JobStore:
+    """获取任务表实例（由 Config.JOB_QUEUE 决定实现）"""
+    global _job_store
+    if _job_store is None:
+        with _job_store_lock:
+            if _job_store is None:
+                from config import Config
+                if Config.JOB_QUEUE == 'sqlite':
+                    _job_store = JobStore(Config.JOB_DB_PATH)
+                else:
+                    module_name, _, class_name = Config.JOB_QUEUE.partition(':')
+                    queue_class = getattr(importlib.import_module(module_name), class_name)
+                    _job_store = queue_class(Config.JOB_DB_PATH)
+    return _job_store
@@ -0,0 +1,335 @@
+"""
+轻量转换模块
+纯文本/Markdown 直通与转码（自动识别 GBK/GB18030 等编码），以及基于 html.parser 的流式 HTML 转 Markdown，
+这些输入不需要 Docling 的版面分析
+"""
+
+import re
+import codecs
+import logging
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, TextIO, Tuple
+
+from .input_handle import get_open_handle, link_or_copy, open_text
+
+logger = logging.getLogger(__name__)
+
+# 尝试导入charset_normalizer（可选，常见编码都识别失败时使用）
+try:
+    from charset_normalizer import from_bytes as detect_charset
+    CHARSET_NORMALIZER_AVAILABLE = True
+except ImportError:
+    CHARSET_NORMALIZER_AVAILABLE = False
+
+# 依次尝试的编码：中文 Windows 下保存的文本多为 GBK，GB18030 是其超集
+ENCODING_CANDIDATES = ('utf-8', 'gb18030', 'big5')
+BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+# 编码识别和流式读取的块大小
+SNIFF_BYTES = 64 * 1024
+CHUNK_SIZE = 256 * 1024
+
+# <br> 的占位符，合并空白后再还原为换行
+_LINE_BREAK = '\x00'
+_META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w-]+)', re.IGNORECASE)
+
+
+def detect_encoding(sample: bytes, complete: bool = True) -> str:
+    """
+    识别文本编码
+
+    Args:
+        sample: 文件开头的字节（或全部内容）
+        complete: sample 是否为完整内容；否则允许末尾有被截断的多字节字符
+
+    Returns:
+        str: Python 编码名
+    """
+    for bom, encoding in BOMS:
+        if sample.startswith(bom):
+            return encoding
+    for encoding in ENCODING_CANDIDATES:
+        try:
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=complete)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    if CHARSET_NORMALIZER_AVAILABLE:
+        best = detect_charset(sample).best()
+        if best is not None:
+            return best.encoding
+    return 'latin-1'
+
+
+def read_sample(path: str) -> Tuple[bytes, bool]:
+    """文件开头的字节，以及是否已读到文件末尾"""
+    handle = get_open_handle(path)
+    if handle is not None:
+        return bytes(handle.view[:SNIFF_BYTES]), handle.size <= SNIFF_BYTES
+    with open(path, 'rb') as f:
+        sample = f.read(SNIFF_BYTES + 1)
+    return sample[:SNIFF_BYTES], len(sample) <= SNIFF_BYTES
+
+
+def file_encoding(path: str) -> str:
+    """按文件开头识别编码"""
+    sample, complete = read_sample(path)
+    return detect_encoding(sample, complete)
+
+
+def transcode_text(input_path: str, output_path: str) -> str:
+    """
+    把文本文件转为无 BOM 的 UTF-8；已是 UTF-8 时直接链接（跨文件系统时复制）
+
+    Returns:
+        str: 识别出的原始编码
+    """
+    encoding = file_encoding(input_path)
+    if encoding == 'utf-8':
+        link_or_copy(input_path, output_path)
+        return encoding
+    logger.info(f"文本编码为 {encoding}，转码为 UTF-8")
+    with open_text(input_path, encoding, errors='replace', newline='') as src, \
+            open(output_path, 'w', encoding='utf-8', newline='') as dst:
+        for chunk in iter(lambda: src.read(CHUNK_SIZE), ''):
+            dst.write(chunk)
+    return encoding
+
+
+def html_encoding(path: str) -> str:
+    """HTML 编码：BOM > <meta charset> > 内容识别"""
+    sample, complete = read_sample(path)
+    for bom, encoding in BOMS:
+        if sample.startswith(bom):
+            return encoding
+    match = _META_CHARSET.search(sample[:4096])
+    if match:
+        declared = match.group(1).decode('ascii', 'ignore').lower()
+        try:
+            # 按 WHATWG 惯例 gb2312/gbk 声明实际按 GB18030 解码
+            name = codecs.lookup(declared).name
+            return 'gb18030' if name in ('gb2312', 'gbk') else name
+        except LookupError:
+            logger.debug("未知的HTML声明编码: %s", declared)
+    return detect_encoding(sample, complete)
+
+
+class HtmlToMarkdown(HTMLParser):
+    """
+    流式 HTML 转 Markdown：边 feed 边把完成的块写入输出
+
+    支持标题、段落、列表（含嵌套）、链接、图片、粗体/斜体/行内代码、代码块、引用、分隔线和表格；
+    plain=True 时输出纯文本。
+    """
+
+    SKIP_TAGS = {'script', 'style', 'head', 'noscript', 'template', 'svg', 'iframe'}
+    BLOCK_TAGS = {'p', 'div', 'section', 'article', 'header', 'footer', 'main', 'aside', 'nav',
+                  'figure', 'figcaption', 'dl', 'dt', 'dd', 'address', 'details', 'summary', 'form'}
+    HEADINGS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+
+    def __init__(self, out: TextIO, plain: bool = False):
+        """
+        Args:
+            out: 输出文本流
+            plain: 输出纯文本而非 Markdown
+        """
+        super().__init__(convert_charrefs=True)
+        self.out = out
+        self.plain = plain
+        self._inline: List[str] = []
+        self._skip_depth = 0
+        self._pre_depth = 0
+        self._quote_depth = 0
+        self._lists: List[Dict[str, int]] = []
+        self._heading = 0
+        self._links: List[Optional[str]] = []
+        self._table: Optional[List[List[str]]] = None
+        self._cell: Optional[List[str]] = None
+        self._wrote_block = False
+
+    # 输出
+    def _emit_block(self, text: str) -> None:
+        if not text.strip():
+            return
+        if self._quote_depth and not self.plain:
+            prefix = '> ' * self._quote_depth
+            text = '\n'.join(prefix + line for line in text.split('\n'))
+        if self._wrote_block:
+            self.out.write('\n\n')
+        self.out.write(text)
+        self._wrote_block = True
+
+    def _write(self, text: str) -> None:
+        if self._cell is not None:
+            self._cell.append(text)
+        else:
+            self._inline.append(text)
+
+    def _flush_inline(self) -> None:
+        """结束当前块：合并空白后加上标题/列表前缀输出"""
+        text = re.sub(r'[ \t\r\n\f]+', ' ', ''.join(self._inline)).strip()
+        text = re.sub(f' ?{_LINE_BREAK} ?', '\n' if self.plain else '  \n', text).strip()
+        self._inline = []
+        if not text:
+            return
+        if self._heading and not self.plain:
+            text = '#' * self._heading + ' ' + text
+        elif self._lists:
+            current = self._lists[-1]
+            indent = '  ' * (len(self._lists) - 1) if not self.plain else ''
+            if current['ordered']:
+                current['index'] += 1
+                marker = f"{current['index']}. "
+            else:
+                marker = '' if self.plain else '- '
+            text = indent + marker + text
+            # 同一列表的各项之间不空行
+            if self._wrote_block and current['items']:
+                self.out.write('\n' + text)
+                current['items'] += 1
+                return
+            current['items'] += 1
+        self._emit_block(text)
+
+    # 解析回调
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+            return
+        if self._skip_depth:
+            return
+        attrs = dict(attrs)
+        if tag in self.HEADINGS:
+            self._flush_inline()
+            self._heading = self.HEADINGS[tag]
+        elif tag in self.BLOCK_TAGS:
+            self._flush_inline()
+        elif tag == 'br':
+            self._write(' ' if self._cell is not None else _LINE_BREAK)
+        elif tag == 'hr':
+            self._flush_inline()
+            self._emit_block('' if self.plain else '---')
+        elif tag in ('ul', 'ol'):
+            self._flush_inline()
+            self._lists.append({'ordered': tag == 'ol', 'index': 0, 'items': 0})
+        elif tag == 'li':
+            self._flush_inline()
+        elif tag == 'blockquote':
+            self._flush_inline()
+            self._quote_depth += 1
+        elif tag == 'pre':
+            self._flush_inline()
+            self._pre_depth += 1
+        elif tag in ('strong', 'b') and not self.plain:
+            self._write('**')
+        elif tag in ('em', 'i') and not self.plain:
+            self._write('*')
+        elif tag == 'code' and not self._pre_depth and not self.plain:
+            self._write('`')
+        elif tag == 'a':
+            href = attrs.get('href')
+            self._links.append(href)
+            if href and not self.plain:
+                self._write('[')
+        elif tag == 'img' and not self.plain:
+            self._write(f"![{attrs.get('alt') or ''}]({attrs.get('src') or ''})")
+        elif tag == 'table':
+            self._flush_inline()
+            self._table = []
+        elif tag == 'tr' and self._table is not None:
+            self._table.append([])
+        elif tag in ('td', 'th') and self._table is not None:
+            self._cell = []
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth = max(self._skip_depth - 1, 0)
+            return
+        if self._skip_depth:
+            return
+        if tag in self.HEADINGS:
+            self._flush_inline()
+            self._heading = 0
+        elif tag in self.BLOCK_TAGS or tag == 'li':
+            self._flush_inline()
+        elif tag in ('ul', 'ol'):
+            self._flush_inline()
+            if self._lists:
+                self._lists.pop()
+        elif tag == 'blockquote':
+            self._flush_inline()
+            self._quote_depth = max(self._quote_depth - 1, 0)
+        elif tag == 'pre':
+            self._pre_depth = max(self._pre_depth - 1, 0)
+            code = ''.join(self._inline).replace(_LINE_BREAK, '\n').strip('\n')
+            self._inline = []
+            if code.strip():
+                self._emit_block(code if self.plain else f"```\n{code}\n```")
+        elif tag in ('strong', 'b') and not self.plain:
+            self._write('**')
+        elif tag in ('em', 'i') and not self.plain:
+            self._write('*')
+        elif tag == 'code' and not self._pre_depth and not self.plain:
+            self._write('`')
+        elif tag == 'a' and self._links:
+            href = self._links.pop()
+            if href and not self.plain:
+                self._write(f"]({href})")
+        elif tag in ('td', 'th') and self._cell is not None:
+            if self._table:
+                cell = re.sub(r'\s+', ' ', ''.join(self._cell)).strip()
+                self._table[-1].append(cell)
+            self._cell = None
+        elif tag == 'table' and self._table is not None:
+            self._emit_table(self._table)
+            self._table = None
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        if self._pre_depth:
+            # 代码块保留原始空白
+            self._inline.append(data)
+        else:
+            self._write(data)
+
+    def _emit_table(self, rows: List[List[str]]) -> None:
+        rows = [row for row in rows if row]
+        if not rows:
+            return
+        width = max(len(row) for row in rows)
+        rows = [row + [''] * (width - len(row)) for row in rows]
+        if self.plain:
+            self._emit_block('\n'.join('\t'.join(row) for row in rows))
+            return
+        lines = ['| ' + ' | '.join(cell.replace('|', '\\|') for cell in row) + ' |' for row in rows]
+        lines.insert(1, '|' + '---|' * width)
+        self._emit_block('\n'.join(lines))
+
+    def close(self):
+        super().close()
+        self._flush_inline()
+        if self._wrote_block:
+            self.out.write('\n')
+
+
+def convert_html(input_path: str, output_path: str, plain: bool = False) -> None:
+    """
+    流式把 HTML 文件转换为 Markdown（或纯文本），内存占用与文件大小无关
+
+    Args:
+        input_path: HTML 文件路径
+        output_path: 输出文件路径
+        plain: 输出纯文本
+    """
+    encoding = html_encoding(input_path)
+    logger.info(f"轻量 HTML 转换: {input_path} -> {output_path} (编码: {encoding})")
+    with open_text(input_path, encoding, errors='replace') as src, \
+            open(output_path, 'w', encoding='utf-8') as dst:
+        parser = HtmlToMarkdown(dst, plain=plain)
+        for chunk in iter(lambda: src.read(CHUNK_SIZE), ''):
+            parser.feed(chunk)
+        parser.close()
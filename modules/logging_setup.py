@@ -0,0 +1,237 @@
+"""
+日志配置模块
+基于队列的异步日志：调用线程只负责入队，后台线程负责格式化和写文件
+"""
+
+import json
+import time
+import uuid
+import queue
+import atexit
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, WatchedFileHandler
+from typing import Dict, Iterator, Optional, Tuple
+
+# 当前请求/任务的上下文，由后台线程写入结构化日志
+_request_id: contextvars.ContextVar = contextvars.ContextVar('request_id', default=None)
+_job_id: contextvars.ContextVar = contextvars.ContextVar('job_id', default=None)
+# 当前请求已写出的日志条数（可变字典，随上下文传递）
+_budget: contextvars.ContextVar = contextvars.ContextVar('log_budget', default=None)
+
+_listener: Optional[QueueListener] = None
+
+
+@contextmanager
+def log_context(request_id: Optional[str] = None, job_id: Optional[str] = None) -> Iterator[None]:
+    """在上下文内为日志附加请求ID/任务ID，并开启新的单请求日志预算"""
+    budget_token = _budget.set({'count': 0, 'dropped': 0})
+    request_token = _request_id.set(request_id) if request_id is not None else None
+    job_token = _job_id.set(job_id) if job_id is not None else None
+    try:
+        yield
+    finally:
+        if job_token is not None:
+            _job_id.reset(job_token)
+        if request_token is not None:
+            _request_id.reset(request_token)
+        _budget.reset(budget_token)
+
+
+class ContextFilter(logging.Filter):
+    """附加上下文字段，并限制调试日志的量"""
+
+    def __init__(self, debug_sample_rate: float = 1.0, debug_rate_limit: int = 20,
+                 max_records_per_request: int = 200):
+        """
+        Args:
+            debug_sample_rate: DEBUG 日志的采样比例（0~1）
+            debug_rate_limit: 每个调用位置每秒最多输出的 DEBUG 条数
+            max_records_per_request: 单个请求最多输出的 INFO 及以下日志条数
+        """
+        super().__init__()
+        self.debug_sample_rate = debug_sample_rate
+        self.debug_rate_limit = debug_rate_limit
+        self.max_records_per_request = max_records_per_request
+        self._sites: Dict[Tuple[str, int], list] = {}
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        record.job_id = _job_id.get()
+
+        # 警告及以上始终保留
+        if record.levelno >= logging.WARNING:
+            return True
+
+        budget = _budget.get()
+        if budget is not None:
+            if budget['count'] >= self.max_records_per_request:
+                budget['dropped'] += 1
+                return False
+            budget['count'] += 1
+
+        if record.levelno <= logging.DEBUG:
+            return self._allow_debug(record)
+        return True
+
+    def _allow_debug(self, record: logging.LogRecord) -> bool:
+        """确定性采样 + 按调用位置限速"""
+        now = int(time.monotonic())
+        site = (record.pathname, record.lineno)
+        with self._lock:
+            self._counter += 1
+            if self.debug_sample_rate < 1.0:
+                # 每 1/rate 条保留一条，避免随机数开销
+                interval = max(1, int(round(1 / max(self.debug_sample_rate, 1e-6))))
+                if self._counter % interval:
+                    return False
+            window = self._sites.get(site)
+            if window is None or window[0] != now:
+                if len(self._sites) > 10000:
+                    self._sites.clear()
+                self._sites[site] = [now, 1]
+                return True
+            if window[1] >= self.debug_rate_limit:
+                return False
+            window[1] += 1
+            return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """队列满时丢弃日志而不是阻塞转换线程"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 同进程内传递，不在调用线程里格式化消息，交给后台线程处理
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """结构化 JSON 日志"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created))
+                  + f".{int(record.msecs):03d}",
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        if getattr(record, 'request_id', None):
+            payload['request_id'] = record.request_id
+        if getattr(record, 'job_id', None):
+            payload['job_id'] = record.job_id
+        if record.exc_info:
+            payload['exc'] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False)
+
+
+def setup_logging(config) -> QueueListener:
+    """
+    配置根日志：QueueHandler 入队，后台 QueueListener 写滚动文件和控制台
+
+    多个进程（gunicorn worker、批量转换进程池）写同一个日志文件时，各自按大小滚动会互相覆盖、
+    把记录写进已滚动的文件，这时应使用 LOG_ROTATE=external 交给外部工具滚动。
+
+    Args:
+        config: 配置类（Config）
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    level = getattr(logging, config.LOG_LEVEL.upper())
+    log_queue = queue.Queue(maxsize=config.LOG_QUEUE_SIZE)
+
+    if config.LOG_ROTATE == 'external':
+        # 多个进程写同一个文件：只追加，文件被外部工具移走后自动重新打开
+        file_handler = WatchedFileHandler(config.LOG_FILE, mode='a', encoding='utf-8', delay=True)
+    else:
+        file_handler = RotatingFileHandler(
+            config.LOG_FILE, mode='a', encoding='utf-8',
+            maxBytes=config.LOG_MAX_BYTES, backupCount=config.LOG_BACKUP_COUNT,
+            delay=True
+        )
+    if config.LOG_JSON:
+        file_handler.setFormatter(JsonFormatter())
+    else:
+        file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(name)s - %(message)s'))
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(name)s - %(message)s'))
+
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter(
+        debug_sample_rate=config.LOG_DEBUG_SAMPLE_RATE,
+        debug_rate_limit=config.LOG_DEBUG_RATE_LIMIT,
+        max_records_per_request=config.LOG_MAX_RECORDS_PER_REQUEST,
+    ))
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+
+    _listener = QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
+
+
+def restart_after_fork() -> None:
+    """fork 后为子进程建立新的日志队列和后台写日志线程（线程不会被子进程继承）"""
+    global _listener
+    if _listener is None:
+        return
+    parent = _listener
+    # 父进程的队列可能留有 fork 时未写出的记录（会被重复写出），锁也可能正被其它线程持有，子进程改用新队列
+    log_queue = queue.Queue(maxsize=parent.queue.maxsize)
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, QueueHandler) and handler.queue is parent.queue:
+            handler.queue = log_queue
+    _listener = QueueListener(log_queue, *parent.handlers, respect_handler_level=parent.respect_handler_level)
+    _listener.start()
+    atexit.unregister(parent.stop)
+    atexit.register(_listener.stop)
+
+
+def init_request_logging(app) -> None:
+    """为每个 HTTP 请求分配请求ID并写入日志上下文"""
+    from flask import g, request
+
+    @app.before_request
+    def _bind_request_id():
+        request_id = request.headers.get('X-Request-Id') or uuid.uuid4().hex
+        g.log_context = log_context(request_id=request_id)
+        g.log_context.__enter__()
+        g.request_id = request_id
+
+    @app.teardown_request
+    def _unbind_request_id(exc=None):
+        context = g.pop('log_context', None)
+        if context is not None:
+            try:
+                context.__exit__(None, None, None)
+            except ValueError:
+                # 上下文已切换（例如流式响应结束于其它上下文），忽略
+                pass
+
+    @app.after_request
+    def _expose_request_id(response):
+        request_id = g.get('request_id')
+        if request_id:
+            response.headers['X-Request-Id'] = request_id
+        return response
@@ -0,0 +1,265 @@
+"""
+OCR 批量识别模块
+把多页、多个并发任务的文本行裁剪图合并成更大的定长批次交给识别模型
+
+Docling 逐页调用 RapidOCR，每个 OCR 区域只识别几行、每批最多 6 行，CPU 上大部分时间花在
+逐次调用的固定开销上。这里在同一进程内替换 RapidOCR 的文本识别器：
+- 各调用方（同一批内并发处理的页、同一 worker 中并发的任务）提交的文本行在等待窗口内汇合，
+  由其中一个调用方一次识别后按原顺序分发回去；
+- 裁剪图按宽高比向上补齐到固定档位，同一批次的输入形状只有少数几种，推理会话可复用已优化的形状。
+"""
+
+import math
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 尝试导入numpy（随 Docling / RapidOCR 一起安装）
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    logger.warning("numpy不可用，OCR批量识别不可用")
+
+# RapidOCR 识别模型的输入高度，宽高比低于该值的文本行会被补齐到 320 像素宽
+REC_IMAGE_HEIGHT = 48
+REC_MIN_RATIO = 320 / REC_IMAGE_HEIGHT
+
+
+def pad_to_bucket(image, bucket: float):
+    """
+    把文本行裁剪图向右补齐到宽高比档位（bucket 的整数倍）
+
+    补齐部分使用左右边缘像素的中位数颜色（通常是纸张底色），不会引入笔画。
+
+    Args:
+        image: HxW 或 HxWxC 的裁剪图
+        bucket: 宽高比档位步长，<=0 时不补齐
+
+    Returns:
+        补齐后的裁剪图
+    """
+    height, width = image.shape[:2]
+    if bucket <= 0 or height == 0 or width == 0:
+        return image
+    ratio = max(width / height, REC_MIN_RATIO)
+    target = int(math.ceil(math.ceil(ratio / bucket) * bucket * height))
+    if target <= width:
+        return image
+    border = np.concatenate([image[:, 0], image[:, -1]], axis=0)
+    fill = np.median(border, axis=0).astype(image.dtype)
+    padded = np.empty((height, target) + image.shape[2:], dtype=image.dtype)
+    padded[:, :width] = image
+    padded[:, width:] = fill
+    return padded
+
+
+class _Request:
+    """一个调用方提交的文本行"""
+
+    __slots__ = ('images', 'results', 'elapse', 'error', 'done')
+
+    def __init__(self, images: List[Any]):
+        self.images = images
+        self.results: Optional[List[Any]] = None
+        self.elapse = 0.0
+        self.error: Optional[BaseException] = None
+        self.done = False
+
+
+class RecognitionBatcher:
+    """
+    替换 RapidOCR 文本识别器的批量识别层
+
+    与原识别器调用方式相同（裁剪图列表 -> (识别结果列表, 耗时)）。没有专门的后台线程：
+    第一个到达的调用方成为本轮的执行者，在等待窗口内收集其他调用方的文本行，凑满一批或超时后
+    统一识别；其他调用方等待自己的结果。非列表输入（新版 RapidOCR 的输入对象）直接交给原识别器。
+    """
+
+    def __init__(self, recognizer, batch_size: int = 32, max_wait: float = 0.02, bucket: float = 2.0):
+        """
+        Args:
+            recognizer: 原文本识别器
+            batch_size: 每批识别的文本行数
+            max_wait: 等待其他调用方的最长时间（秒）
+            bucket: 宽高比档位步长，<=0 时不补齐
+        """
+        self.recognizer = recognizer
+        self.batch_size = max(batch_size, 1)
+        self.max_wait = max(max_wait, 0.0)
+        self.bucket = bucket
+        # 原识别器按 rec_batch_num 切分输入，放大到批次大小才能一次推理整批
+        if hasattr(recognizer, 'rec_batch_num'):
+            recognizer.rec_batch_num = max(recognizer.rec_batch_num, self.batch_size)
+        self._cond = threading.Condition()
+        self._pending: List[_Request] = []
+        self._pending_lines = 0
+        self._leading = False
+        self._stats = {'calls': 0, 'lines': 0, 'batches': 0, 'merged_batches': 0, 'seconds': 0.0}
+
+    def __call__(self, img_list, *args, **kwargs):
+        if args or kwargs or not isinstance(img_list, list) or not img_list:
+            return self.recognizer(img_list, *args, **kwargs)
+        request = _Request(img_list)
+        with self._cond:
+            self._pending.append(request)
+            self._pending_lines += len(img_list)
+            self._stats['calls'] += 1
+            self._cond.notify_all()
+        while True:
+            with self._cond:
+                while not request.done and self._leading:
+                    self._cond.wait()
+                if request.done:
+                    break
+                self._leading = True
+                deadline = time.monotonic() + self.max_wait
+                while self._pending_lines < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._take()
+            try:
+                self._run(batch)
+            finally:
+                with self._cond:
+                    self._leading = False
+                    self._cond.notify_all()
+        if request.error is not None:
+            raise request.error
+        return request.results, request.elapse
+
+    def _take(self) -> List[_Request]:
+        """按到达顺序取出至少一个、合计约 batch_size 行的请求（调用时持有锁）"""
+        batch, lines = [], 0
+        while self._pending and (not batch or lines + len(self._pending[0].images) <= self.batch_size):
+            request = self._pending.pop(0)
+            batch.append(request)
+            lines += len(request.images)
+        self._pending_lines -= lines
+        return batch
+
+    def _run(self, batch: List[_Request]) -> None:
+        """识别合并后的文本行，并按提交顺序拆分给各调用方"""
+        images = [image for request in batch for image in request.images]
+        start = time.perf_counter()
+        try:
+            results, _ = self.recognize(images)
+        except Exception as e:
+            for request in batch:
+                request.error = e
+                request.done = True
+            return
+        elapsed = time.perf_counter() - start
+        offset = 0
+        for request in batch:
+            request.results = results[offset:offset + len(request.images)]
+            request.elapse = elapsed
+            request.done = True
+            offset += len(request.images)
+        with self._cond:
+            self._stats['lines'] += len(images)
+            self._stats['batches'] += 1
+            self._stats['merged_batches'] += len(batch) > 1
+            self._stats['seconds'] += elapsed
+        logger.debug("OCR批量识别: %d 个调用方, %d 行, %.3fs", len(batch), len(images), elapsed)
+
+    def recognize(self, images: List[Any]) -> Tuple[List[Any], float]:
+        """不经等待窗口，直接按档位补齐后识别一批裁剪图"""
+        output = self.recognizer([pad_to_bucket(image, self.bucket) for image in images])
+        if isinstance(output, tuple) and len(output) == 2:
+            return list(output[0]), output[1]
+        return list(output), 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """累计的调用方数、识别行数、批次数、合并批次数和识别耗时"""
+        with self._cond:
+            stats = dict(self._stats)
+        stats['lines_per_batch'] = round(stats['lines'] / stats['batches'], 1) if stats['batches'] else 0
+        stats['lines_per_sec'] = round(stats['lines'] / stats['seconds'], 1) if stats['seconds'] else 0
+        return stats
+
+
+class ConcurrentPageModel:
+    """
+    让管道中的 OCR 模型同时处理一批中的多页
+
+    每页仍由原模型单独处理，各页的文本行在 RecognitionBatcher 中汇合；页按原顺序返回。
+    其余属性的读写全部转给原模型。
+    """
+
+    def __init__(self, model, threads: int):
+        object.__setattr__(self, 'model', model)
+        object.__setattr__(self, 'threads', threads)
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.model, name, value)
+
+    def __call__(self, conv_res, page_batch: Iterable) -> Iterator:
+        pages = list(page_batch)
+        if self.threads < 2 or len(pages) < 2:
+            yield from self.model(conv_res, pages)
+            return
+        with ThreadPoolExecutor(max_workers=min(self.threads, len(pages)), thread_name_prefix='ocr-page') as pool:
+            for processed in pool.map(lambda page: list(self.model(conv_res, [page])), pages):
+                yield from processed
+
+
+def find_ocr_models(pipelines: Iterable) -> Iterator[Tuple[list, int, Any]]:
+    """
+    在已初始化的 Docling 管道中查找使用 RapidOCR 的 OCR 模型
+
+    Yields:
+        tuple: (所在的 build_pipe 列表, 下标, 模型)；模型可能已被 ConcurrentPageModel 包装
+    """
+    for pipeline in pipelines:
+        build_pipe = getattr(pipeline, 'build_pipe', None)
+        if not isinstance(build_pipe, list):
+            continue
+        for index, model in enumerate(build_pipe):
+            reader = getattr(model, 'reader', None)
+            if reader is not None and hasattr(reader, 'text_rec'):
+                yield build_pipe, index, model
+
+
+def install_batching(pipelines: Iterable, batch_size: int, max_wait: float, bucket: float,
+                     page_threads: int) -> int:
+    """
+    为管道中的 RapidOCR 模型安装批量识别层（已安装的跳过）
+
+    共享管道的转换器使用同一个识别器，不同任务的文本行因此能合并到同一批次。
+
+    Args:
+        pipelines: 已初始化的 Docling 管道
+        batch_size: 每批识别的文本行数
+        max_wait: 等待窗口（秒）
+        bucket: 宽高比档位步长
+        page_threads: 同一批中并发处理的页数，<2 时逐页处理
+
+    Returns:
+        int: 本次新安装的 OCR 模型数
+    """
+    if not NUMPY_AVAILABLE:
+        return 0
+    installed = 0
+    for build_pipe, index, model in list(find_ocr_models(pipelines)):
+        reader = model.reader
+        if isinstance(reader.text_rec, RecognitionBatcher):
+            continue
+        reader.text_rec = RecognitionBatcher(reader.text_rec, batch_size, max_wait, bucket)
+        if page_threads >= 2 and not isinstance(model, ConcurrentPageModel):
+            build_pipe[index] = ConcurrentPageModel(model, page_threads)
+        installed += 1
+    if installed:
+        logger.info(f"📦 已启用OCR批量识别: {installed} 个模型 (每批 {batch_size} 行, "
+                    f"等待 {max_wait * 1000:.0f}ms, 并发页数 {max(page_threads, 1)})")
+    return installed
@@ -0,0 +1,243 @@
+"""
+OCR 结果缓存模块
+按"OCR 输入图像哈希 + OCR 模型版本"缓存 RapidOCR 的识别结果，同一文档的新版本只需重新识别改动过的页面
+
+缓存位于 Docling 的 OCR 步骤内部：只有真正送去 OCR 的页面区域才会查询和写入缓存（带文本层的页面不经过这里），
+版面分析和导出仍按整本文档进行，所有导出格式（Markdown、文本、DOCX、XLSX、JSONL）都能复用。
+"""
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from .input_handle import get_open_handle
+
+logger = logging.getLogger(__name__)
+
+# 尝试导入PyMuPDF（用于统计页数和拆分子PDF）
+try:
+    import fitz
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    PYMUPDF_AVAILABLE = False
+
+# 尝试导入numpy（随 Docling / RapidOCR 一起安装，OCR 输入图像为 numpy 数组）
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ocr_results (
+    key TEXT PRIMARY KEY,
+    result TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ocr_results_last_used ON ocr_results(last_used);
+"""
+
+
+def pdf_page_count(pdf_path: str) -> int:
+    """PDF 页数"""
+    handle = get_open_handle(pdf_path)
+    with (handle.open_pdf() if handle is not None else fitz.open(pdf_path)) as doc:
+        return doc.page_count
+
+
+def extract_pages(pdf_path: str, page_indexes: List[int]) -> bytes:
+    """把指定页（从0开始）拆成一个新的 PDF，返回其字节"""
+    handle = get_open_handle(pdf_path)
+    with (handle.open_pdf() if handle is not None else fitz.open(pdf_path)) as doc:
+        with fitz.open() as subset:
+            for index in page_indexes:
+                subset.insert_pdf(doc, from_page=index, to_page=index)
+            return subset.tobytes(garbage=1)
+
+
+def image_key(image, model_version: str, options: Dict[str, Any]) -> Optional[str]:
+    """
+    OCR 输入图像的缓存键
+
+    Args:
+        image: Docling 交给 RapidOCR 的页面区域图像
+        model_version: OCR 模型版本标识，模型变化后旧缓存自动失效
+        options: 调用选项（use_det / use_cls / use_rec 等）
+
+    Returns:
+        str: 缓存键；不是 numpy 数组时返回 None（不缓存）
+    """
+    if not NUMPY_AVAILABLE or not isinstance(image, np.ndarray):
+        return None
+    digest = hashlib.sha256(model_version.encode('utf-8'))
+    digest.update(json.dumps(sorted(options.items()), default=str).encode('utf-8'))
+    digest.update(f"{image.shape}:{image.dtype}".encode('ascii'))
+    digest.update(np.ascontiguousarray(image).data)
+    return digest.hexdigest()
+
+
+def _jsonable(value):
+    """把 RapidOCR 结果中的 numpy 数组和标量转为 JSON 可表示的类型"""
+    if NUMPY_AVAILABLE and isinstance(value, np.ndarray):
+        return value.tolist()
+    if NUMPY_AVAILABLE and isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    return value
+
+
+class OcrPageCache:
+    """OCR 识别结果缓存（SQLite，按总大小 LRU 淘汰）"""
+
+    def __init__(self, db_path: str, max_bytes: int):
+        """
+        Args:
+            db_path: SQLite 数据库文件路径
+            max_bytes: 缓存内容总大小上限（字节）
+        """
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._local = threading.local()
+        self._pid = os.getpid()
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        """每个线程一个连接（fork 后重新建立）"""
+        if self._pid != os.getpid():
+            self._local = threading.local()
+            self._pid = os.getpid()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        """查询缓存的识别结果，未命中时返回 None"""
+        conn = self._conn()
+        row = conn.execute('SELECT result FROM ocr_results WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        conn.execute('UPDATE ocr_results SET last_used = ? WHERE key = ?', (time.time(), key))
+        return json.loads(row['result'])
+
+    def put(self, key: str, result: Any) -> None:
+        """写入识别结果，超出大小上限时淘汰最久未使用的条目"""
+        payload = json.dumps(_jsonable(result), ensure_ascii=False)
+        now = time.time()
+        self._conn().execute(
+            'INSERT OR REPLACE INTO ocr_results (key, result, size, created_at, last_used) VALUES (?, ?, ?, ?, ?)',
+            (key, payload, len(payload.encode('utf-8')), now, now)
+        )
+        self._evict()
+
+    def _evict(self) -> None:
+        conn = self._conn()
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM ocr_results').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # 淘汰到上限的 90%，避免每次写入都触发淘汰
+        target = int(self.max_bytes * 0.9)
+        removed = 0
+        for row in conn.execute('SELECT key, size FROM ocr_results ORDER BY last_used').fetchall():
+            if total <= target:
+                break
+            conn.execute('DELETE FROM ocr_results WHERE key = ?', (row['key'],))
+            total -= row['size']
+            removed += 1
+        logger.debug("OCR结果缓存淘汰 %s 条，剩余 %s bytes", removed, total)
+
+    def stats(self) -> Dict[str, int]:
+        row = self._conn().execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM ocr_results').fetchone()
+        return {'entries': row[0], 'bytes': row[1], 'max_bytes': self.max_bytes}
+
+
+class CachedOcrReader:
+    """
+    包装 Docling OCR 模型中的 RapidOCR 引擎：相同的输入图像直接返回缓存的识别结果
+
+    其余属性的读写全部转给原引擎（批量识别层替换的 text_rec 仍作用在原引擎上）。
+    """
+
+    def __init__(self, reader, cache: OcrPageCache, model_version: str):
+        object.__setattr__(self, 'reader', reader)
+        object.__setattr__(self, 'cache', cache)
+        object.__setattr__(self, 'model_version', model_version)
+
+    def __getattr__(self, name):
+        return getattr(self.reader, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.reader, name, value)
+
+    def __call__(self, image, *args, **kwargs):
+        key = None if args else image_key(image, self.model_version, kwargs)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return tuple(cached)
+        output = self.reader(image, *args, **kwargs)
+        # 新版 RapidOCR 返回结果对象，不缓存
+        if key is not None and isinstance(output, tuple):
+            try:
+                self.cache.put(key, output)
+            except (TypeError, ValueError, sqlite3.Error) as e:
+                logger.debug("OCR结果未缓存: %s", e)
+        return output
+
+
+def install_ocr_cache(pipelines, cache: OcrPageCache, model_version: Callable[[Any], str]) -> int:
+    """
+    为管道中的 RapidOCR 模型安装结果缓存（已安装的跳过）
+
+    Args:
+        pipelines: 已初始化的 Docling 管道
+        cache: 结果缓存
+        model_version: 返回管道所用 OCR 模型版本标识的函数
+
+    Returns:
+        int: 本次新安装的 OCR 模型数
+    """
+    if not NUMPY_AVAILABLE:
+        return 0
+    installed = 0
+    for pipeline in pipelines:
+        for model in getattr(pipeline, 'build_pipe', None) or []:
+            reader = getattr(model, 'reader', None)
+            if reader is None or not callable(reader) or isinstance(reader, CachedOcrReader):
+                continue
+            model.reader = CachedOcrReader(reader, cache, model_version(pipeline))
+            installed += 1
+    if installed:
+        logger.info(f"🗂️ 已启用OCR结果缓存: {installed} 个模型")
+    return installed
+
+
+# 全局实例
+_page_cache: Optional[OcrPageCache] = None
+_page_cache_lock = threading.Lock()
+
+
+def get_ocr_page_cache() -> Optional[OcrPageCache]:
+    """获取 OCR 结果缓存实例；未开启时返回 None"""
+    global _page_cache
+    from config import Config
+    if not Config.OCR_PAGE_CACHE_ENABLED:
+        return None
+    if _page_cache is None:
+        with _page_cache_lock:
+            if _page_cache is None:
+                _page_cache = OcrPageCache(Config.OCR_PAGE_CACHE_PATH, Config.OCR_PAGE_CACHE_MAX_MB * 1024 * 1024)
+    return _page_cache
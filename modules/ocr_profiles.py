@@ -0,0 +1,167 @@
+"""
+OCR 档位模块
+定义 fast / balanced / accurate 三档 RapidOCR 模型组合，并根据页面质量自动选择档位
+"""
+
+import os
+import logging
+import statistics
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .input_handle import get_open_handle
+
+logger = logging.getLogger(__name__)
+
+# 尝试导入PyMuPDF（用于评估页面质量）
+try:
+    import fitz
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    PYMUPDF_AVAILABLE = False
+
+PROFILE_FAST = 'fast'
+PROFILE_BALANCED = 'balanced'
+PROFILE_ACCURATE = 'accurate'
+PROFILE_AUTO = 'auto'
+
+# 档位 -> 模型文件（相对于 RapidOCR 模型目录）
+OCR_PROFILES: Dict[str, Dict[str, str]] = {
+    # 移动端检测 + 识别：CPU 上最快，适合清晰、正向的扫描件
+    PROFILE_FAST: {
+        'det': 'PP-OCRv4/ch_PP-OCRv4_det_infer.onnx',
+        'rec': 'PP-OCRv4/ch_PP-OCRv4_rec_infer.onnx',
+    },
+    # 移动端检测 + 服务端识别：检测阶段占大头，识别保留高精度
+    PROFILE_BALANCED: {
+        'det': 'PP-OCRv4/ch_PP-OCRv4_det_infer.onnx',
+        'rec': 'PP-OCRv4/ch_PP-OCRv4_rec_server_infer.onnx',
+    },
+    # 服务端检测 + 识别：低分辨率、低对比度扫描件
+    PROFILE_ACCURATE: {
+        'det': 'PP-OCRv4/ch_PP-OCRv4_det_server_infer.onnx',
+        'rec': 'PP-OCRv4/ch_PP-OCRv4_rec_server_infer.onnx',
+    },
+}
+CLS_MODEL = 'PP-OCRv3/ch_ppocr_mobile_v2.0_cls_train.onnx'
+
+# 某档模型缺失时的替代顺序
+PROFILE_FALLBACKS = {
+    PROFILE_FAST: [PROFILE_FAST, PROFILE_BALANCED, PROFILE_ACCURATE],
+    PROFILE_BALANCED: [PROFILE_BALANCED, PROFILE_ACCURATE, PROFILE_FAST],
+    PROFILE_ACCURATE: [PROFILE_ACCURATE, PROFILE_BALANCED, PROFILE_FAST],
+}
+
+# 自动选择的阈值
+AUTO_SAMPLE_PAGES = 3         # 评估时抽样的页数
+AUTO_TEXT_LAYER_CHARS = 50    # 文本层字符数超过该值视为电子版页面
+AUTO_HIGH_DPI = 200           # 扫描分辨率达到该值视为清晰
+AUTO_LOW_DPI = 150            # 低于该值使用高精度模型
+AUTO_HIGH_CONTRAST = 40       # 灰度标准差
+AUTO_LOW_CONTRAST = 25
+AUTO_FAST_MIN_PAGES = 50      # 清晰的大文档优先吞吐
+
+
+def profile_model_paths(models_dir: Path, profile: str) -> Optional[Dict[str, str]]:
+    """
+    档位对应的模型文件路径；该档及替代档的模型都缺失时返回 None
+
+    Returns:
+        dict: {'profile': 实际使用的档位, 'det': ..., 'rec': ..., 'cls': ...}
+    """
+    cls_path = str(models_dir / CLS_MODEL)
+    for candidate in PROFILE_FALLBACKS.get(profile, PROFILE_FALLBACKS[PROFILE_ACCURATE]):
+        paths = {key: str(models_dir / rel) for key, rel in OCR_PROFILES[candidate].items()}
+        if all(os.path.exists(path) for path in paths.values()) and os.path.exists(cls_path):
+            if candidate != profile:
+                logger.warning(f"OCR档位 {profile} 的模型缺失，改用 {candidate}")
+            return {'profile': candidate, 'cls': cls_path, **paths}
+    return None
+
+
+def available_profiles(models_dir: Path) -> List[str]:
+    """模型文件齐全的档位"""
+    cls_exists = os.path.exists(models_dir / CLS_MODEL)
+    return [
+        name for name, files in OCR_PROFILES.items()
+        if cls_exists and all(os.path.exists(models_dir / rel) for rel in files.values())
+    ]
+
+
+def assess_pdf(pdf_path: str) -> Dict[str, object]:
+    """
+    抽样评估 PDF 页面：是否有文本层、扫描分辨率、对比度、是否确定为正向
+
+    Returns:
+        dict: page_count, text_layer, scan_dpi, contrast, upright
+    """
+    handle = get_open_handle(pdf_path)
+    with (handle.open_pdf() if handle is not None else fitz.open(pdf_path)) as doc:
+        page_count = doc.page_count
+        step = max(1, page_count // AUTO_SAMPLE_PAGES)
+        sample = list(range(0, page_count, step))[:AUTO_SAMPLE_PAGES]
+        text_pages, dpis, contrasts = 0, [], []
+        upright = True
+        for index in sample:
+            page = doc[index]
+            if page.rotation:
+                upright = False
+            text = page.get_text('dict')
+            chars = 0
+            for block in text.get('blocks', []):
+                for line in block.get('lines', []):
+                    # 非水平文本行说明页面内有旋转内容
+                    if tuple(round(v) for v in line.get('dir', (1, 0))) != (1, 0):
+                        upright = False
+                    chars += sum(len(span.get('text', '')) for span in line.get('spans', []))
+            if chars >= AUTO_TEXT_LAYER_CHARS:
+                text_pages += 1
+            else:
+                # 纯图像页无法从文本层确认方向
+                upright = False
+                for image in page.get_images(full=True):
+                    for rect in page.get_image_rects(image[0]):
+                        if rect.width > 0:
+                            dpis.append(image[2] / (rect.width / 72))
+                pixmap = page.get_pixmap(dpi=36, colorspace=fitz.csGRAY, alpha=False)
+                samples = pixmap.samples
+                if samples:
+                    contrasts.append(statistics.pstdev(samples[::7]))
+    return {
+        'page_count': page_count,
+        'text_layer': bool(sample) and text_pages == len(sample),
+        'scan_dpi': min(dpis) if dpis else None,
+        'contrast': min(contrasts) if contrasts else None,
+        'upright': upright and bool(sample),
+    }
+
+
+def choose_profile(pdf_path: str) -> Tuple[str, bool]:
+    """
+    根据页面质量和规模自动选择档位
+
+    Returns:
+        tuple: (档位, 是否确定所有页面为正向)
+    """
+    if not PYMUPDF_AVAILABLE:
+        return PROFILE_ACCURATE, False
+    try:
+        quality = assess_pdf(pdf_path)
+    except Exception as e:
+        logger.warning(f"评估页面质量失败，使用高精度OCR: {e}")
+        return PROFILE_ACCURATE, False
+
+    dpi, contrast = quality['scan_dpi'], quality['contrast']
+    if quality['text_layer']:
+        # 电子版 PDF 只有插图需要 OCR
+        profile = PROFILE_FAST
+    elif (dpi is not None and dpi < AUTO_LOW_DPI) or (contrast is not None and contrast < AUTO_LOW_CONTRAST):
+        profile = PROFILE_ACCURATE
+    elif (dpi or 0) >= AUTO_HIGH_DPI and (contrast or 0) >= AUTO_HIGH_CONTRAST \
+            and quality['page_count'] >= AUTO_FAST_MIN_PAGES:
+        profile = PROFILE_FAST
+    else:
+        profile = PROFILE_BALANCED
+    logger.info(f"OCR档位自动选择: {profile} (页数 {quality['page_count']}, 文本层 {quality['text_layer']}, "
+                f"分辨率 {dpi and round(dpi)}dpi, 对比度 {contrast and round(contrast, 1)}, 正向 {quality['upright']})")
+    return profile, quality['upright']
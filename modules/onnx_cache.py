@@ -0,0 +1,86 @@
+"""
+ONNX 模型优化缓存模块
+把 RapidOCR 模型经 ONNX Runtime 图优化后的结果序列化到缓存目录，后续启动（以及每个 gunicorn worker）
+直接加载已优化的模型，省去重复的图优化
+"""
+
+import os
+import hashlib
+import logging
+import threading
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+# 尝试导入onnxruntime（RapidOCR 的推理后端）
+try:
+    import onnxruntime as ort
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+
+# 进程内已解析的模型路径：原始路径 -> 优化后路径
+_resolved: Dict[str, str] = {}
+_resolved_lock = threading.Lock()
+
+
+def _file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def optimized_model_path(model_path: str, cache_dir: str) -> str:
+    """
+    返回模型的已优化版本路径，缓存不存在时生成
+
+    缓存键包含模型内容哈希和 ONNX Runtime 版本，模型或运行时升级后自动重新生成。
+    只使用与硬件无关的扩展级优化，缓存可在同构机器间共享。
+
+    Args:
+        model_path: 原始 .onnx 模型路径
+        cache_dir: 缓存目录
+
+    Returns:
+        str: 优化后的模型路径；无法优化时返回原始路径
+    """
+    if not ONNXRUNTIME_AVAILABLE or not os.path.exists(model_path):
+        return model_path
+    with _resolved_lock:
+        if model_path in _resolved:
+            return _resolved[model_path]
+
+    try:
+        name = os.path.splitext(os.path.basename(model_path))[0]
+        key = f"{name}-{_file_sha256(model_path)[:16]}-ort{ort.__version__}"
+        cached_path = os.path.join(cache_dir, f"{key}.onnx")
+        if os.path.exists(cached_path):
+            logger.info(f"⚡ 使用已优化的ONNX模型: {cached_path}")
+        else:
+            os.makedirs(cache_dir, exist_ok=True)
+            # 先写临时文件再原子替换，多个 worker 同时生成时互不影响
+            temp_path = f"{cached_path}.{os.getpid()}.tmp"
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+            options.optimized_model_filepath = temp_path
+            ort.InferenceSession(model_path, sess_options=options, providers=['CPUExecutionProvider'])
+            os.replace(temp_path, cached_path)
+            logger.info(f"⚡ 已生成优化后的ONNX模型: {cached_path}")
+    except Exception as e:
+        logger.warning(f"ONNX模型优化失败，使用原始模型 {model_path}: {e}")
+        cached_path = model_path
+
+    with _resolved_lock:
+        _resolved[model_path] = cached_path
+    return cached_path
+
+
+def resolve_model_path(model_path: str) -> str:
+    """按配置返回 RapidOCR 实际加载的模型路径"""
+    from config import Config
+    if not Config.ONNX_CACHE_ENABLED:
+        return model_path
+    return optimized_model_path(model_path, Config.ONNX_CACHE_DIR)
+
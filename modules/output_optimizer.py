@@ -0,0 +1,135 @@
+"""
+输出体积优化模块
+转换完成后压缩 PDF / DOCX 结果：字体子集化、对象去重、DOCX 最高压缩率重新打包；
+图片降采样重压缩会损失画质，需要单独开启
+
+结果经家庭网络隧道返回，pandoc/xelatex 生成的 PDF、直接复制的 CAJ-PDF 和 pdf2docx 生成的带图 DOCX
+往往远大于需要的体积。优化后的文件只有在确实变小时才替换原文件。
+"""
+
+import io
+import os
+import logging
+import zipfile
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# 尝试导入PyMuPDF（PDF 图片重压缩、字体子集化和对象去重）
+try:
+    import fitz
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    PYMUPDF_AVAILABLE = False
+    logger.warning("PyMuPDF库不可用，PDF结果不做体积优化")
+
+# 尝试导入Pillow（DOCX 内嵌图片降采样）
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+    logger.warning("Pillow库不可用，DOCX内嵌图片不做降采样")
+
+OPTIMIZABLE_FORMATS = ('PDF', 'DOCX')
+
+# DOCX 正文宽度（英寸，A4/Letter 默认页边距），按目标 DPI 换算图片的最大像素宽度
+DOCX_TEXT_WIDTH_INCHES = 6.5
+DOCX_IMAGE_FORMATS = {'.png': 'PNG', '.jpg': 'JPEG', '.jpeg': 'JPEG'}
+
+
+def optimize_output(path: str, export_format: str, image_dpi: int = 150, jpeg_quality: int = 80,
+                    lossy_images: bool = False) -> int:
+    """
+    就地优化转换结果
+
+    默认只做无损优化（PDF 字体子集化、对象去重和 deflate 压缩，DOCX 重新打包），内容与原文件一致。
+
+    Args:
+        path: 结果文件路径
+        export_format: 导出格式，只处理 PDF 和 DOCX
+        image_dpi: 内嵌图片的目标分辨率（仅 lossy_images 时使用）
+        jpeg_quality: 重压缩 JPEG 的质量（仅 lossy_images 时使用）
+        lossy_images: 是否把内嵌图片降采样并重压缩为 JPEG
+
+    Returns:
+        int: 节省的字节数（未优化或没有变小时为 0）
+    """
+    export_format = export_format.upper()
+    if export_format not in OPTIMIZABLE_FORMATS:
+        return 0
+    original_size = os.path.getsize(path)
+    temp_path = f"{path}.optimized"
+    try:
+        if export_format == 'PDF':
+            if not PYMUPDF_AVAILABLE:
+                return 0
+            _optimize_pdf(path, temp_path, image_dpi, jpeg_quality, lossy_images)
+        else:
+            _optimize_docx(path, temp_path, image_dpi, jpeg_quality, lossy_images)
+        optimized_size = os.path.getsize(temp_path)
+        if optimized_size >= original_size:
+            logger.debug("优化后未变小，保留原文件: %s (%d -> %d bytes)", path, original_size, optimized_size)
+            return 0
+        os.replace(temp_path, path)
+    except Exception as e:
+        logger.warning(f"输出体积优化失败，保留原文件: {path}: {e}")
+        return 0
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    saved = original_size - optimized_size
+    logger.info(f"🗜️ 输出体积优化: {os.path.basename(path)} {original_size / 1024:.0f}KB -> "
+                f"{optimized_size / 1024:.0f}KB (节省 {saved * 100 / original_size:.0f}%)")
+    return saved
+
+
+def _optimize_pdf(path: str, output_path: str, image_dpi: int, jpeg_quality: int, lossy_images: bool) -> None:
+    """字体子集化，并以 garbage=4 去重对象、deflate 压缩后重新写出；lossy_images 时先降采样重压缩图片"""
+    with fitz.open(path) as doc:
+        if lossy_images and hasattr(doc, 'rewrite_images'):
+            # 高于目标分辨率 1.5 倍的图片才降采样，避免反复重压缩
+            doc.rewrite_images(dpi_threshold=int(image_dpi * 1.5), dpi_target=image_dpi, quality=jpeg_quality,
+                               lossy=True, lossless=True, bitonal=True, color=True, gray=True)
+        if hasattr(doc, 'subset_fonts'):
+            doc.subset_fonts()
+        doc.save(output_path, garbage=4, deflate=True, deflate_images=True, deflate_fonts=True, clean=True)
+
+
+def _optimize_docx(path: str, output_path: str, image_dpi: int, jpeg_quality: int, lossy_images: bool) -> None:
+    """以最高压缩率重新打包；lossy_images 时按正文宽度降采样 word/media 中的大图"""
+    max_width = int(DOCX_TEXT_WIDTH_INCHES * image_dpi)
+    with zipfile.ZipFile(path) as source, \
+            zipfile.ZipFile(output_path, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=9) as target:
+        for info in source.infolist():
+            data = source.read(info.filename)
+            if lossy_images and info.filename.startswith('word/media/'):
+                data = _shrink_image(data, info.filename, max_width, jpeg_quality) or data
+            target.writestr(_copy_info(info), data, compresslevel=9)
+
+
+def _copy_info(info: zipfile.ZipInfo) -> zipfile.ZipInfo:
+    copied = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+    copied.external_attr = info.external_attr
+    copied.compress_type = zipfile.ZIP_DEFLATED
+    return copied
+
+
+def _shrink_image(data: bytes, name: str, max_width: int, jpeg_quality: int) -> Optional[bytes]:
+    """宽度超过 max_width 的 PNG/JPEG 等比缩小，保持原格式；没有变小时返回 None"""
+    image_format = DOCX_IMAGE_FORMATS.get(os.path.splitext(name)[1].lower())
+    if not PIL_AVAILABLE or image_format is None:
+        return None
+    with Image.open(io.BytesIO(data)) as image:
+        if image.width <= max_width:
+            return None
+        height = max(round(image.height * max_width / image.width), 1)
+        resized = image.resize((max_width, height), Image.LANCZOS)
+        buffer = io.BytesIO()
+        if image_format == 'JPEG':
+            resized.convert('RGB').save(buffer, 'JPEG', quality=jpeg_quality, optimize=True)
+        else:
+            resized.save(buffer, 'PNG', optimize=True)
+    shrunk = buffer.getvalue()
+    return shrunk if len(shrunk) < len(data) else None
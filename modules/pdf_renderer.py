@@ -0,0 +1,181 @@
+"""
+Markdown 转 PDF 渲染引擎
+pandoc 生成 HTML 后由 WeasyPrint 排版，进程内共享字体配置和样式表，CJK 字体只加载一次；
+公式较多或含原生 LaTeX 的文档仍交给 xelatex
+"""
+
+import os
+import re
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import pypandoc
+
+logger = logging.getLogger(__name__)
+
+# 尝试导入WeasyPrint（可选，HTML + CSS 排版）
+try:
+    from weasyprint import CSS, HTML
+    from weasyprint.text.fonts import FontConfiguration
+    WEASYPRINT_AVAILABLE = True
+except ImportError:
+    WEASYPRINT_AVAILABLE = False
+
+ENGINE_AUTO = 'auto'
+ENGINE_WEASYPRINT = 'weasyprint'
+ENGINE_XELATEX = 'xelatex'
+PDF_ENGINES = (ENGINE_AUTO, ENGINE_WEASYPRINT, ENGINE_XELATEX)
+
+# 行内公式达到该数量视为公式密集，交给 xelatex（少量行内公式 pandoc 会近似渲染为 HTML 文本）
+MATH_INLINE_THRESHOLD = 3
+# 公式检测最多读取的字节数
+MATH_SCAN_BYTES = 1024 * 1024
+
+_DISPLAY_MATH = re.compile(r'\$\$|\\\[|\\begin\{(?:equation|align|gather|multline|eqnarray)\*?\}')
+_INLINE_MATH = re.compile(r'(?<![\\$])\$(?=\S)[^$\n]+?(?<=\S)\$(?!\d)|\\\(')
+# pandoc 直接透传给 LaTeX 的原生命令，HTML 中会丢失
+_RAW_LATEX = re.compile(r'^\s*\\(?:newpage|clearpage|pagebreak|begin\{|usepackage|documentclass)', re.MULTILINE)
+
+STYLESHEET = """
+@page { size: A4; margin: 2cm; @bottom-center { content: counter(page); font-size: 9pt; color: #666; } }
+html { font-family: %(fonts)s; font-size: 11pt; line-height: 1.6; }
+body { text-align: justify; orphans: 2; widows: 2; }
+h1, h2, h3, h4, h5, h6 { line-height: 1.3; margin: 1.2em 0 0.5em; page-break-after: avoid; }
+h1 { font-size: 20pt; } h2 { font-size: 16pt; } h3 { font-size: 13pt; }
+p { margin: 0 0 0.8em; }
+pre, code { font-family: "DejaVu Sans Mono", Menlo, %(fonts)s; font-size: 9pt; }
+pre { background: #f6f8fa; padding: 0.6em; white-space: pre-wrap; word-break: break-all; }
+blockquote { margin: 0 0 0.8em; padding-left: 1em; border-left: 3px solid #ccc; color: #555; }
+table { border-collapse: collapse; width: 100%%; margin: 0 0 0.8em; font-size: 10pt; }
+th, td { border: 1px solid #999; padding: 3px 6px; vertical-align: top; }
+thead { display: table-header-group; }
+tr { page-break-inside: avoid; }
+img { max-width: 100%%; }
+"""
+
+# 当前转换请求指定的引擎（由 DocumentConverter 按请求选项设置）
+_pdf_engine_request: contextvars.ContextVar = contextvars.ContextVar('pdf_engine_request', default=None)
+
+
+@contextmanager
+def pdf_engine_request(engine: Optional[str]) -> Iterator[None]:
+    """
+    在上下文内为 Markdown 转 PDF 指定渲染引擎
+
+    Args:
+        engine: auto / weasyprint / xelatex，None 使用 Config.PDF_ENGINE
+    """
+    token = _pdf_engine_request.set(engine)
+    try:
+        yield
+    finally:
+        _pdf_engine_request.reset(token)
+
+
+def requested_pdf_engine() -> str:
+    """当前请求的引擎，未指定时使用配置"""
+    from config import Config
+    return _pdf_engine_request.get() or Config.PDF_ENGINE
+
+
+def needs_latex(input_path: str) -> bool:
+    """文档是否公式密集或含原生 LaTeX（只读取开头 MATH_SCAN_BYTES）"""
+    with open(input_path, 'r', encoding='utf-8', errors='replace') as f:
+        text = f.read(MATH_SCAN_BYTES)
+    if _DISPLAY_MATH.search(text) or _RAW_LATEX.search(text):
+        return True
+    inline = 0
+    for _ in _INLINE_MATH.finditer(text):
+        inline += 1
+        if inline >= MATH_INLINE_THRESHOLD:
+            return True
+    return False
+
+
+def choose_pdf_engine(input_path: str, requested: Optional[str] = None) -> str:
+    """
+    选择 Markdown 转 PDF 的首选引擎
+
+    Args:
+        input_path: UTF-8 Markdown 文件路径
+        requested: auto / weasyprint / xelatex，None 使用当前请求或配置
+
+    Returns:
+        str: weasyprint 或 xelatex
+    """
+    requested = (requested or requested_pdf_engine()).lower()
+    if requested in (ENGINE_WEASYPRINT, ENGINE_XELATEX):
+        return requested
+    if not WEASYPRINT_AVAILABLE:
+        return ENGINE_XELATEX
+    return ENGINE_XELATEX if needs_latex(input_path) else ENGINE_WEASYPRINT
+
+
+class WeasyPrintRenderer:
+    """
+    进程内共享的 WeasyPrint 渲染器
+
+    FontConfiguration 和编译后的样式表在进程内只创建一次，首次渲染后 CJK 字体已加载；
+    WeasyPrint 的字体配置不是线程安全的，渲染时串行执行。
+    """
+
+    def __init__(self, font_family: str):
+        """
+        Args:
+            font_family: CSS font-family 列表，CJK 字体放在前面
+        """
+        self.font_config = FontConfiguration()
+        self.stylesheet = CSS(string=STYLESHEET % {'fonts': font_family}, font_config=self.font_config)
+        self._lock = threading.Lock()
+
+    def render_html(self, html: str, output_path: str, base_url: Optional[str] = None) -> None:
+        """把 HTML 字符串排版为 PDF"""
+        document = HTML(string=html, base_url=base_url)
+        with self._lock:
+            document.write_pdf(output_path, stylesheets=[self.stylesheet], font_config=self.font_config)
+
+    def render_markdown(self, input_path: str, output_path: str) -> None:
+        """Markdown 文件转 PDF：pandoc 生成 HTML 片段（中文换行不插入空格），相对路径的图片按输入目录解析"""
+        body = pypandoc.convert_file(input_path, 'html5', format='markdown+east_asian_line_breaks',
+                                     extra_args=['--wrap=none'])
+        html = f'<!DOCTYPE html><html lang="zh"><head><meta charset="utf-8"></head><body>{body}</body></html>'
+        self.render_html(html, output_path, base_url=os.path.dirname(os.path.abspath(input_path)))
+
+    def warm_up(self) -> None:
+        """渲染一页中英混排文本，提前完成字体查找和加载"""
+        html = '<p>预热 Warm-up 中文字体 0123456789，。！</p><table><tr><td>表格</td></tr></table>'
+        with open(os.devnull, 'wb') as devnull:
+            self.render_html(html, devnull)
+
+
+# 全局实例
+_renderer: Optional[WeasyPrintRenderer] = None
+_renderer_lock = threading.Lock()
+
+
+def get_weasyprint_renderer() -> WeasyPrintRenderer:
+    """获取 WeasyPrint 渲染器实例"""
+    global _renderer
+    if not WEASYPRINT_AVAILABLE:
+        raise Exception("WeasyPrint 未安装（pip install weasyprint）")
+    if _renderer is None:
+        with _renderer_lock:
+            if _renderer is None:
+                from config import Config
+                _renderer = WeasyPrintRenderer(Config.PDF_FONT_FAMILY)
+                logger.info("✅ WeasyPrint 渲染器已创建")
+    return _renderer
+
+
+def warm_up_pdf_renderer(enabled: bool) -> None:
+    """按 PDF_RENDERER_WARMUP 预加载 CJK 字体（需在 fork 之后的进程内调用）"""
+    if not enabled or not WEASYPRINT_AVAILABLE:
+        return
+    try:
+        get_weasyprint_renderer().warm_up()
+        logger.info("🔥 PDF 渲染字体预热完成")
+    except Exception as e:
+        logger.warning(f"PDF 渲染预热失败: {e}")
@@ -0,0 +1,112 @@
+"""
+预览转换模块
+只转换 PDF 的前几页或均匀抽样的几页，让用户在提交整本转换前先确认 OCR 效果
+
+预览页拆成子 PDF 后按与整本转换相同的路线执行，页数按耗时模型控制在延迟预算内。
+自动 OCR 档位按整本文档选定后固定下来：子 PDF 的页面与原文件逐像素相同，开启 OCR 结果缓存时
+识别结果按 OCR 输入图像写入缓存，随后经 Docling 的整本转换（任意导出格式）不再重复识别这些页。
+缓存关闭或整本转换不经过 Docling OCR 时，预估中会注明预览页不会被复用。
+"""
+
+import logging
+from typing import Any, Dict, List, Optional
+
+from .input_handle import read_header
+from .ocr_page_cache import PYMUPDF_AVAILABLE, extract_pages, get_ocr_page_cache, pdf_page_count
+from .ocr_profiles import OCR_PROFILES, choose_profile
+from .scheduler import estimate_job, get_cost_model
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_FIRST = 'first'  # 前 N 页
+PREVIEW_SAMPLE = 'sample'  # 含首页在内均匀抽样 N 页
+PREVIEW_MODES = (PREVIEW_FIRST, PREVIEW_SAMPLE)
+
+# 整本转换的耗时主要花在 Docling OCR 上、能从 OCR 结果缓存中复用预览页的路线
+# （PDF 转 DOCX 先走 pdf2docx，只有回退到 Docling 时才经过缓存）
+OCR_CACHED_ROUTES = ('pdf:scan',)
+
+
+def is_previewable(input_path: str, input_ext: str) -> bool:
+    """只有 PDF（含伪装成 CAJ 的 PDF）支持按页预览"""
+    if not PYMUPDF_AVAILABLE:
+        return False
+    return input_ext == 'pdf' or (input_ext == 'caj' and read_header(input_path, 4).startswith(b'%PDF'))
+
+
+def select_pages(page_count: int, count: int, mode: str = PREVIEW_FIRST) -> List[int]:
+    """
+    选择预览页
+
+    Args:
+        page_count: 文档总页数
+        count: 预览页数
+        mode: first（前 N 页）或 sample（均匀抽样，总是包含首页）
+
+    Returns:
+        List[int]: 从0开始的页码，升序
+    """
+    count = max(min(count, page_count), 1)
+    if mode != PREVIEW_SAMPLE or count >= page_count:
+        return list(range(count))
+    step = page_count / count
+    return sorted({int(i * step) for i in range(count)})
+
+
+def plan_preview(input_path: str, export_format: str, requested_pages: int, mode: str,
+                 budget: float, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    规划预览：按耗时模型选择能在预算内完成的页数，并估算整本转换的耗时
+
+    Args:
+        input_path: 原始 PDF 路径
+        export_format: 导出格式
+        requested_pages: 请求的预览页数
+        mode: first / sample
+        budget: 预览的延迟预算（秒）
+        options: 请求的转换选项（用于判断是否需要固定自动 OCR 档位）
+
+    Returns:
+        dict: pages（选中的页）、page_count、options（固定档位后的转换选项）、
+              estimate（整本/剩余/预览的预计耗时，以及整本转换是否复用预览页的识别结果）
+    """
+    options = dict(options or {})
+    page_count = pdf_page_count(input_path)
+    features = estimate_job(input_path, export_format)
+    cost_model = get_cost_model()
+    overhead, seconds_per_page = cost_model.params(features['route'])
+    # 固定开销之后的预算能容纳的页数，至少预览一页
+    fit = int((budget - overhead) / seconds_per_page) if seconds_per_page > 0 else requested_pages
+    pages = select_pages(page_count, max(min(requested_pages, fit), 1), mode)
+
+    # 按整本文档确定自动档位，避免子 PDF 的页数、质量统计选出不同的模型而无法复用缓存
+    if not options.get('ocr_profile') or options['ocr_profile'] not in OCR_PROFILES:
+        profile, upright = choose_profile(input_path)
+        options['ocr_profile'] = profile
+        options['upright'] = bool(options.get('upright')) or upright
+
+    full_seconds = cost_model.predict(features['route'], features['units'])
+    # 只有 OCR 结果缓存开启、且整本转换经过 Docling OCR 时，剩余耗时才扣除预览页
+    reuses_preview = features['route'] in OCR_CACHED_ROUTES and get_ocr_page_cache() is not None
+    remaining_pages = page_count - len(pages) if reuses_preview else page_count
+    estimate = {
+        'route': features['route'],
+        'full_seconds': round(full_seconds, 1),
+        'remaining_seconds': round(cost_model.predict(features['route'], remaining_pages), 1),
+        'preview_seconds': round(cost_model.predict(features['route'], len(pages)), 1),
+        'reuses_preview': reuses_preview,
+    }
+    if not reuses_preview:
+        estimate['note'] = ("OCR result cache is disabled; the full conversion will process the preview pages again"
+                            if features['route'] in OCR_CACHED_ROUTES else
+                            "This route does not reuse preview OCR results; the full conversion will process all pages")
+    if len(pages) < requested_pages:
+        logger.info(f"预览页数按延迟预算从 {requested_pages} 页降为 {len(pages)} 页 "
+                    f"(每页约 {seconds_per_page:.1f}s, 预算 {budget:.0f}s)")
+    return {'pages': pages, 'page_count': page_count, 'options': options, 'estimate': estimate}
+
+
+def write_preview_pdf(input_path: str, pages: List[int], output_path: str) -> None:
+    """把预览页拆成子 PDF"""
+    with open(output_path, 'wb') as f:
+        f.write(extract_pages(input_path, pages))
@@ -0,0 +1,223 @@
+"""
+转换请求采样分析模块
+以低开销的方式对单次 convert_document 调用做栈采样，输出火焰图兼容的折叠栈文件
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import logging
+import resource
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 尝试导入psutil（可选，用于把子进程耗时归因到具体命令）
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+# 等待子进程时栈中会出现的模块（栈顶通常是 selectors.py 的 select 或 _wait）
+SUBPROCESS_MARKERS = ('subprocess.py', 'popen_fork.py')
+# 代转换线程干活的辅助线程名前缀（ConcurrentPageModel 的同批多页 OCR 线程）
+HELPER_THREAD_PREFIXES = ('ocr-page',)
+
+
+def should_profile(header_value: Optional[str], sample_rate: float, authorized: bool = False) -> bool:
+    """
+    根据请求头或采样率决定是否分析本次请求
+
+    Args:
+        header_value: X-Profile 请求头
+        sample_rate: 随机分析的请求比例
+        authorized: 请求是否带有有效的管理令牌；只有管理员才能用请求头强制开启分析
+    """
+    if authorized and header_value and header_value.strip().lower() in ('1', 'true', 'yes'):
+        return True
+    return sample_rate > 0 and random.random() < sample_rate
+
+
+def _frame_label(frame) -> str:
+    """栈帧标签：函数名 (文件名:行号)"""
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+class SamplingProfiler(threading.Thread):
+    """
+    后台线程定期采样目标线程及 OCR 辅助线程的调用栈
+
+    辅助线程的栈以 "[thread] 线程名" 为根，与目标线程的栈分开显示。辅助线程按名称识别，
+    同一进程中并发的其它转换任务的 OCR 页线程也会计入；其它任务的转换线程不会被采样。
+    """
+
+    def __init__(self, target_thread_id: int, interval: float = 0.005,
+                 helper_prefixes: Tuple[str, ...] = HELPER_THREAD_PREFIXES):
+        """
+        Args:
+            target_thread_id: 被分析线程的 ident
+            interval: 采样间隔（秒）
+            helper_prefixes: 一并采样的辅助线程名前缀
+        """
+        super().__init__(daemon=True, name='conversion-profiler')
+        self.target_thread_id = target_thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self.helper_prefixes = helper_prefixes
+        self._stop_event = threading.Event()
+        self._process = psutil.Process() if PSUTIL_AVAILABLE else None
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            frame = frames.get(self.target_thread_id)
+            if frame is None:
+                continue
+            self._record(frame, [])
+            self.sample_count += 1
+            if self.helper_prefixes:
+                for thread in threading.enumerate():
+                    if thread.ident in frames and thread.name.startswith(self.helper_prefixes):
+                        self._record(frames[thread.ident], [f"[thread] {thread.name}"])
+
+    def _record(self, frame, stack: list) -> None:
+        """把一个线程的栈（从根到栈顶）计入样本"""
+        frames = []
+        while frame is not None:
+            frames.append(_frame_label(frame))
+            frame = frame.f_back
+        stack.extend(reversed(frames))
+
+        # 正在等待子进程时，把当前子进程名接到栈尾（pandoc、caj2pdf、xelatex…）
+        if any(marker in label for label in frames for marker in SUBPROCESS_MARKERS):
+            stack.extend(self._child_frames())
+
+        self.samples[';'.join(stack)] += 1
+
+    def _child_frames(self) -> list:
+        """当前子进程链，例如 ['[child] pandoc', '[child] xelatex']"""
+        if self._process is None:
+            return ['[child process]']
+        try:
+            children = self._process.children(recursive=True)
+            names = [f"[child] {child.name()}" for child in children]
+        except Exception:
+            names = []
+        return names or ['[child process]']
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+def _child_cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+@contextmanager
+def profile_conversion(job_id: str, profile_dir: str, metadata: Optional[Dict] = None,
+                       interval: float = 0.005) -> Iterator[None]:
+    """
+    在上下文内分析当前线程（及其 OCR 辅助线程），结束后写出 <job_id>.folded 与 <job_id>.json
+
+    Args:
+        job_id: 转换任务ID
+        profile_dir: 分析文件保存目录
+        metadata: 附加信息（文件名、目标格式等）
+        interval: 采样间隔（秒）
+    """
+    os.makedirs(profile_dir, exist_ok=True)
+    profiler = SamplingProfiler(threading.get_ident(), interval)
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    child_cpu_start = _child_cpu_seconds()
+    profiler.start()
+    error = None
+    try:
+        yield
+    except Exception as e:
+        error = str(e)
+        raise
+    finally:
+        profiler.stop()
+        summary = dict(metadata or {})
+        summary.update({
+            'job_id': job_id,
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'wall_s': round(time.perf_counter() - wall_start, 4),
+            'thread_cpu_s': round(time.thread_time() - cpu_start, 4),
+            # 进程级统计：并发转换时包含其它请求的子进程
+            'child_cpu_s': round(_child_cpu_seconds() - child_cpu_start, 4),
+            'samples': profiler.sample_count,
+            'interval_s': interval,
+            'error': error,
+        })
+        try:
+            _write_profile(profile_dir, job_id, profiler.samples, summary)
+        except Exception as e:
+            logger.warning(f"写入分析文件失败: {e}")
+
+
+def _write_profile(profile_dir: str, job_id: str, samples: Counter, summary: Dict) -> None:
+    folded_path = os.path.join(profile_dir, f"{job_id}.folded")
+    with open(folded_path, 'w', encoding='utf-8') as f:
+        for stack, count in samples.most_common():
+            f.write(f"{stack} {count}\n")
+    with open(os.path.join(profile_dir, f"{job_id}.json"), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    logger.info(f"📈 已保存转换分析: {folded_path} ({summary['samples']} 个样本, {summary['wall_s']}s)")
+
+
+def list_profiles(profile_dir: str) -> list:
+    """列出已保存的分析摘要（按时间倒序）"""
+    if not os.path.isdir(profile_dir):
+        return []
+    summaries = []
+    for name in os.listdir(profile_dir):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(profile_dir, name), encoding='utf-8') as f:
+                summaries.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return sorted(summaries, key=lambda item: item.get('created_at', ''), reverse=True)
+
+
+def purge_profiles(profile_dir: str, ttl: float) -> int:
+    """
+    删除超过保留时间的分析文件
+
+    Args:
+        profile_dir: 分析文件保存目录
+        ttl: 保留时间（秒）
+
+    Returns:
+        int: 删除的文件数
+    """
+    if not os.path.isdir(profile_dir):
+        return 0
+    cutoff = time.time() - ttl
+    removed = 0
+    for name in os.listdir(profile_dir):
+        if not name.endswith(('.folded', '.json')):
+            continue
+        path = os.path.join(profile_dir, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            continue
+    if removed:
+        logger.debug("已清理过期分析文件: %d 个", removed)
+    return removed
@@ -0,0 +1,255 @@
+"""
+转换任务调度模块
+执行前廉价估算任务耗时（页数、文本层、文件大小、转换路线），按预计耗时短作业优先，
+同时按等待时间老化防止饿死，并按客户端公平分配；估算模型根据实际耗时在线学习
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from .input_handle import read_header
+
+logger = logging.getLogger(__name__)
+
+# 尝试导入PyMuPDF（用于读取页数和文本层）
+try:
+    import fitz
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    PYMUPDF_AVAILABLE = False
+
+# 文本层检查最多看的页数
+TEXT_LAYER_SAMPLE_PAGES = 3
+# 实际耗时的指数滑动平均系数
+EWMA_ALPHA = 0.2
+
+# 路线先验：(固定开销秒数, 每单位秒数)；PDF 类按页计，其它按 MB 计
+ROUTE_PRIORS: Dict[str, Tuple[float, float]] = {
+    'pdf:scan': (2.0, 3.0),      # 扫描件需要整页 OCR
+    'pdf:text': (1.0, 0.5),
+    'pdf->DOCX': (0.5, 0.3),     # pdf2docx 直接转换
+    'docx->PDF': (3.0, 1.0),     # pandoc + xelatex
+    'md->PDF': (3.0, 1.0),
+    'md->XLSX': (0.5, 1.0),
+    'md': (0.3, 0.5),
+    'text': (0.05, 0.05),        # 文本直通/转码
+    'html': (0.1, 0.3),          # 轻量 HTML 解析
+    'docx->md': (0.5, 0.5),      # pandoc 读取 DOCX
+    'sheet': (0.2, 1.5),         # 流式读取电子表格
+    'caj': (3.0, 1.0),
+    'default': (1.0, 2.0),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS {table} (
+    route TEXT PRIMARY KEY,
+    overhead REAL NOT NULL,
+    seconds_per_unit REAL NOT NULL,
+    samples INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+def _pdf_features(input_path: str) -> Tuple[int, bool, Optional[float]]:
+    """PDF 页数、是否有文本层、扫描分辨率（无文本层时按首页图像估算）"""
+    scan_dpi = None
+    with fitz.open(input_path, filetype='pdf') as doc:
+        page_count = doc.page_count
+        sample = range(min(page_count, TEXT_LAYER_SAMPLE_PAGES))
+        text_layer = bool(page_count) and all(doc[i].get_text('text').strip() for i in sample)
+        if page_count and not text_layer:
+            page = doc[0]
+            for image in page.get_images(full=True):
+                for rect in page.get_image_rects(image[0]):
+                    if rect.width > 0:
+                        scan_dpi = max(scan_dpi or 0.0, image[2] / (rect.width / 72))
+    return page_count, text_layer, scan_dpi
+
+
+def _table_rows(input_path: str) -> int:
+    """Markdown 表格行数（转 XLSX 时的内存主要花在表格上）"""
+    rows = 0
+    with open(input_path, 'rb') as f:
+        for line in f:
+            if line.lstrip().startswith(b'|'):
+                rows += 1
+    return rows
+
+
+def estimate_job(input_path: str, export_format: str) -> Dict[str, Any]:
+    """
+    执行前估算任务规模（只读取元数据，不做转换）
+
+    Returns:
+        dict: route（成本模型路线键）、units（页数或 MB）、pages、text_layer、scan_dpi、table_rows、size_bytes
+    """
+    ext = input_path.rsplit('.', 1)[-1].lower()
+    export_format = export_format.upper()
+    size_bytes = os.path.getsize(input_path)
+    features: Dict[str, Any] = {'size_bytes': size_bytes, 'pages': None, 'text_layer': None,
+                                'scan_dpi': None, 'table_rows': None}
+
+    is_pdf = ext == 'pdf' or (ext == 'caj' and read_header(input_path, 4).startswith(b'%PDF'))
+    if is_pdf and PYMUPDF_AVAILABLE:
+        try:
+            features['pages'], features['text_layer'], features['scan_dpi'] = _pdf_features(input_path)
+        except Exception as e:
+            logger.debug("估算任务时读取PDF失败: %s", e)
+
+    if ext == 'caj' and not is_pdf:
+        route = 'caj'
+    elif is_pdf and export_format == 'DOCX':
+        route = 'pdf->DOCX'
+    elif is_pdf:
+        route = 'pdf:text' if features['text_layer'] else 'pdf:scan'
+    elif ext in ('docx', 'doc') and export_format == 'PDF':
+        route = 'docx->PDF'
+    elif ext in ('txt', 'md') and export_format in ('MARKDOWN', 'TEXT'):
+        route = 'text'
+    elif ext in ('txt', 'md'):
+        route = f"md->{export_format}" if export_format in ('PDF', 'XLSX') else 'md'
+        features['table_rows'] = _table_rows(input_path)
+    elif ext in ('xlsx', 'xls', 'csv') and export_format not in ('PDF', 'DOCX'):
+        route = 'sheet'
+    elif ext == 'html' and export_format in ('MARKDOWN', 'TEXT'):
+        route = 'html'
+    elif ext == 'docx' and export_format in ('MARKDOWN', 'TEXT'):
+        route = 'docx->md'
+    else:
+        route = f"{ext}->{export_format}"
+
+    features['route'] = route
+    features['units'] = float(features['pages']) if features['pages'] else max(size_bytes / 1024 / 1024, 0.1)
+    return features
+
+
+class CostModel:
+    """
+    按路线学习耗时：预计耗时 = 固定开销 + 每单位耗时 × 单位数
+
+    子类可替换 TABLE / PRIORS 学习其它按路线线性估算的量（如峰值内存）。
+    """
+
+    TABLE = 'route_costs'
+    PRIORS = ROUTE_PRIORS
+
+    def __init__(self, db_path: str):
+        """
+        Args:
+            db_path: SQLite 数据库文件路径（与任务表共用）
+        """
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._local = threading.local()
+        self._pid = os.getpid()
+        self._conn().executescript(SCHEMA.format(table=self.TABLE))
+
+    def _conn(self) -> sqlite3.Connection:
+        """每个线程一个连接（fork 后重新建立）"""
+        if self._pid != os.getpid():
+            self._local = threading.local()
+            self._pid = os.getpid()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def params(self, route: str) -> Tuple[float, float]:
+        """路线的 (固定开销, 每单位开销)，未学习过的路线使用先验"""
+        row = self._conn().execute(
+            f'SELECT overhead, seconds_per_unit FROM {self.TABLE} WHERE route = ?', (route,)
+        ).fetchone()
+        if row is not None:
+            return row['overhead'], row['seconds_per_unit']
+        return self.PRIORS.get(route, self.PRIORS['default'])
+
+    def predict(self, route: str, units: float) -> float:
+        """预计耗时（秒）"""
+        overhead, seconds_per_unit = self.params(route)
+        return overhead + seconds_per_unit * units
+
+    def observe(self, route: str, units: float, seconds: float) -> None:
+        """记录一次实际耗时，更新该路线的每单位耗时"""
+        if units <= 0 or seconds <= 0:
+            return
+        overhead, seconds_per_unit = self.params(route)
+        observed = max(seconds - overhead, 0.0) / units
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(f'SELECT samples FROM {self.TABLE} WHERE route = ?', (route,)).fetchone()
+            samples = row['samples'] if row is not None else 0
+            # 前几个样本权重更大，尽快摆脱先验
+            alpha = max(EWMA_ALPHA, 1.0 / (samples + 2))
+            updated = (1 - alpha) * seconds_per_unit + alpha * observed
+            conn.execute(
+                f'INSERT INTO {self.TABLE} (route, overhead, seconds_per_unit, samples, updated_at) '
+                'VALUES (?, ?, ?, ?, ?) ON CONFLICT(route) DO UPDATE SET '
+                'seconds_per_unit = excluded.seconds_per_unit, samples = excluded.samples, '
+                'updated_at = excluded.updated_at',
+                (route, overhead, updated, samples + 1, time.time())
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        logger.debug("%s 路线 %s 每单位: %.3f -> %.3f", self.TABLE, route, seconds_per_unit, updated)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """当前学习到的各路线参数"""
+        rows = self._conn().execute(f'SELECT * FROM {self.TABLE} ORDER BY route').fetchall()
+        return [dict(row) for row in rows]
+
+
+class JobScheduler:
+    """
+    预计耗时短作业优先 + 老化 + 按客户端公平分配
+
+    得分 = 预计耗时 + 公平权重 × 该客户端运行中和排队中的预计耗时 - 老化速率 × 已等待秒数，得分低者先执行。
+    积压越多的客户端让位越多，其它客户端的短任务不必等它的队列排空。
+    """
+
+    def __init__(self, aging_rate: float, fair_share_weight: float):
+        """
+        Args:
+            aging_rate: 每等待 1 秒抵扣的预计耗时秒数
+            fair_share_weight: 客户端运行中和排队中预计耗时的权重
+        """
+        self.aging_rate = aging_rate
+        self.fair_share_weight = fair_share_weight
+
+    def score(self, job: Dict[str, Any], client_load: Dict[str, float], now: float) -> float:
+        cost = job.get('estimated_cost') or 0.0
+        waited = max(now - job['created_at'], 0.0)
+        load = client_load.get(job.get('client_id') or '', 0.0)
+        return cost + self.fair_share_weight * load - self.aging_rate * waited
+
+    def order(self, jobs: List[Dict[str, Any]], client_load: Dict[str, float],
+              now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """按调度优先级排序排队任务"""
+        now = now or time.time()
+        return sorted(jobs, key=lambda job: (self.score(job, client_load, now), job['created_at']))
+
+
+# 全局实例
+_cost_model: Optional[CostModel] = None
+_cost_model_lock = threading.Lock()
+
+
+def get_cost_model() -> CostModel:
+    """获取耗时模型实例"""
+    global _cost_model
+    if _cost_model is None:
+        with _cost_model_lock:
+            if _cost_model is None:
+                from config import Config
+                _cost_model = CostModel(Config.JOB_DB_PATH)
+    return _cost_model
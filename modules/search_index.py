@@ -0,0 +1,345 @@
+"""
+全文检索模块
+把成功转换的文档文本、章节和表格写入本地 SQLite FTS5 索引，按内容哈希增量更新
+
+FTS5 自带的 unicode61 分词器把连续的中日韩文字当作一个词，无法检索其中的片段。
+写入和查询前先把 CJK 连续文字切成重叠的二元组（"全文检索" -> "全文 文检 检索"），
+查询词按同样方式切分后作为短语匹配，任意长度（≥2字）的中文片段都能命中。
+"""
+
+import os
+import re
+import json
+import html
+import time
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .markdown_processor import extract_document_structure, extract_markdown_tables
+from .light_converters import file_encoding
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    content_hash TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    export_format TEXT,
+    job_id TEXT,
+    passages INTEGER NOT NULL DEFAULT 0,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS passages (
+    id INTEGER PRIMARY KEY,
+    doc_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    section TEXT NOT NULL,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_passages_doc ON passages (doc_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS passages_fts USING fts5(
+    section, body, content='', tokenize='unicode61 remove_diacritics 2'
+);
+"""
+
+# 转换结果是文本时直接索引结果；输入本身是文本时索引输入
+INDEXABLE_FORMATS = ('MARKDOWN', 'TEXT', 'JSONL')
+TEXT_INPUTS = ('md', 'txt')
+
+# 段落类型
+KIND_TEXT = 'text'
+KIND_SECTION = 'section'
+KIND_TABLE = 'table'
+
+PASSAGE_CHARS = 2000  # 单条索引段落的最大字符数，超长章节按行切开
+SNIPPET_CHARS = 120  # 摘要长度
+SECTION_WEIGHT = 2.0  # 章节标题命中的权重（正文为1）
+
+_CJK_RUN = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]+')
+_TOKEN = re.compile(r'\w+')
+
+
+def _is_heading(line: str) -> bool:
+    """与 extract_document_structure 相同的标题判断"""
+    return line.startswith('#') or (line.startswith('**') and line.endswith('**'))
+
+
+def segment(text: str) -> str:
+    """把 CJK 连续文字切成重叠的二元组并以空格分隔，其余文字保持原样交给 unicode61 分词"""
+    def bigrams(match: re.Match) -> str:
+        run = match.group(0)
+        if len(run) == 1:
+            return f' {run} '
+        return ' ' + ' '.join(run[i:i + 2] for i in range(len(run) - 1)) + ' '
+    return _CJK_RUN.sub(bigrams, text)
+
+
+def build_query(query: str) -> Tuple[str, List[str]]:
+    """
+    把用户输入转换为 FTS5 查询：空格分隔的词全部需要命中，每个词按二元组作为短语匹配
+
+    Returns:
+        Tuple[FTS5 查询串, 用于生成摘要的原始词]，没有可检索的词时查询串为空
+    """
+    phrases, terms = [], []
+    for term in query.split():
+        tokens = _TOKEN.findall(segment(term))
+        if not tokens:
+            continue
+        terms.append(term)
+        if len(tokens) == 1 and len(tokens[0]) == 1 and _CJK_RUN.fullmatch(tokens[0]):
+            # 单个汉字：匹配以它开头的二元组
+            phrases.append(f'{tokens[0]}*')
+        else:
+            phrases.append('"' + ' '.join(tokens) + '"')
+    return ' '.join(phrases), terms
+
+
+def make_snippet(text: str, terms: List[str], width: int = SNIPPET_CHARS) -> str:
+    """截取第一个命中词附近的文字，命中词用 <mark> 标出（其余内容已做 HTML 转义）"""
+    lowered = text.lower()
+    positions = [lowered.find(term.lower()) for term in terms]
+    positions = [position for position in positions if position >= 0]
+    start = max(min(positions) - width // 3, 0) if positions else 0
+    excerpt = text[start:start + width].replace('\n', ' ')
+    escaped = html.escape(excerpt)
+    for term in sorted(set(terms), key=len, reverse=True):
+        escaped = re.sub(re.escape(html.escape(term)), lambda m: f'<mark>{m.group(0)}</mark>', escaped,
+                         flags=re.IGNORECASE)
+    prefix = '…' if start > 0 else ''
+    suffix = '…' if start + width < len(text) else ''
+    return prefix + escaped + suffix
+
+
+def _split_long(body: str) -> Iterable[str]:
+    """按行把超长内容切成不超过 PASSAGE_CHARS 的段落"""
+    if len(body) <= PASSAGE_CHARS:
+        yield body
+        return
+    buffer, length = [], 0
+    for line in body.split('\n'):
+        while len(line) > PASSAGE_CHARS:
+            yield line[:PASSAGE_CHARS]
+            line = line[PASSAGE_CHARS:]
+        if buffer and length + len(line) > PASSAGE_CHARS:
+            yield '\n'.join(buffer)
+            buffer, length = [], 0
+        buffer.append(line)
+        length += len(line) + 1
+    if buffer:
+        yield '\n'.join(buffer)
+
+
+def markdown_passages(content: str) -> List[Tuple[str, str, str]]:
+    """
+    把 Markdown/纯文本拆成索引段落：首个标题之前的正文、各章节（extract_document_structure）和表格
+
+    Returns:
+        List[Tuple[类型, 章节名, 内容]]
+    """
+    lines = content.split('\n')
+    preamble = []
+    for line in lines:
+        line = line.strip()
+        if _is_heading(line):
+            break
+        if line and not line.startswith('|'):
+            preamble.append(line)
+
+    passages = [(KIND_TEXT, '', body) for body in _split_long('\n'.join(preamble)) if body]
+    for section in extract_document_structure(lines):
+        passages += [(KIND_SECTION, section['章节'], body) for body in _split_long(section['内容'])]
+    for table in extract_markdown_tables(content):
+        header = ' | '.join(str(column) for column in table.columns)
+        rows = '\n'.join(' | '.join(str(cell) for cell in row) for row in table.itertuples(index=False))
+        passages += [(KIND_TABLE, header, body) for body in _split_long(rows)]
+    return passages
+
+
+def jsonl_passages(path: str) -> List[Tuple[str, str, str]]:
+    """把 JSONL 分块导出的每个块作为一个段落，章节名取标题路径"""
+    passages = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            chunk = json.loads(line)
+            kind = KIND_TABLE if chunk.get('type') == 'table' else KIND_SECTION
+            passages.append((kind, ' > '.join(chunk.get('heading_path') or []), chunk.get('text', '')))
+    return passages
+
+
+class SearchIndex:
+    """转换结果全文索引"""
+
+    def __init__(self, db_path: str):
+        """
+        Args:
+            db_path: SQLite 数据库文件路径
+        """
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._local = threading.local()
+        self._pid = os.getpid()
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        """每个线程一个连接（sqlite3 连接不可跨线程、跨 fork 共享）"""
+        if self._pid != os.getpid():
+            self._local = threading.local()
+            self._pid = os.getpid()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA busy_timeout=30000')
+            self._local.conn = conn
+        return conn
+
+    def contains(self, content_hash: str) -> bool:
+        row = self._conn().execute('SELECT 1 FROM documents WHERE content_hash = ?', (content_hash,)).fetchone()
+        return row is not None
+
+    def add(self, content_hash: str, name: str, passages: List[Tuple[str, str, str]],
+            export_format: Optional[str] = None, job_id: Optional[str] = None) -> bool:
+        """
+        在一个事务中写入文档及其段落
+
+        Returns:
+            bool: 是否新写入（相同内容哈希已存在时跳过）
+        """
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if conn.execute('SELECT 1 FROM documents WHERE content_hash = ?', (content_hash,)).fetchone():
+                conn.execute('ROLLBACK')
+                return False
+            doc_id = conn.execute(
+                'INSERT INTO documents (content_hash, name, export_format, job_id, passages, indexed_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (content_hash, name, export_format, job_id, len(passages), time.time())
+            ).lastrowid
+            for kind, section, body in passages:
+                passage_id = conn.execute(
+                    'INSERT INTO passages (doc_id, kind, section, body) VALUES (?, ?, ?, ?)',
+                    (doc_id, kind, section, body)
+                ).lastrowid
+                conn.execute('INSERT INTO passages_fts (rowid, section, body) VALUES (?, ?, ?)',
+                             (passage_id, segment(section), segment(body)))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return True
+
+    def index_conversion(self, content_hash: str, name: str, input_path: str, output_path: str,
+                         export_format: str, job_id: Optional[str] = None) -> bool:
+        """
+        索引一次成功的转换：文本类结果索引结果，文本类输入索引输入，其它转换跳过
+
+        Args:
+            content_hash: 输入文件 SHA-256
+            name: 原始文件名
+            input_path: 输入文件路径
+            output_path: 转换结果路径
+            export_format: 导出格式
+            job_id: 任务ID
+
+        Returns:
+            bool: 是否新写入
+        """
+        if self.contains(content_hash):
+            logger.debug("全文索引已包含该内容，跳过: %s", name)
+            return False
+        started = time.perf_counter()
+        if export_format == 'JSONL':
+            passages = jsonl_passages(output_path)
+        elif export_format in INDEXABLE_FORMATS:
+            with open(output_path, encoding='utf-8', errors='replace') as f:
+                passages = markdown_passages(f.read())
+        elif input_path.rsplit('.', 1)[-1].lower() in TEXT_INPUTS:
+            with open(input_path, encoding=file_encoding(input_path), errors='replace') as f:
+                passages = markdown_passages(f.read())
+        else:
+            return False
+        if not passages or not self.add(content_hash, name, passages, export_format, job_id):
+            return False
+        logger.info(f"🔎 已加入全文索引: {name} ({len(passages)} 段, {(time.perf_counter() - started) * 1000:.0f}ms)")
+        return True
+
+    def search(self, query: str, limit: int = 20, snippets: int = 3) -> List[Dict[str, Any]]:
+        """
+        检索文档，按最佳段落的 BM25 得分排序
+
+        Args:
+            query: 空格分隔的检索词（全部需要命中同一段落）
+            limit: 最多返回的文档数
+            snippets: 每个文档最多返回的摘要数
+
+        Returns:
+            List[dict]: 文档信息和命中段落的摘要
+        """
+        fts_query, terms = build_query(query)
+        if not fts_query:
+            return []
+        rows = self._conn().execute(
+            'SELECT p.doc_id, p.kind, p.section, p.body, bm25(passages_fts, ?, 1.0) AS score '
+            'FROM passages_fts JOIN passages p ON p.id = passages_fts.rowid '
+            'WHERE passages_fts MATCH ? ORDER BY score LIMIT ?',
+            (SECTION_WEIGHT, fts_query, limit * snippets * 4)
+        ).fetchall()
+
+        results: Dict[int, Dict[str, Any]] = {}
+        for row in rows:
+            hit = results.get(row['doc_id'])
+            if hit is None:
+                if len(results) >= limit:
+                    continue
+                hit = results[row['doc_id']] = {'score': -row['score'], 'matches': []}
+            if len(hit['matches']) < snippets:
+                hit['matches'].append({
+                    'kind': row['kind'],
+                    'section': row['section'],
+                    'snippet': make_snippet(row['body'], terms),
+                })
+        if not results:
+            return []
+
+        placeholders = ','.join('?' * len(results))
+        documents = self._conn().execute(
+            f'SELECT id, content_hash, name, export_format, job_id, indexed_at FROM documents '
+            f'WHERE id IN ({placeholders})', list(results)
+        ).fetchall()
+        for document in documents:
+            results[document['id']].update({key: document[key] for key in document.keys() if key != 'id'})
+        return sorted(results.values(), key=lambda hit: hit['score'], reverse=True)
+
+    def stats(self) -> Dict[str, int]:
+        conn = self._conn()
+        return {
+            'documents': conn.execute('SELECT COUNT(*) FROM documents').fetchone()[0],
+            'passages': conn.execute('SELECT COUNT(*) FROM passages').fetchone()[0],
+        }
+
+
+# 全局实例
+_search_index: Optional[SearchIndex] = None
+_search_index_lock = threading.Lock()
+
+
+def get_search_index() -> Optional[SearchIndex]:
+    """获取全文索引实例；未开启时返回 None"""
+    global _search_index
+    from config import Config
+    if not Config.SEARCH_INDEX_ENABLED:
+        return None
+    if _search_index is None:
+        with _search_index_lock:
+            if _search_index is None:
+                _search_index = SearchIndex(Config.SEARCH_INDEX_PATH)
+    return _search_index
@@ -0,0 +1,306 @@
+"""
+电子表格流式读取模块
+逐个工作表、逐行读取 xlsx（openpyxl 只读模式）、xls（xlrd）和 csv，并增量写出 Markdown / 文本 / CSV / XLSX，
+内存占用与行数无关；合并单元格的值会填充到整个合并区域
+"""
+
+import re
+import csv
+import zipfile
+import logging
+import datetime
+import posixpath
+import xml.etree.ElementTree as ET
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+from .light_converters import file_encoding, read_sample
+
+logger = logging.getLogger(__name__)
+
+# 尝试导入openpyxl（xlsx 读取和写出）
+try:
+    import openpyxl
+    from openpyxl.utils.cell import range_boundaries
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+
+# 尝试导入xlrd（旧版 .xls）
+try:
+    import xlrd
+    XLRD_AVAILABLE = True
+except ImportError:
+    XLRD_AVAILABLE = False
+
+SPREADSHEET_EXTENSIONS = ('xlsx', 'xls', 'csv')
+SPREADSHEET_EXPORT_FORMATS = ('MARKDOWN', 'TEXT', 'CSV', 'XLSX')
+
+_NS_MAIN = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_NS_REL = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_NS_PKG_REL = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+# 合并区域：(首行, 首列, 末行, 末列)，均从1开始
+MergedRange = Tuple[int, int, int, int]
+
+
+def format_cell(value: Any) -> str:
+    """单元格值转为文本：整数值的浮点数去掉小数点，零点的日期时间只保留日期"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, datetime.datetime):
+        return value.date().isoformat() if value.time() == datetime.time(0) else value.isoformat(sep=' ')
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+
+class MergedCellFiller:
+    """按行填充合并单元格：记住每个合并区域左上角的值，写到区域内其它单元格"""
+
+    def __init__(self, ranges: Sequence[MergedRange]):
+        # 按首行排序，读到首行时才开始跟踪该区域
+        self._pending = sorted(ranges)
+        self._next = 0
+        self._active: List[Tuple[MergedRange, Any]] = []
+
+    def fill(self, row_no: int, row: List[Any]) -> List[Any]:
+        """row_no 从1开始；返回填充后的行"""
+        while self._next < len(self._pending) and self._pending[self._next][0] <= row_no:
+            merged = self._pending[self._next]
+            self._next += 1
+            if merged[0] < row_no:
+                # 首行没有被读到（读取器跳过了该行）
+                continue
+            min_col = merged[1]
+            value = row[min_col - 1] if min_col - 1 < len(row) else None
+            self._active.append((merged, value))
+        if not self._active:
+            return row
+        still_active = []
+        for merged, value in self._active:
+            min_row, min_col, max_row, max_col = merged
+            if row_no > max_row:
+                continue
+            still_active.append((merged, value))
+            if len(row) < max_col:
+                row = list(row) + [None] * (max_col - len(row))
+            for col in range(min_col, max_col + 1):
+                row[col - 1] = value
+        self._active = still_active
+        return row
+
+
+def _xlsx_sheet_paths(archive: zipfile.ZipFile) -> Dict[str, str]:
+    """工作表名称 -> 压缩包内的 XML 路径"""
+    workbook = ET.fromstring(archive.read('xl/workbook.xml'))
+    rels = ET.fromstring(archive.read('xl/_rels/workbook.xml.rels'))
+    targets = {rel.get('Id'): rel.get('Target') for rel in rels.iter(f'{_NS_PKG_REL}Relationship')}
+    paths = {}
+    for sheet in workbook.iter(f'{_NS_MAIN}sheet'):
+        target = targets.get(sheet.get(f'{_NS_REL}id'))
+        if target:
+            paths[sheet.get('name')] = target.lstrip('/') if target.startswith('/') \
+                else posixpath.normpath(posixpath.join('xl', target))
+    return paths
+
+
+def xlsx_merged_ranges(path: str) -> Dict[str, List[MergedRange]]:
+    """
+    用 iterparse 流式扫描每个工作表的 <mergeCell>（只读模式的 openpyxl 不提供合并信息）
+
+    Returns:
+        dict: 工作表名称 -> 合并区域列表
+    """
+    result: Dict[str, List[MergedRange]] = {}
+    with zipfile.ZipFile(path) as archive:
+        for name, sheet_path in _xlsx_sheet_paths(archive).items():
+            ranges = []
+            with archive.open(sheet_path) as f:
+                for _, element in ET.iterparse(f, events=('end',)):
+                    if element.tag == f'{_NS_MAIN}mergeCell':
+                        min_col, min_row, max_col, max_row = range_boundaries(element.get('ref'))
+                        ranges.append((min_row, min_col, max_row, max_col))
+                    # 逐个元素释放，内存与行数无关
+                    element.clear()
+            if ranges:
+                result[name] = ranges
+    return result
+
+
+def _iter_xlsx(path: str) -> Iterator[Tuple[str, Iterator[List[Any]]]]:
+    if not OPENPYXL_AVAILABLE:
+        raise Exception("openpyxl 未安装，无法读取 xlsx")
+    merged = xlsx_merged_ranges(path)
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            def rows(sheet=sheet, filler=MergedCellFiller(merged.get(sheet.title, []))):
+                for row_no, row in enumerate(sheet.iter_rows(values_only=True), start=1):
+                    yield filler.fill(row_no, list(row))
+            yield sheet.title, rows()
+    finally:
+        workbook.close()
+
+
+def _iter_xls(path: str) -> Iterator[Tuple[str, Iterator[List[Any]]]]:
+    if not XLRD_AVAILABLE:
+        raise Exception("xlrd 未安装，无法读取 xls（pip install xlrd）")
+    # formatting_info 才会解析合并单元格；on_demand 按需加载工作表并在读完后释放
+    book = xlrd.open_workbook(path, on_demand=True, formatting_info=True)
+    try:
+        for index in range(book.nsheets):
+            sheet = book.sheet_by_index(index)
+            ranges = [(rlo + 1, clo + 1, rhi, chi) for rlo, rhi, clo, chi in sheet.merged_cells]
+
+            def rows(sheet=sheet, filler=MergedCellFiller(ranges)):
+                for row_index in range(sheet.nrows):
+                    values = []
+                    for cell in sheet.row(row_index):
+                        if cell.ctype == xlrd.XL_CELL_DATE:
+                            values.append(xlrd.xldate.xldate_as_datetime(cell.value, book.datemode))
+                        elif cell.ctype == xlrd.XL_CELL_BOOLEAN:
+                            values.append(bool(cell.value))
+                        elif cell.ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK, xlrd.XL_CELL_ERROR):
+                            values.append(None)
+                        else:
+                            values.append(cell.value)
+                    yield filler.fill(row_index + 1, values)
+
+            yield sheet.name, rows()
+            book.unload_sheet(index)
+    finally:
+        book.release_resources()
+
+
+def _iter_csv(path: str) -> Iterator[Tuple[str, Iterator[List[Any]]]]:
+    encoding = file_encoding(path)
+    sample, _ = read_sample(path)
+    try:
+        dialect = csv.Sniffer().sniff(sample[:8192].decode(encoding, errors='ignore'), delimiters=',;\t|')
+    except csv.Error:
+        dialect = csv.excel
+
+    def rows():
+        with open(path, 'r', encoding=encoding, errors='replace', newline='') as f:
+            for row in csv.reader(f, dialect):
+                yield row
+
+    yield path.rsplit('/', 1)[-1].rsplit('.', 1)[0], rows()
+
+
+def iter_sheets(path: str) -> Iterator[Tuple[str, Iterator[List[Any]]]]:
+    """
+    逐个工作表流式读取
+
+    Yields:
+        tuple: (工作表名称, 行迭代器)；每行是单元格值列表，合并区域已填充
+    """
+    ext = path.rsplit('.', 1)[-1].lower()
+    if ext == 'xlsx':
+        return _iter_xlsx(path)
+    if ext == 'xls':
+        return _iter_xls(path)
+    if ext == 'csv':
+        return _iter_csv(path)
+    raise ValueError(f"不支持的电子表格格式: {ext}")
+
+
+def _trim(cells: List[str]) -> List[str]:
+    """去掉行尾的空单元格"""
+    end = len(cells)
+    while end and not cells[end - 1]:
+        end -= 1
+    return cells[:end]
+
+
+def _markdown_cell(text: str) -> str:
+    return text.replace('|', '\\|').replace('\r\n', '<br>').replace('\n', '<br>')
+
+
+def _write_markdown_sheet(out, name: str, rows: Iterator[List[Any]], first: bool) -> int:
+    """一个工作表写为 GFM 表格：首个非空行作为表头，之后的行按表头列数对齐"""
+    width = 0
+    count = 0
+    for row in rows:
+        cells = _trim([format_cell(value) for value in row])
+        if not cells:
+            continue
+        if width == 0:
+            width = len(cells)
+            out.write(('' if first else '\n') + f"## {name}\n\n")
+            out.write('| ' + ' | '.join(_markdown_cell(cell) for cell in cells) + ' |\n')
+            out.write('|' + '---|' * width + '\n')
+        else:
+            # 比表头宽的行保留全部单元格（渲染器会忽略多出的列，但内容不丢失）
+            cells += [''] * (width - len(cells))
+            out.write('| ' + ' | '.join(_markdown_cell(cell) for cell in cells) + ' |\n')
+        count += 1
+    return count
+
+
+def _write_text_sheet(out, name: str, rows: Iterator[List[Any]], first: bool) -> int:
+    count = 0
+    for row in rows:
+        cells = _trim([format_cell(value) for value in row])
+        if not cells:
+            continue
+        if count == 0:
+            out.write(('' if first else '\n') + f"{name}\n")
+        out.write('\t'.join(cell.replace('\t', ' ').replace('\n', ' ') for cell in cells) + '\n')
+        count += 1
+    return count
+
+
+def convert_spreadsheet(input_path: str, output_path: str, export_format: str) -> None:
+    """
+    流式转换电子表格
+
+    Args:
+        input_path: xlsx / xls / csv 文件路径
+        output_path: 输出文件路径
+        export_format: MARKDOWN、TEXT、CSV（多个工作表依次写出，工作表之间以空行和表名行分隔）或 XLSX
+    """
+    export_format = export_format.upper()
+    if export_format not in SPREADSHEET_EXPORT_FORMATS:
+        raise ValueError(f"电子表格不支持导出为 {export_format}")
+    logger.info(f"流式电子表格转换: {input_path} -> {output_path} ({export_format})")
+
+    total_rows = 0
+    sheets = 0
+    if export_format == 'XLSX':
+        if not OPENPYXL_AVAILABLE:
+            raise Exception("openpyxl 未安装，无法写出 xlsx")
+        # write_only 模式逐行写出，不在内存中保留单元格对象
+        workbook = openpyxl.Workbook(write_only=True)
+        for name, rows in iter_sheets(input_path):
+            # 工作表名最长31个字符且不能包含 \ / * ? : [ ]
+            title = re.sub(r'[\\/*?:\[\]]', '_', name)[:31] or f"Sheet{sheets + 1}"
+            sheet = workbook.create_sheet(title=title)
+            for row in rows:
+                sheet.append(row)
+                total_rows += 1
+            sheets += 1
+        workbook.save(output_path)
+    else:
+        with open(output_path, 'w', encoding='utf-8', newline='' if export_format == 'CSV' else None) as out:
+            if export_format == 'CSV':
+                writer = csv.writer(out)
+                for name, rows in iter_sheets(input_path):
+                    if sheets:
+                        writer.writerow([])
+                        writer.writerow([f"# {name}"])
+                    for row in rows:
+                        writer.writerow([format_cell(value) for value in row])
+                        total_rows += 1
+                    sheets += 1
+            else:
+                write_sheet = _write_markdown_sheet if export_format == 'MARKDOWN' else _write_text_sheet
+                for name, rows in iter_sheets(input_path):
+                    total_rows += write_sheet(out, name, rows, first=total_rows == 0)
+                    sheets += 1
+    logger.info(f"电子表格转换完成: {sheets} 个工作表, {total_rows} 行")
+
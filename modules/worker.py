@@ -0,0 +1,86 @@
+"""
+独立转换 worker
+从共享任务队列领取本机能力可执行的任务，结果写入共享文件存储；可在多台机器上同时运行
+
+用法:
+    python -m modules.worker                                  # 自动检测能力
+    python -m modules.worker --concurrency 4
+    python -m modules.worker --capabilities docling,ocr       # 只承担 OCR 类任务
+
+多机部署时各节点需指向同一个任务库和文件存储（JOB_DB_PATH / ARTIFACT_ROOT 放在共享目录，
+或通过 JOB_QUEUE / ARTIFACT_STORE 指定其它实现）。
+"""
+
+import os
+import sys
+import signal
+import logging
+import argparse
+
+# 与 app.py 一致：导入转换模块前设置离线模式
+os.environ['HF_HUB_OFFLINE'] = '1'
+os.environ['TRANSFORMERS_OFFLINE'] = '1'
+os.environ['HF_DATASETS_OFFLINE'] = '1'
+os.environ['HF_HUB_DISABLE_IMPLICIT_TOKEN'] = '1'
+
+from config import Config
+from modules.logging_setup import setup_logging
+
+logger = logging.getLogger('modules.worker')
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="文档转换 worker")
+    parser.add_argument('--concurrency', type=int, default=max(Config.JOB_WORKERS, 1), help="并发转换线程数")
+    parser.add_argument('--capabilities', default=Config.WORKER_CAPABILITIES,
+                        help="逗号分隔的能力列表，auto 表示自动检测")
+    parser.add_argument('--poll-interval', type=float, default=Config.WORKER_POLL_INTERVAL,
+                        help="队列为空时的轮询间隔（秒）")
+    parser.add_argument('--worker-id', help="worker 标识（默认 主机名:进程号）")
+    args = parser.parse_args()
+
+    setup_logging(Config)
+
+    from modules.capabilities import parse_capabilities
+    from modules.job_store import get_job_store
+    from modules.artifact_store import get_artifact_store
+    from modules.job_runner import JobRunner, create_scheduler
+    from modules.scheduler import get_cost_model
+    from modules.admission import create_admission_controller
+
+    try:
+        capabilities = parse_capabilities(args.capabilities)
+    except ValueError as e:
+        logger.error(str(e))
+        return 2
+    if not capabilities:
+        logger.error("本机没有可用的转换能力，worker 不启动")
+        return 1
+
+    runner = JobRunner(get_job_store(), get_artifact_store(), args.concurrency, capabilities,
+                       worker_id=args.worker_id, scheduler=create_scheduler(), cost_model=get_cost_model(),
+                       admission=create_admission_controller())
+
+    def handle_signal(signum, frame):
+        logger.info(f"收到信号 {signum}，停止领取新任务，等待进行中的任务完成…")
+        runner.stop()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    from modules.docling_service import warm_up_ocr
+    warm_up_ocr(Config.OCR_WARMUP)
+    from modules.pdf_renderer import warm_up_pdf_renderer
+    warm_up_pdf_renderer(Config.PDF_RENDERER_WARMUP)
+
+    runner.start(dispatch=False)
+    logger.info(f"🐑 转换 worker 已启动: {runner.worker_id}")
+    runner.serve_forever(args.poll_interval)
+    # 已领取的任务执行完再退出（未完成的会在心跳超时后被其它 worker 重试）
+    runner.shutdown(wait=True)
+    logger.info("worker 已退出")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""
+管理路由模块
+提供转换分析文件等运维接口，需要管理令牌
+"""
+
+import os
+import re
+import hmac
+import logging
+from functools import wraps
+from flask import Blueprint, request, jsonify, send_file, abort
+from config import Config
+from modules.profiler import list_profiles
+
+logger = logging.getLogger(__name__)
+
+# 创建蓝图
+admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
+
+JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+def is_admin_request() -> bool:
+    """当前请求是否带有有效的 X-Admin-Token（未配置令牌时始终为否）"""
+    if not Config.ADMIN_TOKEN:
+        return False
+    return hmac.compare_digest(request.headers.get('X-Admin-Token', ''), Config.ADMIN_TOKEN)
+
+
+def require_admin(view):
+    """校验 X-Admin-Token 请求头；未配置令牌时管理接口整体关闭"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not Config.ADMIN_TOKEN:
+            abort(404)
+        if not is_admin_request():
+            logger.warning(f"管理接口鉴权失败: {request.remote_addr}")
+            return jsonify({'error': 'Unauthorized'}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@admin_bp.route('/profiles')
+@require_admin
+def profiles():
+    """列出已保存的转换分析"""
+    return jsonify({'profiles': list_profiles(Config.PROFILE_FOLDER)})
+
+
+@admin_bp.route('/profiles/<job_id>')
+@require_admin
+def profile(job_id):
+    """下载折叠栈格式的分析文件（可直接用于 flamegraph.pl / speedscope）"""
+    if not JOB_ID_PATTERN.match(job_id):
+        return jsonify({'error': 'Invalid job id'}), 400
+    path = os.path.abspath(os.path.join(Config.PROFILE_FOLDER, f"{job_id}.folded"))
+    if not os.path.exists(path):
+        return jsonify({'error': 'Profile not found'}), 404
+    return send_file(path, mimetype='text/plain', as_attachment=True, download_name=f"{job_id}.folded")
@@ -4,18 +4,37 @@
 """
 
 import os
-import io
+import time
+import uuid
+import zlib
 import logging
-from flask import Blueprint, request, jsonify, send_file, current_app
+from urllib.parse import quote
+from flask import Blueprint, Response, request, jsonify, send_file, stream_with_context, url_for
 from config import Config
-from modules.document_converter import get_document_converter
 from modules.docling_service import is_docling_available
+from modules.profiler import should_profile
+from modules.logging_setup import log_context
+from modules.job_store import get_job_store, STATE_SUCCEEDED, STATE_FAILED
+from modules.job_runner import (get_job_runner, enqueue_conversion, UnroutableJobError,
+                                STREAMED_FORMATS)
+from modules.artifact_store import get_artifact_store
+from modules.ocr_profiles import OCR_PROFILES, PROFILE_AUTO
+from modules.pdf_renderer import PDF_ENGINES
+from modules.preview import PREVIEW_FIRST, PREVIEW_MODES, is_previewable, plan_preview, write_preview_pdf
+from routes.admin_routes import is_admin_request
 
 logger = logging.getLogger(__name__)
 
 # 创建蓝图
 convert_bp = Blueprint('convert', __name__)
 
+# 预览结果直接内联返回的文本格式
+PREVIEW_INLINE_FORMATS = ('MARKDOWN', 'TEXT', 'CSV', 'JSONL')
+
+# 下载时可按 gzip 传输的文本结果扩展名
+GZIP_EXTENSIONS = ('md', 'txt', 'csv', 'jsonl')
+GZIP_CHUNK_BYTES = 64 * 1024
+
 @convert_bp.route('/check_server')
 def check_server():
     """检查服务状态"""
@@ -23,7 +42,8 @@ def check_server():
         # 检查 Docling 服务是否可用
         docling_status = is_docling_available()
         
-        logger.info(f"服务状态检查 - Docling: {'可用' if docling_status else '不可用'}")
+        # 前端每30秒轮询一次，降为DEBUG并惰性格式化
+        logger.debug("服务状态检查 - Docling: %s", '可用' if docling_status else '不可用')
         return jsonify({'status': True, 'docling_available': docling_status})
     except Exception as e:
         logger.error(f"检查服务状态失败: {e}")
@@ -31,13 +51,20 @@ def check_server():
 
 @convert_bp.route('/convert', methods=['POST'])
 def convert():
-    """处理文件转换请求"""
+    """
+    处理文件转换请求
+
+    上传文件写入任务目录并登记到任务表，由任务执行器转换。
+    表单字段 async=true 时立即返回 202 和任务地址；否则等待转换完成后直接返回文件。
+    表单字段 preview=<页数>（或 true）时只转换 PDF 的部分页面，返回预览结果和整本转换的预计耗时。
+    """
     if 'file' not in request.files:
         logger.error("请求中没有文件部分")
         return jsonify({'error': 'No file part'}), 400
     
     file = request.files['file']
     export_format = request.form.get('export_format', 'MARKDOWN').upper()
+    run_async = request.form.get('async', '').lower() in ('1', 'true', 'yes')
 
     if file.filename == '':
         logger.error("没有选择文件")
@@ -47,89 +74,292 @@ def convert():
         logger.error(f"文件类型不允许: {file.filename}")
         return jsonify({'error': 'File type not allowed'}), 400
 
+    ocr_profile = request.form.get('ocr_profile', '').lower() or None
+    if ocr_profile and ocr_profile not in OCR_PROFILES and ocr_profile != PROFILE_AUTO:
+        return jsonify({'error': f'Unknown OCR profile: {ocr_profile}'}), 400
+
+    pdf_engine = request.form.get('pdf_engine', '').lower() or None
+    if pdf_engine and pdf_engine not in PDF_ENGINES:
+        return jsonify({'error': f'Unknown PDF engine: {pdf_engine}'}), 400
+
+    chunk_options = {}
+    for field in ('chunk_size', 'chunk_overlap'):
+        value = request.form.get(field, '')
+        if value:
+            if not value.isdigit() or (field == 'chunk_size' and int(value) == 0):
+                return jsonify({'error': f'Invalid {field}: {value}'}), 400
+            chunk_options[field] = int(value)
+
+    preview = request.form.get('preview', '').lower()
+    preview_pages = None
+    if preview and preview not in ('0', 'false', 'no'):
+        if preview in ('true', 'yes'):
+            preview_pages = Config.PREVIEW_DEFAULT_PAGES
+        elif preview.isdigit():
+            preview_pages = min(int(preview), Config.PREVIEW_MAX_PAGES)
+        else:
+            return jsonify({'error': f'Invalid preview: {preview}'}), 400
+    preview_mode = request.form.get('preview_mode', PREVIEW_FIRST).lower()
+    if preview_mode not in PREVIEW_MODES:
+        return jsonify({'error': f'Unknown preview mode: {preview_mode}'}), 400
+
     filename = file.filename
-    input_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-    output_path = None
+    job_id = uuid.uuid4().hex
+    file_extension = filename.rsplit('.', 1)[1].lower()
+    # 原始文件名只用于下载名（存储时另行清理）
+    input_name = f"{filename.rsplit('.', 1)[0]}.{file_extension}"
+    upload_path = os.path.join(Config.UPLOAD_FOLDER, f"{job_id}.{file_extension}")
+    artifacts = get_artifact_store()
 
     try:
         # 保存上传的文件
-        file.save(input_path)
-        logger.info(f"文件已保存到: {input_path}")
-        logger.debug(f"上传文件大小: {os.path.getsize(input_path)} bytes")
-
-        # 生成输出文件路径
-        file_extension = filename.rsplit('.', 1)[1].lower()
-        output_filename_base = filename.rsplit('.', 1)[0]
-        logger.debug(f"输入文件扩展名: {file_extension}, 基础文件名: {output_filename_base}")
-        
-        # 清理文件名：处理过长和特殊字符
-        def clean_filename(name):
-            # 替换可能有问题的字符
-            import re
-            name = re.sub(r'[、。，；：""''（）【】《》？！]', '_', name)
-            name = re.sub(r'[^\w\-_\u4e00-\u9fff]', '_', name)  # 保留中文、英文、数字、下划线、连字符
-            # 限制长度
-            if len(name) > 50:
-                name = name[:50]
-            return name
-        
-        clean_base = clean_filename(output_filename_base)
-        logger.debug(f"清理后的基础文件名: {clean_base}")
-        
-        output_ext = export_format.lower()
-        if output_ext == 'markdown': 
-            output_ext = 'md'
-        elif output_ext == 'xlsx':
-            output_ext = 'xlsx'
-        
-        output_filename = f"{clean_base}.{output_ext}"
-        output_path = os.path.join(current_app.config['OUTPUT_FOLDER'], output_filename)
-        logger.debug(f"最终输出路径: {output_path}")
+        file.save(upload_path)
+        input_size = os.path.getsize(upload_path)
+        logger.info(f"文件已保存到: {upload_path}")
+        logger.debug("上传文件大小: %s bytes", input_size)
 
-        # 使用统一的文档转换器
-        converter = get_document_converter()
-        converter.convert_document(input_path, output_path, export_format)
-        
-        # 验证输出文件是否真的存在
-        if not os.path.exists(output_path):
-            logger.error(f"❌ 转换器声称成功，但输出文件不存在: {output_path}")
-            raise Exception(f"转换失败：输出文件未生成。可能是文件名过长或包含特殊字符导致的问题。")
-        
-        if os.path.getsize(output_path) == 0:
-            logger.error(f"❌ 输出文件存在但为空: {output_path}")
-            raise Exception("转换失败：生成的文件为空")
-        
-        logger.info(f"✅ 转换成功: {output_path} (大小: {os.path.getsize(output_path)} bytes)")
+        # 按采样率或管理员的请求头开启分析，由执行器在转换线程中采样
+        options = {'interactive': True}
+        if ocr_profile:
+            options['ocr_profile'] = ocr_profile
+        if request.form.get('upright', '').lower() in ('1', 'true', 'yes'):
+            options['upright'] = True
+        if pdf_engine:
+            options['pdf_engine'] = pdf_engine
+        if export_format in STREAMED_FORMATS:
+            options.update(chunk_options)
+        if should_profile(request.headers.get('X-Profile'), Config.PROFILE_SAMPLE_RATE, is_admin_request()):
+            logger.info(f"📈 本次转换开启采样分析: {job_id}")
+            options['profile'] = True
 
-        # 将输出文件读入内存
-        with open(output_path, 'rb') as f:
-            buffer = io.BytesIO(f.read())
-        
-        # 立即从磁盘删除临时输出文件
-        os.remove(output_path)
-        logger.info(f"已将输出文件读入内存并删除磁盘文件: {output_path}")
+        runner = get_job_runner()
+        client_id = request.headers.get('X-Client-Id') or request.remote_addr
+        if preview_pages:
+            if not is_previewable(upload_path, file_extension):
+                return jsonify({'error': 'Preview is only supported for PDF inputs'}), 400
+            return _convert_preview(upload_path, input_name, export_format, options, client_id,
+                                    preview_pages, preview_mode)
+        job_id, reused = enqueue_conversion(upload_path, input_name, export_format, options=options,
+                                            client_id=client_id, job_id=job_id)
+        if not reused:
+            runner.submit(job_id)
+    except UnroutableJobError as e:
+        return jsonify({
+            'error': f"No worker can convert {file_extension} -> {export_format}",
+            'required_capabilities': e.required,
+        }), 503
+    except Exception as e:
+        logger.error(f"创建转换任务失败: {e}", exc_info=True)
+        artifacts.delete_job(job_id)
+        return jsonify({'error': f'An error occurred: {str(e)}', 'job_id': job_id}), 500
+    finally:
+        # 上传暂存文件已写入文件存储（硬链接或复制）
+        if os.path.exists(upload_path):
+            os.remove(upload_path)
 
-        buffer.seek(0)
-        
-        # 返回文件，使用原始文件名作为下载名
-        original_output_filename = f"{output_filename_base}.{output_ext}"
-        mimetype = current_app.config['ALLOWED_EXTENSIONS'].get(output_ext, 'application/octet-stream')
-        
-        return send_file(
-            buffer,
-            mimetype=mimetype,
-            as_attachment=True,
-            download_name=original_output_filename
+    if run_async:
+        return _job_accepted(job_id)
+
+    with log_context(job_id=job_id):
+        job = runner.wait(job_id, Config.CONVERSION_TIMEOUT)
+    if job is None:
+        return jsonify({'error': 'Job not found', 'job_id': job_id}), 404
+    if job['state'] == STATE_FAILED:
+        return jsonify({'error': f"An error occurred: {job['error']}", 'job_id': job_id}), 500
+    if job['state'] != STATE_SUCCEEDED:
+        # 超过等待时间仍未完成：任务继续在后台运行，客户端改为轮询
+        logger.info(f"任务 {job_id} 未在 {Config.CONVERSION_TIMEOUT}s 内完成，转为异步")
+        return _job_accepted(job_id)
+    return _send_result(job)
+
+
+@convert_bp.route('/jobs/<job_id>')
+def job_status(job_id):
+    """查询任务状态和状态流转记录"""
+    store = get_job_store()
+    job = store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    payload = {
+        key: job[key] for key in (
+            'id', 'state', 'input_name', 'export_format', 'input_size', 'result_name',
+            'result_size', 'bytes_saved', 'error', 'attempts', 'estimated_cost', 'estimated_memory_mb', 'peak_memory_mb',
+            'created_at', 'started_at', 'finished_at', 'expires_at'
         )
+    }
+    payload['events'] = store.events(job_id)
+    if job['state'] == STATE_SUCCEEDED:
+        payload['download_url'] = url_for('convert.job_download', job_id=job_id)
+    if job['export_format'] in STREAMED_FORMATS:
+        payload['chunks_url'] = url_for('convert.job_chunks', job_id=job_id)
+    return jsonify(payload)
 
-    except Exception as e:
-        logger.error(f"转换过程中发生严重错误: {e}", exc_info=True)
-        if output_path and os.path.exists(output_path):
-            os.remove(output_path)
-        return jsonify({'error': f'An error occurred: {str(e)}'}), 500
-    
+
+@convert_bp.route('/jobs/<job_id>/chunks')
+def job_chunks(job_id):
+    """
+    以 NDJSON 逐行返回 JSONL 任务已写出的分块
+
+    任务运行中持续跟随新写出的块，直到任务结束；查询参数 skip 跳过已读取的块数，断线后可续读。
+    """
+    job = get_job_store().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if job['export_format'] not in STREAMED_FORMATS:
+        return jsonify({'error': f"Job exports {job['export_format']}, not chunks"}), 400
+    if job['state'] == STATE_FAILED:
+        return jsonify({'error': f"An error occurred: {job['error']}", 'job_id': job_id}), 500
+    skip = max(request.args.get('skip', 0, type=int), 0)
+    response = Response(stream_with_context(_follow_chunks(job_id, skip)), mimetype='application/x-ndjson')
+    response.headers['X-Job-Id'] = job_id
+    return response
+
+
+@convert_bp.route('/jobs/<job_id>/download')
+def job_download(job_id):
+    """下载已完成任务的结果（保留到 JOB_RESULT_TTL 过期）"""
+    job = get_job_store().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if job['state'] != STATE_SUCCEEDED:
+        return jsonify({'error': f"Job is {job['state']}", 'state': job['state']}), 409
+    return _send_result(job)
+
+
+def _convert_preview(upload_path: str, input_name: str, export_format: str, options: dict,
+                     client_id: str, preview_pages: int, preview_mode: str):
+    """
+    把选中的页拆成子 PDF 按原路线转换，在延迟预算内等待结果
+
+    Returns:
+        完成时 200（文本结果内联在 content 中），超出预算时 202（预览继续在后台完成），失败时 500
+    """
+    plan = plan_preview(upload_path, export_format, preview_pages, preview_mode,
+                        Config.PREVIEW_LATENCY_BUDGET, options)
+    preview_name = f"{input_name.rsplit('.', 1)[0]}_preview.pdf"
+    preview_path = f"{upload_path}.preview.pdf"
+    try:
+        write_preview_pdf(upload_path, plan['pages'], preview_path)
+        job_id, reused = enqueue_conversion(preview_path, preview_name, export_format, options=plan['options'],
+                                            client_id=client_id)
     finally:
-        # 清理输入文件
-        if input_path and os.path.exists(input_path):
-            os.remove(input_path)
-            logger.info(f"已清理输入文件: {input_path}") 
\ No newline at end of file
+        if os.path.exists(preview_path):
+            os.remove(preview_path)
+    runner = get_job_runner()
+    if not reused:
+        runner.submit(job_id)
+
+    with log_context(job_id=job_id):
+        job = runner.wait(job_id, Config.PREVIEW_LATENCY_BUDGET)
+    payload = {
+        'job_id': job_id,
+        'state': job['state'] if job else None,
+        'preview': {
+            'pages': [index + 1 for index in plan['pages']],
+            'page_count': plan['page_count'],
+            'mode': preview_mode,
+        },
+        'estimate': plan['estimate'],
+        'status_url': url_for('convert.job_status', job_id=job_id),
+    }
+    if job is None:
+        return jsonify(dict(payload, error='Job not found')), 404
+    if job['state'] == STATE_FAILED:
+        return jsonify(dict(payload, error=f"An error occurred: {job['error']}")), 500
+    if job['state'] != STATE_SUCCEEDED:
+        logger.info(f"预览 {job_id} 未在 {Config.PREVIEW_LATENCY_BUDGET}s 预算内完成，转为异步")
+        return jsonify(payload), 202
+    payload['download_url'] = url_for('convert.job_download', job_id=job_id)
+    if export_format in PREVIEW_INLINE_FORMATS:
+        with open(get_artifact_store().local_path(job['result_path']), encoding='utf-8', errors='replace') as f:
+            payload['content'] = f.read()
+    return jsonify(payload)
+
+
+def _job_accepted(job_id: str):
+    response = jsonify({
+        'job_id': job_id,
+        'status_url': url_for('convert.job_status', job_id=job_id),
+        'download_url': url_for('convert.job_download', job_id=job_id),
+    })
+    response.status_code = 202
+    response.headers['X-Job-Id'] = job_id
+    return response
+
+
+def _follow_chunks(job_id: str, skip: int):
+    """跟随任务的流式结果文件，逐行产出完整的块；结果写完后切换到最终文件继续读取"""
+    store = get_job_store()
+    artifacts = get_artifact_store()
+    offset, pending, seen = 0, b'', 0
+    deadline = time.time() + Config.CONVERSION_TIMEOUT
+    while True:
+        # 先取状态再读文件：看到结束状态时文件已完整
+        job = store.get(job_id)
+        finished = job is None or job['state'] in (STATE_SUCCEEDED, STATE_FAILED)
+        if job is not None and job['state'] == STATE_SUCCEEDED and job['result_path']:
+            path = artifacts.local_path(job['result_path']) if artifacts.exists(job['result_path']) else None
+        else:
+            path = artifacts.partial_path(job_id)
+        if path and os.path.exists(path):
+            if os.path.getsize(path) < offset:
+                # 任务中断后重新执行，结果从头重写：跳过已发送的块
+                skip, offset, pending, seen = max(skip, seen), 0, b'', 0
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                data = f.read()
+            offset += len(data)
+            *lines, pending = (pending + data).split(b'\n')
+            for line in lines:
+                if seen >= skip:
+                    yield line + b'\n'
+                seen += 1
+        if finished or time.time() > deadline:
+            return
+        time.sleep(0.5)
+
+
+def _send_result(job):
+    """从磁盘流式发送结果文件，使用原始文件名作为下载名"""
+    artifacts = get_artifact_store()
+    if not job['result_path'] or not artifacts.exists(job['result_path']):
+        return jsonify({'error': 'Result expired', 'job_id': job['id']}), 410
+    result_path = artifacts.local_path(job['result_path'])
+    output_ext = result_path.rsplit('.', 1)[1].lower()
+    mimetype = Config.ALLOWED_EXTENSIONS.get(output_ext, 'application/octet-stream')
+    if Config.GZIP_TEXT_RESULTS and output_ext in GZIP_EXTENSIONS and 'gzip' in request.accept_encodings:
+        return _send_gzipped(job, result_path, mimetype)
+    response = send_file(
+        os.path.abspath(result_path),
+        mimetype=mimetype,
+        as_attachment=True,
+        download_name=job['result_name']
+    )
+    response.headers['X-Job-Id'] = job['id']
+    return response
+
+
+def _send_gzipped(job, result_path: str, mimetype: str):
+    """边读边压缩发送文本结果（Content-Encoding: gzip），不在磁盘上保留压缩副本"""
+    def generate():
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        with open(result_path, 'rb') as f:
+            for block in iter(lambda: f.read(GZIP_CHUNK_BYTES), b''):
+                data = compressor.compress(block)
+                if data:
+                    yield data
+        yield compressor.flush()
+
+    response = Response(generate(), mimetype=mimetype)
+    response.headers['Content-Encoding'] = 'gzip'
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Content-Disposition'] = _attachment_header(job['result_name'])
+    response.headers['X-Job-Id'] = job['id']
+    return response
+
+
+def _attachment_header(filename: str) -> str:
+    """下载文件名（非 ASCII 文件名按 RFC 5987 编码，与 send_file 一致）"""
+    fallback = filename.encode('ascii', 'ignore').decode('ascii').replace('"', '') or 'download'
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"
+
@@ -3,12 +3,49 @@
 处理首页和工具箱导航相关的路由
 """
 
-from flask import Blueprint, render_template
+import os
+from flask import Blueprint, render_template, request, send_from_directory, abort
+from modules.assets import DIST_DIR, IMMUTABLE_CACHE_CONTROL
 
 # 创建蓝图
 main_bp = Blueprint('main', __name__)
 
+# 预压缩版本：(Accept-Encoding 中的编码, 文件后缀)，按优先级排列
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+
 @main_bp.route('/')
 def home():
     """渲染首页 - 小羊的工具箱"""
-    return render_template('index.html') 
\ No newline at end of file
+    return render_template('index.html')
+
+
+@main_bp.route('/assets/<path:filename>')
+def assets(filename):
+    """
+    提供构建后的内容哈希资源（python -m modules.assets）
+
+    客户端支持时直接发送预压缩的 br / gzip 文件；文件名随内容变化，可长期缓存。
+    """
+    if filename.endswith(('.gz', '.br')) or not os.path.exists(os.path.join(DIST_DIR, filename)):
+        abort(404)
+    send_name, encoding = filename, None
+    for candidate, suffix in PRECOMPRESSED:
+        if candidate in request.accept_encodings and os.path.exists(os.path.join(DIST_DIR, filename + suffix)):
+            send_name, encoding = filename + suffix, candidate
+            break
+
+    response = send_from_directory(DIST_DIR, send_name, mimetype=_mimetype(filename))
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
+
+
+def _mimetype(filename: str) -> str:
+    if filename.endswith('.css'):
+        return 'text/css'
+    if filename.endswith('.js'):
+        return 'application/javascript'
+    return 'application/octet-stream'
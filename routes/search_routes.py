@@ -0,0 +1,42 @@
+"""
+全文检索路由模块
+在已转换文档的本地全文索引中查找段落
+
+索引按内容哈希去重、跨客户端共享，摘要会暴露其他用户上传的文档内容，因此与管理接口一样需要管理令牌。
+"""
+
+import time
+import logging
+from flask import Blueprint, request, jsonify
+from config import Config
+from modules.search_index import get_search_index
+from routes.admin_routes import require_admin
+
+logger = logging.getLogger(__name__)
+
+# 创建蓝图
+search_bp = Blueprint('search', __name__)
+
+
+@search_bp.route('/search')
+@require_admin
+def search():
+    """
+    检索已转换的文档
+
+    查询参数 q 为空格分隔的检索词（中文按字片段匹配），limit 为最多返回的文档数。
+    需要 X-Admin-Token 请求头；未配置 ADMIN_TOKEN 时接口关闭。
+    """
+    index = get_search_index()
+    if index is None:
+        return jsonify({'error': 'Search index is disabled'}), 404
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Missing query parameter q'}), 400
+    limit = min(max(request.args.get('limit', 20, type=int), 1), Config.SEARCH_MAX_RESULTS)
+
+    started = time.perf_counter()
+    results = index.search(query, limit=limit)
+    took_ms = (time.perf_counter() - started) * 1000
+    logger.debug("检索 %r: %d 个文档, %.1fms", query, len(results), took_ms)
+    return jsonify({'query': query, 'took_ms': round(took_ms, 1), 'results': results})
@@ -217,7 +217,7 @@ const DocumentConverter = {
 
   computed: {
     acceptedTypes() {
-      return '.pdf,.docx,.doc,.txt,.md,.html,.xlsx,.xls,.caj';
+      return '.pdf,.docx,.doc,.txt,.md,.html,.xlsx,.xls,.csv,.caj';
     },
 
     availableFormats() {
@@ -269,6 +269,14 @@ const DocumentConverter = {
         'XLSX': {
           title: 'Excel 表格',
           description: 'Microsoft Excel 格式，适合数据和表格处理'
+        },
+        'CSV': {
+          title: 'CSV 表格',
+          description: '逗号分隔的纯文本表格，多个工作表依次写出'
+        },
+        'JSONL': {
+          title: 'JSONL 分块',
+          description: '每行一个检索分块，带标题路径、页码、元素类型和表格单元格，适合导入知识库'
         }
       };
       
@@ -304,15 +312,16 @@ const DocumentConverter = {
 
     getAvailableFormats(fileExtension) {
       const formatMap = {
-        'pdf': ['markdown', 'text', 'docx', 'xlsx'],
-        'docx': ['markdown', 'text', 'pdf'],
-        'doc': ['markdown', 'text', 'pdf'],
+        'pdf': ['markdown', 'text', 'docx', 'xlsx', 'jsonl'],
+        'docx': ['markdown', 'text', 'pdf', 'jsonl'],
+        'doc': ['markdown', 'text', 'pdf', 'jsonl'],
         'txt': ['markdown', 'pdf', 'docx'],
         'md': ['pdf', 'docx', 'xlsx', 'text'],
-        'html': ['markdown', 'text', 'pdf', 'docx'],
-        'xlsx': ['markdown', 'text'],
-        'xls': ['markdown', 'text'],
-        'caj': ['pdf', 'markdown', 'text', 'docx', 'xlsx']
+        'html': ['markdown', 'text', 'pdf', 'docx', 'jsonl'],
+        'xlsx': ['markdown', 'text', 'csv', 'pdf', 'docx'],
+        'xls': ['markdown', 'text', 'csv', 'xlsx', 'pdf', 'docx'],
+        'csv': ['markdown', 'text', 'xlsx', 'pdf', 'docx'],
+        'caj': ['pdf', 'markdown', 'text', 'docx', 'xlsx', 'jsonl']
       };
       
       return formatMap[fileExtension] || ['markdown', 'text', 'pdf'];
@@ -324,7 +333,9 @@ const DocumentConverter = {
         'text': '纯文本',
         'pdf': 'PDF',
         'docx': 'Word 文档',
-        'xlsx': 'Excel 表格'
+        'xlsx': 'Excel 表格',
+        'csv': 'CSV 表格',
+        'jsonl': 'JSONL 分块'
       };
       return labels[format] || format;
     },
@@ -335,7 +346,9 @@ const DocumentConverter = {
         'text': 'DocumentCopy',
         'pdf': 'Document',
         'docx': 'Document',
-        'xlsx': 'Grid'
+        'xlsx': 'Grid',
+        'csv': 'Grid',
+        'jsonl': 'DocumentCopy'
       };
       return icons[format] || 'Document';
     },
@@ -222,6 +222,7 @@ class ApiService {
         { ext: 'doc', label: 'Word文档(旧版)', icon: 'Document' },
         { ext: 'xlsx', label: 'Excel表格', icon: 'Grid' },
         { ext: 'xls', label: 'Excel表格(旧版)', icon: 'Grid' },
+        { ext: 'csv', label: 'CSV表格', icon: 'Grid' },
         { ext: 'md', label: 'Markdown', icon: 'Document' },
         { ext: 'html', label: 'HTML网页', icon: 'Document' },
         { ext: 'txt', label: '纯文本', icon: 'DocumentCopy' }
@@ -231,7 +232,9 @@ class ApiService {
         { value: 'TEXT', label: '纯文本', icon: 'DocumentCopy' },
         { value: 'PDF', label: 'PDF', icon: 'Document' },
         { value: 'DOCX', label: 'Word文档', icon: 'Document' },
-        { value: 'XLSX', label: 'Excel表格', icon: 'Grid' }
+        { value: 'XLSX', label: 'Excel表格', icon: 'Grid' },
+        { value: 'CSV', label: 'CSV表格', icon: 'Grid' },
+        { value: 'JSONL', label: 'JSONL分块', icon: 'DocumentCopy' }
       ]
     };
   }
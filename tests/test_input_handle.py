@@ -0,0 +1,109 @@
+"""
+输入句柄测试：统计一次转换从磁盘读取输入文件的字节数
+
+在文件层计数：read 系统调用读取的字节（/proc/self/io 的 rchar）加上内存映射的字节。
+共享映射生效时，整个转换只读取输入文件一遍。
+"""
+
+import os
+import sys
+import mmap
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import input_handle
+from modules.input_handle import open_input, open_text
+from modules.light_converters import convert_html, transcode_text
+
+PROC_IO = '/proc/self/io'
+INPUT_SIZE = 4 * 1024 * 1024
+# 允许测试框架自身的少量读取
+TOLERANCE = 1.1
+
+pytestmark = pytest.mark.skipif(not os.path.exists(PROC_IO), reason="需要 /proc/self/io 统计 read 字节数")
+
+
+def read_chars() -> int:
+    with open(PROC_IO) as f:
+        for line in f:
+            if line.startswith('rchar:'):
+                return int(line.split()[1])
+    return 0
+
+
+@pytest.fixture
+def disk_reads(monkeypatch):
+    """返回函数：执行给定操作并统计其间从磁盘读取（read + 映射）的字节数"""
+    real_mmap = mmap.mmap
+    mapped = []
+
+    def counting_mmap(fileno, length, *args, **kwargs):
+        mapped.append(os.fstat(fileno).st_size if length == 0 else length)
+        return real_mmap(fileno, length, *args, **kwargs)
+
+    monkeypatch.setattr(input_handle.mmap, 'mmap', counting_mmap)
+
+    def measure(action) -> int:
+        mapped.clear()
+        before = read_chars()
+        action()
+        return read_chars() - before + sum(mapped)
+    return measure
+
+
+def write_gbk_text(path: str, size: int = INPUT_SIZE) -> None:
+    line = '中文编码测试，GBK 文本转码为 UTF-8。\n'.encode('gbk')
+    with open(path, 'wb') as f:
+        f.write(line * (size // len(line)))
+
+
+def test_transcode_reads_input_once(tmp_path, disk_reads):
+    source, target = str(tmp_path / 'input.txt'), str(tmp_path / 'output.md')
+    write_gbk_text(source)
+    size = os.path.getsize(source)
+
+    def convert():
+        with open_input(source) as handle:
+            assert handle.sha256
+            transcode_text(source, target)
+
+    assert disk_reads(convert) <= size * TOLERANCE
+    with open(target, encoding='utf-8') as f:
+        assert f.readline() == '中文编码测试，GBK 文本转码为 UTF-8。\n'
+
+
+def test_html_reads_input_once(tmp_path, disk_reads):
+    source, target = str(tmp_path / 'input.html'), str(tmp_path / 'output.md')
+    paragraph = '<p>段落 paragraph</p>\n'.encode('utf-8')
+    with open(source, 'wb') as f:
+        f.write(b'<html><body>' + paragraph * (INPUT_SIZE // len(paragraph)) + b'</body></html>')
+    size = os.path.getsize(source)
+
+    def convert():
+        with open_input(source):
+            convert_html(source, target)
+
+    assert disk_reads(convert) <= size * TOLERANCE
+
+
+def test_document_converter_reads_input_once(tmp_path, disk_reads):
+    document_converter = pytest.importorskip('modules.document_converter')
+    source, target = str(tmp_path / 'input.txt'), str(tmp_path / 'output.md')
+    write_gbk_text(source)
+    size = os.path.getsize(source)
+    converter = document_converter.DocumentConverter()
+
+    assert disk_reads(lambda: converter.convert_document(source, target, 'MARKDOWN')) <= size * TOLERANCE
+
+
+def test_mapped_text_matches_file(tmp_path):
+    source = str(tmp_path / 'input.txt')
+    write_gbk_text(source, size=300 * 1024)
+    with open(source, encoding='gbk') as f:
+        expected = f.read()
+    with open_input(source) as handle:
+        with open_text(source, 'gbk') as f:
+            assert f.read() == expected
+        assert handle.stats['read'] == handle.size
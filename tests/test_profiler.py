@@ -0,0 +1,61 @@
+"""
+采样分析测试：等待子进程的时间归到子进程名下，OCR 辅助线程一并采样
+"""
+
+import os
+import sys
+import time
+import shutil
+import threading
+import subprocess
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.profiler import profile_conversion
+
+
+def read_folded(profile_dir: str, job_id: str) -> dict:
+    samples = {}
+    with open(os.path.join(profile_dir, f"{job_id}.folded"), encoding='utf-8') as f:
+        for line in f:
+            stack, count = line.rstrip('\n').rsplit(' ', 1)
+            samples[stack] = int(count)
+    return samples
+
+
+@pytest.mark.skipif(shutil.which('sleep') is None, reason="需要 sleep 命令")
+def test_subprocess_wait_attributed_to_child(tmp_path):
+    with profile_conversion('job', str(tmp_path), interval=0.005):
+        # capture_output 走 communicate()，等待时栈顶是 selectors.py
+        subprocess.run(['sleep', '0.5'], check=True, capture_output=True)
+
+    samples = read_folded(str(tmp_path), 'job')
+    total = sum(samples.values())
+    child = sum(count for stack, count in samples.items() if '[child' in stack.rsplit(';', 1)[-1])
+    assert total > 0
+    # 几乎全部时间都在等待 sleep
+    assert child >= total * 0.8
+
+
+def test_helper_threads_sampled(tmp_path):
+    stop = threading.Event()
+
+    def busy():
+        while not stop.is_set():
+            sum(range(1000))
+
+    with profile_conversion('job', str(tmp_path), interval=0.005):
+        helper = threading.Thread(target=busy, name='ocr-page_0')
+        other = threading.Thread(target=busy, name='convert_1')
+        helper.start()
+        other.start()
+        time.sleep(0.3)
+        stop.set()
+        helper.join()
+        other.join()
+
+    samples = read_folded(str(tmp_path), 'job')
+    assert any(stack.startswith('[thread] ocr-page_0;') and 'busy' in stack for stack in samples)
+    assert not any('convert_1' in stack for stack in samples)
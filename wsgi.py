@@ -0,0 +1,8 @@
+"""
+小羊的工具箱 - 生产环境 WSGI 入口
+配合 gunicorn.conf.py 使用：gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+from app import app
+
+__all__ = ['app']